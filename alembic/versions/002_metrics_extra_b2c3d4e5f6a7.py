@@ -0,0 +1,29 @@
+"""Metrics extra_json
+
+Revision ID: 002_metrics_extra
+Revises: 001_initial
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002_metrics_extra'
+down_revision: Union[str, Sequence[str], None] = '001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Extra metrics (CAGR, Sortino, streaks, analyzer output) as JSON
+    op.add_column('metrics', sa.Column('extra_json', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('metrics', 'extra_json')
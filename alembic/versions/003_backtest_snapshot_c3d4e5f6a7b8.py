@@ -0,0 +1,29 @@
+"""Backtest snapshot_json
+
+Revision ID: 003_backtest_snapshot
+Revises: 002_metrics_extra
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003_backtest_snapshot'
+down_revision: Union[str, Sequence[str], None] = '002_metrics_extra'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # End-of-run broker/strategy state used to resume on new bars
+    op.add_column('backtests', sa.Column('snapshot_json', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('backtests', 'snapshot_json')
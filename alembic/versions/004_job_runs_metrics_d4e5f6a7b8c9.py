@@ -0,0 +1,33 @@
+"""Job run timings and row counts
+
+Revision ID: 004_job_runs_metrics
+Revises: 003_backtest_snapshot
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004_job_runs_metrics'
+down_revision: Union[str, Sequence[str], None] = '003_backtest_snapshot'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('job_runs', sa.Column('rows_processed', sa.Integer(), nullable=True))
+    op.add_column('job_runs', sa.Column('duration_seconds', sa.Float(), nullable=True))
+    # Lookup of running jobs by name for the overlap guard
+    op.create_index('ix_job_runs_job_name_status', 'job_runs', ['job_name', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_job_runs_job_name_status', table_name='job_runs')
+    op.drop_column('job_runs', 'duration_seconds')
+    op.drop_column('job_runs', 'rows_processed')
@@ -0,0 +1,29 @@
+"""Backtest status message
+
+Revision ID: 005_backtest_message
+Revises: 004_job_runs_metrics
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005_backtest_message'
+down_revision: Union[str, Sequence[str], None] = '004_job_runs_metrics'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Reason a run failed or was cancelled
+    op.add_column('backtests', sa.Column('message', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('backtests', 'message')
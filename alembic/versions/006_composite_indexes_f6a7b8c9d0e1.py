@@ -0,0 +1,55 @@
+"""Composite indexes for per-symbol and per-backtest lookups
+
+Revision ID: 006_composite_indexes
+Revises: 005_backtest_message
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006_composite_indexes'
+down_revision: Union[str, Sequence[str], None] = '005_backtest_message'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Results are always read and deleted by backtest_id, ordered by date
+    op.create_index('ix_trades_backtest_id_date', 'trades', ['backtest_id', 'date'], unique=False)
+    op.create_index('ix_daily_positions_backtest_id_date', 'daily_positions', ['backtest_id', 'date'], unique=False)
+    op.create_index('ix_indicators_symbol_id_name_params_hash_date', 'indicators',
+                    ['symbol_id', 'name', 'params_hash', 'date'], unique=False)
+    # Refresh job (ticker + completed) and retention job (status + age)
+    op.create_index('ix_backtests_ticker_status', 'backtests', ['ticker', 'status'], unique=False)
+    op.create_index('ix_backtests_status_created_at', 'backtests', ['status', 'created_at'], unique=False)
+
+    # Price lookups go through the (symbol_id, date) unique index; the
+    # single-column indexes only cost write time on the large tables
+    op.drop_index('ix_prices_date', table_name='prices')
+    op.drop_index('ix_prices_id', table_name='prices')
+    op.drop_index('ix_indicators_date', table_name='indicators')
+    op.drop_index('ix_indicators_id', table_name='indicators')
+    op.drop_index('ix_trades_id', table_name='trades')
+    op.drop_index('ix_daily_positions_id', table_name='daily_positions')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_daily_positions_id', 'daily_positions', ['id'], unique=False)
+    op.create_index('ix_trades_id', 'trades', ['id'], unique=False)
+    op.create_index('ix_indicators_id', 'indicators', ['id'], unique=False)
+    op.create_index('ix_indicators_date', 'indicators', ['date'], unique=False)
+    op.create_index('ix_prices_id', 'prices', ['id'], unique=False)
+    op.create_index('ix_prices_date', 'prices', ['date'], unique=False)
+
+    op.drop_index('ix_backtests_status_created_at', table_name='backtests')
+    op.drop_index('ix_backtests_ticker_status', table_name='backtests')
+    op.drop_index('ix_indicators_symbol_id_name_params_hash_date', table_name='indicators')
+    op.drop_index('ix_daily_positions_backtest_id_date', table_name='daily_positions')
+    op.drop_index('ix_trades_backtest_id_date', table_name='trades')
@@ -0,0 +1,142 @@
+"""Partition prices by year and daily_positions by backtest_id (PostgreSQL)
+
+Revision ID: 007_partition_tables
+Revises: 006_composite_indexes
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007_partition_tables'
+down_revision: Union[str, Sequence[str], None] = '006_composite_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Hash partitions of daily_positions; changing it means re-partitioning
+POSITION_PARTITIONS = 16
+
+PRICE_COLUMNS = "id, symbol_id, date, open, high, low, close, volume"
+POSITION_COLUMNS = "id, backtest_id, date, position_size, cash, equity, drawdown"
+
+
+def _price_years(bind) -> range:
+    """Years already stored plus next year, so ingestion never lands in DEFAULT"""
+    first, last = bind.execute(sa.text(
+        "SELECT min(extract(year FROM date))::int, max(extract(year FROM date))::int FROM prices"
+    )).one()
+    this_year = date.today().year
+    return range(first or this_year, max(last or this_year, this_year) + 2)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # Declarative partitioning only exists on PostgreSQL; other backends
+        # keep the plain tables and the composite indexes from 006
+        return
+
+    years = _price_years(bind)
+
+    # prices: range partitions by year. The partition key has to be part of
+    # every unique constraint, so the PK becomes (id, date)
+    op.execute("ALTER TABLE prices RENAME TO prices_unpartitioned")
+    op.execute("""
+        CREATE TABLE prices (
+            id integer NOT NULL DEFAULT nextval('prices_id_seq'),
+            symbol_id integer REFERENCES symbols (id),
+            date date NOT NULL,
+            open double precision,
+            high double precision,
+            low double precision,
+            close double precision,
+            volume integer,
+            CONSTRAINT prices_partitioned_pkey PRIMARY KEY (id, date),
+            CONSTRAINT uq_prices_symbol_id_date UNIQUE (symbol_id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    for year in years:
+        op.execute(f"CREATE TABLE prices_y{year} PARTITION OF prices "
+                   f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')")
+    op.execute("CREATE TABLE prices_default PARTITION OF prices DEFAULT")
+    op.execute(f"INSERT INTO prices ({PRICE_COLUMNS}) "
+               f"SELECT {PRICE_COLUMNS} FROM prices_unpartitioned WHERE date IS NOT NULL")
+    # The sequence would be dropped with the old table otherwise
+    op.execute("ALTER SEQUENCE prices_id_seq OWNED BY prices.id")
+    op.execute("DROP TABLE prices_unpartitioned")
+
+    # daily_positions: hash partitions by backtest_id. Each backtest lives in
+    # one partition, so reads and retention deletes touch 1/N of the table
+    op.execute("ALTER TABLE daily_positions RENAME TO daily_positions_unpartitioned")
+    op.execute("""
+        CREATE TABLE daily_positions (
+            id integer NOT NULL DEFAULT nextval('daily_positions_id_seq'),
+            backtest_id integer NOT NULL REFERENCES backtests (id),
+            date date,
+            position_size double precision,
+            cash double precision,
+            equity double precision,
+            drawdown double precision,
+            CONSTRAINT daily_positions_partitioned_pkey PRIMARY KEY (id, backtest_id)
+        ) PARTITION BY HASH (backtest_id)
+    """)
+    for remainder in range(POSITION_PARTITIONS):
+        op.execute(f"CREATE TABLE daily_positions_p{remainder} PARTITION OF daily_positions "
+                   f"FOR VALUES WITH (MODULUS {POSITION_PARTITIONS}, REMAINDER {remainder})")
+    op.execute(f"INSERT INTO daily_positions ({POSITION_COLUMNS}) "
+               f"SELECT {POSITION_COLUMNS} FROM daily_positions_unpartitioned WHERE backtest_id IS NOT NULL")
+    op.execute("ALTER SEQUENCE daily_positions_id_seq OWNED BY daily_positions.id")
+    op.execute("DROP TABLE daily_positions_unpartitioned")
+    op.create_index('ix_daily_positions_backtest_id_date', 'daily_positions', ['backtest_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE daily_positions RENAME TO daily_positions_partitioned")
+    op.execute("ALTER INDEX ix_daily_positions_backtest_id_date RENAME TO ix_daily_positions_partitioned_backtest_id_date")
+    op.execute("""
+        CREATE TABLE daily_positions (
+            id integer NOT NULL DEFAULT nextval('daily_positions_id_seq'),
+            backtest_id integer REFERENCES backtests (id),
+            date date,
+            position_size double precision,
+            cash double precision,
+            equity double precision,
+            drawdown double precision,
+            CONSTRAINT daily_positions_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute(f"INSERT INTO daily_positions ({POSITION_COLUMNS}) "
+               f"SELECT {POSITION_COLUMNS} FROM daily_positions_partitioned")
+    op.execute("ALTER SEQUENCE daily_positions_id_seq OWNED BY daily_positions.id")
+    op.execute("DROP TABLE daily_positions_partitioned")
+    op.create_index('ix_daily_positions_backtest_id_date', 'daily_positions', ['backtest_id', 'date'], unique=False)
+
+    op.execute("ALTER TABLE prices RENAME TO prices_partitioned")
+    op.execute("""
+        CREATE TABLE prices (
+            id integer NOT NULL DEFAULT nextval('prices_id_seq'),
+            symbol_id integer REFERENCES symbols (id),
+            date date,
+            open double precision,
+            high double precision,
+            low double precision,
+            close double precision,
+            volume integer,
+            CONSTRAINT prices_pkey PRIMARY KEY (id),
+            CONSTRAINT prices_symbol_id_date_key UNIQUE (symbol_id, date)
+        )
+    """)
+    op.execute(f"INSERT INTO prices ({PRICE_COLUMNS}) SELECT {PRICE_COLUMNS} FROM prices_partitioned")
+    op.execute("ALTER SEQUENCE prices_id_seq OWNED BY prices.id")
+    op.execute("DROP TABLE prices_partitioned")
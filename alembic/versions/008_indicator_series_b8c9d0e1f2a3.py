@@ -0,0 +1,122 @@
+"""Packed indicator series replacing per-date indicator rows
+
+Revision ID: 008_indicator_series
+Revises: 007_partition_tables
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008_indicator_series'
+down_revision: Union[str, Sequence[str], None] = '007_partition_tables'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Frozen copies of app.core.indicator_arrays at the time of this revision
+def _canonical_params(params_hash):
+    return json.dumps(json.loads(params_hash) if params_hash else {}, sort_keys=True, separators=(',', ':'))
+
+
+def _indicator_key(name, params_json):
+    return hashlib.sha256(f"{name.upper()}:{params_json}".encode()).hexdigest()
+
+
+def _as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    indicator_series = op.create_table('indicator_series',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('symbol_id', sa.Integer(), nullable=False),
+        sa.Column('indicator_key', sa.String(length=64), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('params_json', sa.Text(), nullable=True),
+        sa.Column('start_date', sa.Date(), nullable=True),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('length', sa.Integer(), nullable=True),
+        sa.Column('dates', sa.LargeBinary(), nullable=True),
+        sa.Column('values', sa.LargeBinary(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['symbol_id'], ['symbols.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('symbol_id', 'indicator_key')
+    )
+
+    # One packed row per (symbol, indicator key). Rows whose params_hash only
+    # differs in JSON formatting (or whose name only differs in case) share a
+    # key, so they are merged into one series; the newest row wins per date.
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT symbol_id, name, params_hash, date, value FROM indicators "
+        "WHERE symbol_id IS NOT NULL AND date IS NOT NULL AND value IS NOT NULL "
+        "ORDER BY id"
+    ))
+    merged = {}
+    for symbol_id, name, params_hash, day, value in rows:
+        params_json = _canonical_params(params_hash)
+        key = (symbol_id, _indicator_key(name, params_json))
+        entry = merged.setdefault(key, {'name': name, 'params_json': params_json, 'values': {}})
+        entry['values'][_as_date(day)] = value
+
+    series = []
+    for (symbol_id, indicator_key), entry in merged.items():
+        days = sorted(entry['values'])
+        dates = np.array(days, dtype='datetime64[D]')
+        series.append({
+            'symbol_id': symbol_id,
+            'indicator_key': indicator_key,
+            'name': entry['name'],
+            'params_json': entry['params_json'],
+            'start_date': days[0],
+            'end_date': days[-1],
+            'length': len(days),
+            'dates': dates.astype(np.int64).astype('<i4').tobytes(),
+            'values': np.array([entry['values'][day] for day in days], dtype='<f8').tobytes(),
+            'updated_at': datetime.utcnow(),
+        })
+    if series:
+        op.bulk_insert(indicator_series, series)
+
+    op.drop_table('indicators')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    indicators = op.create_table('indicators',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('symbol_id', sa.Integer(), nullable=True),
+        sa.Column('date', sa.Date(), nullable=True),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('value', sa.Float(), nullable=True),
+        sa.Column('params_hash', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['symbol_id'], ['symbols.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('symbol_id', 'date', 'name', 'params_hash')
+    )
+    op.create_index('ix_indicators_symbol_id_name_params_hash_date', 'indicators',
+                    ['symbol_id', 'name', 'params_hash', 'date'], unique=False)
+
+    bind = op.get_bind()
+    for symbol_id, name, params_json, dates, values in bind.execute(sa.text(
+            "SELECT symbol_id, name, params_json, dates, \"values\" FROM indicator_series")):
+        days = np.frombuffer(dates, dtype='<i4').astype('datetime64[D]').astype(object)
+        op.bulk_insert(indicators, [
+            {'symbol_id': symbol_id, 'date': day, 'name': name, 'value': float(value),
+             # Legacy layout: JSON with the default separators
+             'params_hash': json.dumps(json.loads(params_json))}
+            for day, value in zip(days, np.frombuffer(values, dtype='<f8'))
+        ])
+
+    op.drop_table('indicator_series')
@@ -0,0 +1,64 @@
+"""Sweep task queue and worker heartbeats
+
+Revision ID: 009_sweep_tasks
+Revises: 008_indicator_series
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009_sweep_tasks'
+down_revision: Union[str, Sequence[str], None] = '008_indicator_series'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Worker runs point at their sweep's run and report liveness
+    with op.batch_alter_table('job_runs') as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_job_runs_parent_id', 'job_runs', ['parent_id'], ['id'])
+
+    op.create_table('sweep_tasks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sweep_id', sa.Integer(), nullable=False),
+        sa.Column('ticker', sa.String(), nullable=False),
+        sa.Column('strategy_type', sa.String(), nullable=False),
+        sa.Column('params_json', sa.Text(), nullable=True),
+        sa.Column('start_date', sa.Date(), nullable=True),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('initial_cash', sa.Float(), nullable=True),
+        sa.Column('commission', sa.Float(), nullable=True),
+        sa.Column('engine_profile_json', sa.Text(), nullable=True),
+        sa.Column('store_positions', sa.Boolean(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('worker_id', sa.String(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('backtest_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['sweep_id'], ['job_runs.id'], ),
+        sa.ForeignKeyConstraint(['backtest_id'], ['backtests.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Claim scans pending tasks in ticker order; monitoring counts per sweep
+    op.create_index('ix_sweep_tasks_status_ticker', 'sweep_tasks', ['status', 'ticker'], unique=False)
+    op.create_index('ix_sweep_tasks_sweep_id_status', 'sweep_tasks', ['sweep_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sweep_tasks_sweep_id_status', table_name='sweep_tasks')
+    op.drop_index('ix_sweep_tasks_status_ticker', table_name='sweep_tasks')
+    op.drop_table('sweep_tasks')
+    with op.batch_alter_table('job_runs') as batch_op:
+        batch_op.drop_constraint('fk_job_runs_parent_id', type_='foreignkey')
+        batch_op.drop_column('parent_id')
+        batch_op.drop_column('heartbeat_at')
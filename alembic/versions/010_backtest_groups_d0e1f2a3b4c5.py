@@ -0,0 +1,45 @@
+"""Backtest groups for multi-strategy comparisons
+
+Revision ID: 010_backtest_groups
+Revises: 009_sweep_tasks
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010_backtest_groups'
+down_revision: Union[str, Sequence[str], None] = '009_sweep_tasks'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('backtest_groups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('kind', sa.String(), nullable=True),
+        sa.Column('ticker', sa.String(), nullable=True),
+        sa.Column('start_date', sa.Date(), nullable=True),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Backtests of one comparison point at their group
+    with op.batch_alter_table('backtests') as batch_op:
+        batch_op.add_column(sa.Column('group_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_backtests_group_id', 'backtest_groups', ['group_id'], ['id'])
+        batch_op.create_index('ix_backtests_group_id', ['group_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('backtests') as batch_op:
+        batch_op.drop_index('ix_backtests_group_id')
+        batch_op.drop_constraint('fk_backtests_group_id', type_='foreignkey')
+        batch_op.drop_column('group_id')
+    op.drop_table('backtest_groups')
@@ -0,0 +1,38 @@
+"""Cached compressed result payloads
+
+Revision ID: 011_result_payloads
+Revises: 010_backtest_groups
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011_result_payloads'
+down_revision: Union[str, Sequence[str], None] = '010_backtest_groups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One serialized results response per completed backtest
+    op.create_table('result_payloads',
+        sa.Column('backtest_id', sa.Integer(), nullable=False),
+        sa.Column('etag', sa.String(length=64), nullable=False),
+        sa.Column('encoding', sa.String(length=16), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['backtest_id'], ['backtests.id'], ),
+        sa.PrimaryKeyConstraint('backtest_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('result_payloads')
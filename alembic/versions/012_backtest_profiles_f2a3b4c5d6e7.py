@@ -0,0 +1,37 @@
+"""Stored cProfile stats of profiled backtest runs
+
+Revision ID: 012_backtest_profiles
+Revises: 011_result_payloads
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '012_backtest_profiles'
+down_revision: Union[str, Sequence[str], None] = '011_result_payloads'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only runs requested with profile=true get a row
+    op.create_table('backtest_profiles',
+        sa.Column('backtest_id', sa.Integer(), nullable=False),
+        sa.Column('wall_seconds', sa.Float(), nullable=True),
+        sa.Column('total_calls', sa.Integer(), nullable=True),
+        sa.Column('stats', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['backtest_id'], ['backtests.id'], ),
+        sa.PrimaryKeyConstraint('backtest_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('backtest_profiles')
@@ -0,0 +1,31 @@
+"""Backtest analyzers and engine profile
+
+Revision ID: 013_backtest_run_options
+Revises: 012_backtest_profiles
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '013_backtest_run_options'
+down_revision: Union[str, Sequence[str], None] = '012_backtest_profiles'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Run options a refresh re-applies; NULL (older rows) means the defaults
+    op.add_column('backtests', sa.Column('analyzers_json', sa.Text(), nullable=True))
+    op.add_column('backtests', sa.Column('engine_profile_json', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('backtests', 'engine_profile_json')
+    op.drop_column('backtests', 'analyzers_json')
@@ -0,0 +1,33 @@
+"""Negative max_drawdown
+
+Revision ID: 014_negative_max_drawdown
+Revises: 013_backtest_run_options
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '014_negative_max_drawdown'
+down_revision: Union[str, Sequence[str], None] = '013_backtest_run_options'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows written from the DrawDown analyzer output are positive; store them
+    # as the negative fraction newer rows use and drop their cached responses
+    op.execute(
+        "DELETE FROM result_payloads WHERE backtest_id IN "
+        "(SELECT backtest_id FROM metrics WHERE max_drawdown > 0)"
+    )
+    op.execute("UPDATE metrics SET max_drawdown = -max_drawdown WHERE max_drawdown > 0")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE metrics SET max_drawdown = -max_drawdown WHERE max_drawdown < 0")
@@ -1,23 +1,52 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import asyncio
+import gzip
+import json
 from datetime import datetime, timedelta
+from functools import partial
 
 from . import schemas
-from ..db.session import get_db
+
+from ..db.session import get_db, background_session
+from ..db.base import engine, background_engine
+from ..db.pool_metrics import pool_status
 from ..db import crud
-from ..services.yfinance_client import download_and_store_data
-from ..core.backtest_engine import run_backtest
-from ..utils.metrics import calculate_drawdown_series
+from ..core import config
+from ..core.run_control import RunCancelled, RunControl
+from ..core.strategy_registry import available_strategies, get_param_schema
+from ..services import events, result_cache
+
+# Engine (backtrader, numpy, pandas) and data-provider (yfinance) modules are
+# imported inside the endpoints that need them, so workers serving /health
+# and listings never load them.
 
 router = APIRouter()
 
+# Strong references so pending background runs are not garbage-collected
+_background_tasks = set()
+
+# canonical request key -> id of the identical run still in flight
+_inflight_runs = {}
+
+# backtest id -> RunControl of runs executing in this process
+_run_controls = {}
+
+def _cancel_on_request(backtest_id: int, event: dict):
+    # "cancelling" may come from another worker via NOTIFY; only the owner acts
+    if event.get('stage') == 'cancelling' and backtest_id in _run_controls:
+        _run_controls[backtest_id].cancel()
+
+events.bus.add_hook(_cancel_on_request)
+
 @router.get('/health', response_model=schemas.HealthResponse)
 def health_check(db: Session = Depends(get_db)):
     try:
         # Test database connection
-        db.execute("SELECT 1")
+        db.execute(text("SELECT 1"))
         db_status = "connected"
     except Exception:
         db_status = "disconnected"
@@ -25,7 +54,29 @@ def health_check(db: Session = Depends(get_db)):
     return schemas.HealthResponse(
         status="ok" if db_status == "connected" else "error",
         database=db_status,
-        timestamp=datetime.utcnow()
+        timestamp=datetime.utcnow(),
+        pools={
+            "api": pool_status(engine),
+            "background": pool_status(background_engine)
+        }
+    )
+
+@router.get('/strategies', response_model=List[schemas.StrategyInfo])
+def list_strategies():
+    """Estratégias registradas (built-in e plugins) com seus parâmetros"""
+    return [
+        schemas.StrategyInfo(name=name, params=get_param_schema(name))
+        for name in available_strategies()
+    ]
+
+@router.get('/engine/compatibility', response_model=schemas.EngineCompatibilityResponse)
+def engine_compatibility():
+    """Which strategies support each Cerebro runtime mode"""
+    from ..core.engine_profile import ENGINE_MODES, engine_mode_compatibility
+
+    return schemas.EngineCompatibilityResponse(
+        modes=ENGINE_MODES,
+        strategies=engine_mode_compatibility()
     )
 
 @router.post('/backtests/run', response_model=schemas.BacktestRunResponse)
@@ -33,6 +84,19 @@ async def run_backtest_endpoint(
     request: schemas.BacktestRunRequest,
     db: Session = Depends(get_db)
 ):
+    from ..core.engine_profile import is_profile_supported
+
+    engine_profile = request.engine_profile.model_dump(mode="json")
+    # The first non-default profile of a strategy runs its probe backtests
+    if not await asyncio.to_thread(is_profile_supported, request.strategy_type, engine_profile):
+        raise HTTPException(400, f"Engine profile not supported by {request.strategy_type}")
+    
+    # No await between the lookup and registering the new run, so concurrent
+    # identical requests cannot both miss
+    key = request.canonical_key()
+    if key in _inflight_runs:
+        return schemas.BacktestRunResponse(id=_inflight_runs[key], status="running", coalesced=True)
+    
     try:
         
         backtest = crud.create_backtest(db, {
@@ -43,11 +107,21 @@ async def run_backtest_endpoint(
             "strategy_params_json": request.strategy_params,
             "initial_cash": request.initial_cash,
             "commission": request.commission,
+            "analyzers": [analyzer.value for analyzer in request.analyzers],
+            "engine_profile": engine_profile,
             "status": "running"
         })
         
         
-        asyncio.create_task(execute_backtest(backtest.id, request, db))
+        control = RunControl()
+        _run_controls[backtest.id] = control
+        task = asyncio.create_task(execute_backtest(backtest.id, request, control))
+        _background_tasks.add(task)
+        _inflight_runs[key] = backtest.id
+        task.add_done_callback(_background_tasks.discard)
+        task.add_done_callback(lambda _: _inflight_runs.pop(key, None))
+        task.add_done_callback(lambda _: _run_controls.pop(backtest.id, None))
+        events.publish(backtest.id, "running", "queued")
         
         
         return schemas.BacktestRunResponse(
@@ -58,79 +132,383 @@ async def run_backtest_endpoint(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def execute_backtest(backtest_id: int, request: schemas.BacktestRunRequest, db: Session):
-    """Execute backtest asynchronously"""
+@router.post('/backtests/compare', response_model=schemas.BacktestCompareResponse)
+async def compare_backtests(
+    request: schemas.BacktestCompareRequest,
+    db: Session = Depends(get_db)
+):
+    """Rodar N configurações sobre uma única carga de dados e devolver a comparação alinhada"""
+    from ..core.engine_profile import is_profile_supported
+    from ..services.compare import comparison_table, run_configs
+    from ..services.yfinance_client import get_price_block
+
+    configs = [
+        {
+            "strategy_type": item.strategy_type,
+            "strategy_params": item.strategy_params,
+            "engine_profile": item.engine_profile.model_dump(mode="json")
+        } for item in request.strategies
+    ]
+    for item in configs:
+        if not await asyncio.to_thread(is_profile_supported, item["strategy_type"], item["engine_profile"]):
+            raise HTTPException(400, f"Engine profile not supported by {item['strategy_type']}")
+    labels = request.labels()
+    
+    # Uma carga de dados para todas as estratégias
+    block = await get_price_block(request.ticker, request.start_date, request.end_date, db, dtype="float64")
+    if block is None or len(block) == 0:
+        raise HTTPException(404, "No data found")
+    
+    group, backtests = crud.create_backtest_group(db, {
+        "ticker": request.ticker,
+        "start_date": request.start_date,
+        "end_date": request.end_date
+    }, [
+        {
+            "ticker": request.ticker,
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+            "strategy_type": item["strategy_type"],
+            "strategy_params_json": item["strategy_params"],
+            "initial_cash": request.initial_cash,
+            "commission": request.commission,
+            "engine_profile": item["engine_profile"],
+            "status": "running"
+        } for item in configs
+    ])
+    ids = [backtest.id for backtest in backtests]
+    group_id = group.id
+    # Não segura a conexão da requisição durante as execuções
+    db.close()
+    # Membros em andamento podem ser cancelados como qualquer run
+    controls = [RunControl(bars_total=len(block)) for _ in ids]
+    _run_controls.update(zip(ids, controls))
+    for backtest_id in ids:
+        events.publish(backtest_id, "running", "running", bars_processed=0, bars_total=len(block))
+    
     try:
+        try:
+            outcomes = await asyncio.to_thread(run_configs, block, configs, request.initial_cash,
+                                               request.commission, controls=controls)
+        except Exception as e:
+            with background_session() as db:
+                for backtest_id in ids:
+                    crud.update_backtest_status(db, backtest_id, "failed", str(e))
+            for backtest_id in ids:
+                events.publish(backtest_id, "failed", "failed", message=str(e))
+            raise HTTPException(status_code=500, detail=str(e))
         
-        df = await download_and_store_data(request.ticker, request.start_date, request.end_date, db)
+        # Cada membro termina sozinho: uma falha ao gravar não deixa os outros em "running"
+        statuses = []
+        with background_session() as db:
+            for i, backtest_id in enumerate(ids):
+                outcome = outcomes[i]
+                if isinstance(outcome, RunCancelled) or controls[i].cancelled:
+                    outcomes[i] = outcome if isinstance(outcome, RunCancelled) else RunCancelled("Run cancelled")
+                    crud.update_backtest_status(db, backtest_id, "cancelled", str(outcomes[i]))
+                    statuses.append("cancelled")
+                    continue
+                if not isinstance(outcome, Exception):
+                    try:
+                        crud.store_backtest_results(db, backtest_id, outcome)
+                        crud.update_backtest_status(db, backtest_id, "completed")
+                    except Exception as e:
+                        db.rollback()
+                        outcomes[i] = outcome = e
+                if isinstance(outcome, Exception):
+                    crud.update_backtest_status(db, backtest_id, "failed", str(outcome))
+                    statuses.append("failed")
+                else:
+                    result_cache.cache_results(db, backtest_id)
+                    statuses.append("completed")
+    finally:
+        for backtest_id in ids:
+            _run_controls.pop(backtest_id, None)
+    
+    for backtest_id, status, outcome in zip(ids, statuses, outcomes):
+        if status == "completed":
+            events.publish(backtest_id, "completed", "completed", bars_processed=len(block), bars_total=len(block))
+        else:
+            events.publish(backtest_id, status, status, message=str(outcome))
+    
+    completed = [i for i, status in enumerate(statuses) if status == "completed"]
+    equity, table = comparison_table(block.dates, [outcomes[i] for i in completed], request.initial_cash)
+    metrics = dict(zip(completed, table))
+    
+    return schemas.BacktestCompareResponse(
+        group_id=group_id,
+        ticker=request.ticker,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        dates=block.dates.astype('datetime64[D]').tolist(),
+        rows=[
+            schemas.ComparisonRow(
+                backtest_id=backtest_id,
+                label=labels[i],
+                strategy_type=configs[i]["strategy_type"],
+                strategy_params=configs[i]["strategy_params"],
+                status=statuses[i],
+                message=str(outcomes[i]) if statuses[i] != "completed" else None,
+                metrics=metrics.get(i, {})
+            ) for i, backtest_id in enumerate(ids)
+        ],
+        equity_curves={labels[i]: curve for i, curve in zip(completed, equity.tolist())}
+    )
+
+def _store_run(backtest_id: int, results: dict, profile=None):
+    """Store a finished run, its profile and cached response in one background session"""
+    with background_session() as db:
+        crud.store_backtest_results(db, backtest_id, results)
+        if profile is not None:
+            crud.store_backtest_profile(db, backtest_id, profile.stats, profile.wall_seconds, profile.total_calls)
+        crud.update_backtest_status(db, backtest_id, "completed")
+        result_cache.cache_results(db, backtest_id)
+
+async def execute_backtest(backtest_id: int, request: schemas.BacktestRunRequest,
+                           control: Optional[RunControl] = None):
+    """
+    Execute backtest asynchronously
+
+    Runs after the request's session is closed, so each DB stage uses its own
+    short-lived session from the background pool and no connection is held
+    while Cerebro runs. ``control`` carries throttled bar progress out of the
+    run (published as events) and the cancellation flag into it.
+    """
+    from ..core.backtest_engine import run_backtest
+    from ..services.yfinance_client import fetch_price_data
+
+    control = control or RunControl()
+    _run_controls[backtest_id] = control
+    control.on_progress = lambda progress: events.publish(backtest_id, "running", "running", **progress)
+    try:
+        events.publish(backtest_id, "running", "loading_data")
+        df = await fetch_price_data(request.ticker, request.start_date, request.end_date, background_session)
         
         if df is None or df.empty:
-            crud.update_backtest_status(db, backtest_id, "failed", "No data found")
+            with background_session() as db:
+                crud.update_backtest_status(db, backtest_id, "failed", "No data found")
+            events.publish(backtest_id, "failed", "loading_data", message="No data found")
             return
         
-        
-        results = run_backtest(
+        if control.cancelled:
+            raise RunCancelled("Run cancelled before it started")
+        control.bars_total = len(df)
+        events.publish(backtest_id, "running", "running", bars_processed=0, bars_total=len(df))
+        run = partial(
+            run_backtest,
             df, 
             request.strategy_type, 
             request.strategy_params,
             request.initial_cash,
-            request.commission
+            request.commission,
+            analyzers=[analyzer.value for analyzer in request.analyzers],
+            engine_profile=request.engine_profile.model_dump(mode="json"),
+            run_control=control
         )
+        # In a worker thread so the loop keeps serving (and coalescing) requests;
+        # the profiler is only involved when the request asks for it
+        profile = None
+        if request.profile:
+            from ..core.profiling import profile_call
+            results, profile = await asyncio.to_thread(profile_call, run)
+        else:
+            results = await asyncio.to_thread(run)
         
+        events.publish(backtest_id, "running", "storing", bars_processed=len(df), bars_total=len(df))
+        # Inserts and the JSON/gzip serialization are blocking too
+        await asyncio.to_thread(_store_run, backtest_id, results, profile)
+        events.publish(backtest_id, "completed", "completed", bars_processed=len(df), bars_total=len(df))
         
-        crud.store_backtest_results(db, backtest_id, results)
-        crud.update_backtest_status(db, backtest_id, "completed")
-        
+    except RunCancelled as e:
+        with background_session() as db:
+            crud.update_backtest_status(db, backtest_id, "cancelled", str(e))
+        events.publish(backtest_id, "cancelled", "cancelled", message=str(e), **control.progress())
     except Exception as e:
-        crud.update_backtest_status(db, backtest_id, "failed", str(e))
+        with background_session() as db:
+            crud.update_backtest_status(db, backtest_id, "failed", str(e))
+        events.publish(backtest_id, "failed", "failed", message=str(e))
+    finally:
+        _run_controls.pop(backtest_id, None)
 
-@router.get('/backtests/{backtest_id}/results', response_model=schemas.BacktestResultResponse)
-def get_backtest_results(backtest_id: int, db: Session = Depends(get_db)):
-    backtest = crud.get_backtest_with_results(db, backtest_id)
-    
-    if not backtest:
+def _sse(event: dict) -> str:
+    return f"event: status\ndata: {json.dumps(event, default=str)}\n\n"
+
+async def _event_stream(backtest_id: int, queue: asyncio.Queue, current: dict):
+    try:
+        yield _sse(current)
+        event = current
+        while event['status'] not in events.TERMINAL_STATUSES:
+            try:
+                event = await asyncio.wait_for(queue.get(), config.EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield _sse(event)
+    finally:
+        events.bus.unsubscribe(backtest_id, queue)
+
+def _current_event(backtest_id: int, db: Session) -> dict:
+    """Último evento em memória, ou o status salvo; libera a conexão logo após a leitura"""
+    stored = crud.get_backtest_status(db, backtest_id)
+    db.close()
+    if stored is None:
+        raise HTTPException(404, "Backtest not found")
+    latest = events.bus.latest(backtest_id)
+    if latest is None or stored.status in events.TERMINAL_STATUSES:
+        return {'backtest_id': backtest_id, 'status': stored.status, 'message': stored.message}
+    return latest
+
+@router.get('/backtests/{backtest_id}/events')
+async def stream_backtest_events(backtest_id: int, db: Session = Depends(get_db)):
+    """Server-Sent Events com transições de status e progresso até o fim do run"""
+    # Assinar antes de ler o status: nenhum evento se perde entre os dois
+    queue = events.bus.subscribe(backtest_id)
+    try:
+        current = _current_event(backtest_id, db)
+    except HTTPException:
+        events.bus.unsubscribe(backtest_id, queue)
+        raise
+    return StreamingResponse(
+        _event_stream(backtest_id, queue, current),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get('/backtests/{backtest_id}/status', response_model=schemas.BacktestStatusEvent)
+async def get_backtest_status(
+    backtest_id: int,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to hold the request for the next event (long-poll)"),
+    db: Session = Depends(get_db)
+):
+    """Status atual; com ``wait`` responde no próximo evento ou ao fim da espera"""
+    queue = events.bus.subscribe(backtest_id)
+    try:
+        current = _current_event(backtest_id, db)
+        if wait and current['status'] not in events.TERMINAL_STATUSES:
+            try:
+                current = await asyncio.wait_for(queue.get(), wait)
+            except asyncio.TimeoutError:
+                pass
+        return schemas.BacktestStatusEvent(**current)
+    finally:
+        events.bus.unsubscribe(backtest_id, queue)
+
+@router.post('/backtests/{backtest_id}/cancel', response_model=schemas.BacktestStatusEvent)
+def cancel_backtest(backtest_id: int, db: Session = Depends(get_db)):
+    """Pedir o cancelamento de um backtest em andamento"""
+    stored = crud.get_backtest_status(db, backtest_id)
+    if stored is None:
         raise HTTPException(404, "Backtest not found")
+    if stored.status in events.TERMINAL_STATUSES:
+        raise HTTPException(409, f"Backtest already {stored.status}")
     
-    if backtest.status != "completed":
-        raise HTTPException(400, f"Backtest status: {backtest.status}")
-    
-    
-    daily_positions = calculate_drawdown_series([pos.equity for pos in backtest.daily_positions])
-    
-    return schemas.BacktestResultResponse(
-        backtest_id=backtest.id,
-        metrics=schemas.MetricsInfo(
-            total_return=backtest.metrics.total_return,
-            sharpe=backtest.metrics.sharpe,
-            max_drawdown=backtest.metrics.max_drawdown,
-            win_rate=backtest.metrics.win_rate,
-            avg_trade_return=backtest.metrics.avg_trade_return
-        ),
-        trades=[
-            schemas.TradeInfo(
-                date=trade.date,
-                side=trade.side,
-                price=trade.price,
-                size=trade.size,
-                commission=trade.commission,
-                pnl=trade.pnl
-            ) for trade in backtest.trades
-        ],
-        daily_positions=[
-            schemas.DailyPositionInfo(
-                date=pos.date,
-                position_size=pos.position_size,
-                cash=pos.cash,
-                equity=pos.equity,
-                drawdown=daily_positions[i]
-            ) for i, pos in enumerate(backtest.daily_positions)
-        ],
-        equity_curve=[
-            {"date": pos.date.isoformat(), "equity": pos.equity}
-            for pos in backtest.daily_positions
-        ]
+    # Single process and no live run here: nothing will ever finish it
+    if config.EVENTS_BACKEND != 'postgres' and backtest_id not in _run_controls:
+        message = "Cancelled; no active run"
+        crud.update_backtest_status(db, backtest_id, "cancelled", message)
+        events.publish(backtest_id, "cancelled", "cancelled", message=message)
+        return schemas.BacktestStatusEvent(backtest_id=backtest_id, status="cancelled", message=message)
+    
+    # The worker running it stops at its next bar and records "cancelled"
+    events.publish(backtest_id, "running", "cancelling")
+    return schemas.BacktestStatusEvent(backtest_id=backtest_id, status="running", stage="cancelling")
+
+def _etag_header(payload: result_cache.CachedPayload, encoding: Optional[str]) -> str:
+    # Strong ETags are per representation: the gzip body gets its own tag
+    return f'"{payload.etag}-{encoding}"' if encoding else f'"{payload.etag}"'
+
+def _etag_matches(if_none_match: Optional[str], payload: result_cache.CachedPayload) -> bool:
+    """If-None-Match usa comparação fraca: qualquer representação do mesmo JSON vale"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        tag = tag[2:] if tag.startswith('W/') else tag
+        if tag.strip('"') in (payload.etag, f"{payload.etag}-{payload.encoding}"):
+            return True
+    return False
+
+def _accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """Accept-Encoding aceita ``encoding`` (por nome ou ``*``) com q > 0"""
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted.get(encoding, accepted.get('*', 0.0)) > 0
+
+@router.get('/backtests/{backtest_id}/results', response_model=schemas.BacktestResultResponse,
+            responses={304: {"description": "Not Modified (If-None-Match)"}})
+def get_backtest_results(
+    backtest_id: int,
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """Resultados de um backtest concluído, servidos do payload cacheado (ETag/304, gzip)"""
+    payload = result_cache.get_payload(db, backtest_id)
+    if payload is None:
+        backtest = crud.get_backtest_with_results(db, backtest_id)
+        
+        if not backtest:
+            raise HTTPException(404, "Backtest not found")
+        
+        if backtest.status != "completed":
+            raise HTTPException(400, f"Backtest status: {backtest.status}")
+        
+        payload = result_cache.cache_backtest(db, backtest)
+    
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    encoded = _accepts_encoding(accept_encoding, payload.encoding)
+    headers["ETag"] = _etag_header(payload, payload.encoding if encoded else None)
+    if _etag_matches(if_none_match, payload):
+        return Response(status_code=304, headers=headers)
+    
+    if encoded:
+        headers["Content-Encoding"] = payload.encoding
+        return Response(payload.body, media_type="application/json", headers=headers)
+    return Response(gzip.decompress(payload.body), media_type="application/json", headers=headers)
+
+@router.get('/backtests/{backtest_id}/profile', response_model=schemas.BacktestProfileResponse)
+def get_backtest_profile(
+    backtest_id: int,
+    limit: int = Query(25, ge=1, le=500),
+    sort: str = Query('cumulative', pattern='^(cumulative|tottime|calls)$'),
+    db: Session = Depends(get_db)
+):
+    """Funções mais caras do run perfilado (profile=true no POST /backtests/run)"""
+    from ..core.profiling import top_functions
+
+    profile = crud.get_backtest_profile(db, backtest_id)
+    if profile is None:
+        raise HTTPException(404, "Profile not found")
+    
+    return schemas.BacktestProfileResponse(
+        backtest_id=backtest_id,
+        wall_seconds=profile.wall_seconds,
+        total_calls=profile.total_calls,
+        sort=sort,
+        functions=top_functions(profile.stats, limit, sort)
     )
 
+@router.get('/backtests/{backtest_id}/profile/pstats')
+def download_backtest_profile(backtest_id: int, db: Session = Depends(get_db)):
+    """Dados completos do pstats, para abrir com pstats.Stats(arquivo) ou snakeviz"""
+    profile = crud.get_backtest_profile(db, backtest_id)
+    if profile is None:
+        raise HTTPException(404, "Profile not found")
+    
+    return Response(profile.stats, media_type="application/octet-stream", headers={
+        "Content-Disposition": f'attachment; filename="backtest_{backtest_id}.prof"'
+    })
+
 @router.get('/backtests', response_model=schemas.BacktestListResponse)
 def list_backtests(
     page: int = Query(1, ge=1),
@@ -152,7 +530,8 @@ def list_backtests(
                 strategy_type=bt.strategy_type,
                 start_date=bt.start_date,
                 end_date=bt.end_date,
-                status=bt.status
+                status=bt.status,
+                message=bt.message
             ) for bt in backtests
         ],
         total=total,
@@ -166,6 +545,8 @@ async def update_indicators(
     db: Session = Depends(get_db)
 ):
     """Forçar atualização de indicadores para um ticker"""
+    from ..services.yfinance_client import download_and_store_data
+
     try:
         
         end_date = datetime.now().date()
@@ -192,3 +573,22 @@ async def update_indicators(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post('/backtests/refresh')
+async def refresh_backtests(
+    request: schemas.BacktestRefreshRequest,
+    db: Session = Depends(get_db)
+):
+    """Estender backtests concluídos de um ticker até a última barra disponível"""
+    from ..services.backtest_refresh import refresh_backtests_for_ticker
+
+    try:
+        counts = await refresh_backtests_for_ticker(request.ticker, db)
+        
+        return {
+            "status": "success",
+            "ticker": request.ticker,
+            **counts
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
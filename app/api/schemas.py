@@ -1,24 +1,143 @@
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional, Dict, List, Any
 from datetime import date, datetime
 from enum import Enum
 
-class StrategyType(str, Enum):
-    SMA_CROSS = "sma_cross"
-    DONCHIAN_BREAKOUT = "donchian_breakout"
-    MOMENTUM = "momentum"
-    
+from ..core.strategy_registry import available_strategies, get_param_schema, validate_strategy_params
+from ..services.single_flight import canonical_key
+
+def normalize_ticker(cls, value: str) -> str:
+    """Ticker como gravado e usado nas chaves: sem espaços, em maiúsculas"""
+    value = value.strip().upper()
+    if not value:
+        raise ValueError("Ticker must not be empty")
+    return value
+
+def check_strategy_type(cls, value: str) -> str:
+    """Estratégia registrada (built-in ou plugin)"""
+    if value not in available_strategies():
+        raise ValueError(f"Unknown strategy type: {value}")
+    return value
+
+def check_strategy_params(self):
+    """Parâmetros validados e convertidos pelo schema da estratégia"""
+    self.strategy_params = validate_strategy_params(self.strategy_type, self.strategy_params)
+    return self
+
+class AnalyzerType(str, Enum):
+    SHARPE = "sharpe"
+    DRAWDOWN = "drawdown"
+    TRADES = "trades"
+    RETURNS = "returns"
+
+class ObserverType(str, Enum):
+    BROKER = "broker"
+    CASH = "cash"
+    VALUE = "value"
+    TRADES = "trades"
+    BUYSELL = "buysell"
+    DRAWDOWN = "drawdown"
+
+class EngineProfile(BaseModel):
+    preload: bool = True
+    runonce: bool = True
+    exactbars: int = Field(default=0, ge=-2, le=1, description="Backtrader memory-saving mode (0 keeps all bars)")
+    stdstats: bool = False
+    observers: List[ObserverType] = Field(default_factory=list)
+    precompute_signals: bool = Field(
+        default=False,
+        description="Feed vectorised entry/exit signals instead of per-bar indicators (strategies that support it)"
+    )
+
 
 class BacktestRunRequest(BaseModel):
     ticker: str = Field(..., description="Ticker symbol (e.g., PETR4.SA)")
     start_date: date
     end_date: date
-    strategy_type: StrategyType
+    strategy_type: str = Field(..., description="Registered strategy name (see GET /strategies)")
     strategy_params: Optional[Dict[str, Any]] = Field(default_factory=dict)
     initial_cash: float = Field(default=100000.0, gt=0)
     commission: float = Field(default=0.001, ge=0)
     timeframe: str = Field(default="1d")
+    analyzers: List[AnalyzerType] = Field(
+        default_factory=list,
+        description="Backtrader analyzers to attach; metrics are derived from the equity curve when empty"
+    )
+    engine_profile: EngineProfile = Field(default_factory=EngineProfile)
+    profile: bool = Field(
+        default=False,
+        description="Run under cProfile and store the stats (see GET /backtests/{id}/profile)"
+    )
+
+    _normalize_ticker = field_validator('ticker')(normalize_ticker)
+    _check_strategy_type = field_validator('strategy_type')(check_strategy_type)
+    _check_strategy_params = model_validator(mode='after')(check_strategy_params)
+
+    def canonical_key(self) -> str:
+        """Chave de coalescing: requisições equivalentes (defaults explícitos ou não) têm a mesma chave"""
+        params = {name: info['default'] for name, info in get_param_schema(self.strategy_type).items()}
+        params.update(self.strategy_params or {})
+        return canonical_key(
+            self.ticker, self.start_date, self.end_date, self.strategy_type, params,
+            self.initial_cash, self.commission, self.timeframe,
+            sorted(analyzer.value for analyzer in self.analyzers),
+            self.engine_profile.model_dump(mode="json"), self.profile,
+        )
+
+class StrategyConfig(BaseModel):
+    strategy_type: str = Field(..., description="Registered strategy name (see GET /strategies)")
+    strategy_params: Optional[Dict[str, Any]] = Field(default_factory=dict)
+    label: Optional[str] = Field(default=None, description="Row name in the comparison (defaults to strategy_type)")
+    engine_profile: EngineProfile = Field(default_factory=EngineProfile)
+
+    _check_strategy_type = field_validator('strategy_type')(check_strategy_type)
+    _check_strategy_params = model_validator(mode='after')(check_strategy_params)
+
+class BacktestCompareRequest(BaseModel):
+    ticker: str = Field(..., description="Ticker symbol (e.g., PETR4.SA)")
+    start_date: date
+    end_date: date
+    initial_cash: float = Field(default=100000.0, gt=0)
+    commission: float = Field(default=0.001, ge=0)
+    strategies: List[StrategyConfig] = Field(..., min_length=1, max_length=20)
+
+    _normalize_ticker = field_validator('ticker')(normalize_ticker)
+
+    def labels(self) -> List[str]:
+        """Nomes únicos das linhas: label ou strategy_type, com sufixo #n em repetições"""
+        labels, seen = [], {}
+        for config in self.strategies:
+            base = config.label or config.strategy_type
+            seen[base] = seen.get(base, 0) + 1
+            labels.append(base if seen[base] == 1 else f"{base}#{seen[base]}")
+        return labels
+
+class ComparisonRow(BaseModel):
+    backtest_id: int
+    label: str
+    strategy_type: str
+    strategy_params: Dict[str, Any]
+    status: str
+    message: Optional[str] = None
+    metrics: Dict[str, Optional[float]] = Field(default_factory=dict)
+
+class BacktestCompareResponse(BaseModel):
+    group_id: int
+    ticker: str
+    start_date: date
+    end_date: date
+    dates: List[date] = Field(default_factory=list, description="Shared date axis of equity_curves")
+    rows: List[ComparisonRow]
+    equity_curves: Dict[str, List[float]] = Field(default_factory=dict, description="Label -> equity per date")
+
+class StrategyParamInfo(BaseModel):
+    default: Any
+    type: str
+
+class StrategyInfo(BaseModel):
+    name: str
+    params: Dict[str, StrategyParamInfo]
 
 class TradeInfo(BaseModel):
     date: date
@@ -41,10 +160,21 @@ class MetricsInfo(BaseModel):
     max_drawdown: float
     win_rate: Optional[float]
     avg_trade_return: Optional[float]
+    extra: Dict[str, Any] = Field(default_factory=dict)
 
 class BacktestRunResponse(BaseModel):
     id: int
     status: str
+    coalesced: bool = Field(default=False, description="True when attached to an identical run already in flight")
+
+class BacktestStatusEvent(BaseModel):
+    backtest_id: int
+    status: str
+    stage: Optional[str] = None
+    bars_processed: Optional[int] = None
+    bars_total: Optional[int] = None
+    elapsed_seconds: Optional[float] = None
+    message: Optional[str] = None
 
 class BacktestResultResponse(BaseModel):
     backtest_id: int
@@ -53,6 +183,20 @@ class BacktestResultResponse(BaseModel):
     daily_positions: List[DailyPositionInfo]
     equity_curve: List[Dict[str, Any]]
 
+class ProfileFunction(BaseModel):
+    function: str
+    primitive_calls: int
+    calls: int
+    tottime: float
+    cumtime: float
+
+class BacktestProfileResponse(BaseModel):
+    backtest_id: int
+    wall_seconds: float
+    total_calls: int
+    sort: str
+    functions: List[ProfileFunction]
+
 class BacktestListItem(BaseModel):
     id: int
     created_at: datetime
@@ -61,6 +205,7 @@ class BacktestListItem(BaseModel):
     start_date: date
     end_date: date
     status: str
+    message: Optional[str] = None
 
 class BacktestListResponse(BaseModel):
     items: List[BacktestListItem]
@@ -71,7 +216,23 @@ class BacktestListResponse(BaseModel):
 class IndicatorUpdateRequest(BaseModel):
     ticker: str
 
+    _normalize_ticker = field_validator('ticker')(normalize_ticker)
+
+class BacktestRefreshRequest(BaseModel):
+    ticker: str
+
+    _normalize_ticker = field_validator('ticker')(normalize_ticker)
+
 class HealthResponse(BaseModel):
     status: str
     database: str
     timestamp: datetime
+    pools: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+
+class EngineModeSupport(BaseModel):
+    supported: bool
+    detail: Optional[str] = None
+
+class EngineCompatibilityResponse(BaseModel):
+    modes: Dict[str, Dict[str, Any]]
+    strategies: Dict[str, Dict[str, EngineModeSupport]]
@@ -0,0 +1,165 @@
+"""
+Backtrader feed over column arrays instead of a DataFrame.
+
+``ArrayData`` reads its lines from a mapping of equal-length 1-D arrays:
+``'datetime'`` as int64 nanoseconds since 1970-01-01 (or datetime64) and
+``'open'`` ... ``'volume'`` plus any extra lines as float64. The arrays may
+be views over a DataFrame (``frame_arrays``), ``.npy`` memmaps
+(``save_arrays``/``open_arrays``) or a shared-memory block
+(``to_shared_memory``/``attach_shared_arrays``); they are never copied into
+a DataFrame.
+"""
+import array
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple, Union
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from backtrader.linebuffer import LineBuffer
+
+# Provider frame column of each OHLCV line
+FRAME_COLUMNS = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+
+# bt.date2num counts days from 0001-01-01 (day 1); this is 1970-01-01
+_EPOCH_ORDINAL = 719163.0
+_NS_PER_DAY = 86_400 * 10**9
+
+# Shared-memory layout: column -> (dtype str, byte offset, length)
+Layout = Dict[str, Tuple[str, int, int]]
+
+def datetime_to_num(dates) -> np.ndarray:
+    """Vectorised bt.date2num of int64 ns since epoch (UTC) or datetime64 dates"""
+    ns = np.asarray(dates)
+    if ns.dtype.kind == 'M':
+        ns = ns.astype('datetime64[ns]').view(np.int64)
+    days, remainder = np.divmod(ns.astype(np.int64, copy=False), _NS_PER_DAY)
+    return (days + _EPOCH_ORDINAL) + remainder / _NS_PER_DAY
+
+def frame_arrays(df: pd.DataFrame, extra: Optional[pd.DataFrame] = None) -> Dict[str, np.ndarray]:
+    """
+    Feed arrays of an OHLCV frame (and extra line columns aligned with it).
+    Columns already stored as float64 are returned as views, not copies.
+    """
+    arrays = {'datetime': pd.DatetimeIndex(df.index).asi8}
+    for line, column in FRAME_COLUMNS.items():
+        arrays[line] = df[column].to_numpy(dtype=np.float64)
+    if extra is not None:
+        for column in extra.columns:
+            arrays[column] = extra[column].to_numpy(dtype=np.float64)
+    return arrays
+
+def save_arrays(directory: Union[str, Path], arrays: Mapping[str, np.ndarray]) -> Path:
+    """Write one ``<line>.npy`` per array so open_arrays can memory-map them"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(directory / f"{name}.npy", np.ascontiguousarray(values))
+    return directory
+
+def open_arrays(directory: Union[str, Path], mmap_mode: str = 'r') -> Dict[str, np.ndarray]:
+    """Memory-map the arrays written by save_arrays"""
+    return {path.stem: np.load(path, mmap_mode=mmap_mode) for path in sorted(Path(directory).glob('*.npy'))}
+
+def to_shared_memory(arrays: Mapping[str, np.ndarray],
+                     name: Optional[str] = None) -> Tuple[shared_memory.SharedMemory, Layout]:
+    """
+    Copy arrays into one new shared-memory block. Returns the block and the
+    layout other processes pass to attach_shared_arrays with its name; the
+    caller owns the block (``close()`` and ``unlink()``).
+    """
+    layout, offset = {}, 0
+    for column, values in arrays.items():
+        values = np.asarray(values)
+        offset += -offset % values.dtype.alignment
+        layout[column] = (values.dtype.str, offset, len(values))
+        offset += values.nbytes
+    block = shared_memory.SharedMemory(name=name, create=True, size=max(offset, 1))
+    for column, view in attach_shared_arrays(block, layout).items():
+        view[:] = arrays[column]
+    return block, layout
+
+def attach_shared_arrays(block: shared_memory.SharedMemory, layout: Layout) -> Dict[str, np.ndarray]:
+    """
+    Array views over a shared-memory block, e.g. ``SharedMemory(name=...)``
+    in a worker. Keep the block open while the views are in use and release
+    them before closing it.
+    """
+    return {
+        column: np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf, offset=offset)
+        for column, (dtype, offset, length) in layout.items()
+    }
+
+class ArrayData(bt.feed.DataBase):
+    """
+    Feed whose ``dataname`` maps line names to arrays (see module docstring).
+    Lines without an array (e.g. openinterest) stay NaN.
+
+    With preload, each line buffer is filled from its array in one C-level
+    copy; Backtrader keeps lines in ``array.array('d')`` so that copy is the
+    only one, and no Python code runs per bar. Filters, ``tzinput`` or a
+    bounded buffer (``exactbars``) use the per-bar ``_load`` instead, which
+    reads from lists built on first use.
+    """
+
+    def start(self):
+        super().start()
+        source = self.p.dataname
+        self._length = len(source['datetime'])
+        self._columns = []
+        for alias in self.lines.getlinealiases():
+            if alias == 'datetime':
+                values = datetime_to_num(source['datetime'])
+            elif alias in source:
+                values = source[alias]
+            else:
+                continue
+            if len(values) != self._length:
+                raise ValueError(f"Array '{alias}' has {len(values)} rows, expected {self._length}")
+            self._columns.append((getattr(self.lines, alias), values))
+        self._rows = None
+        self._idx = -1
+
+    def _bulk_loadable(self) -> bool:
+        if self._filters or self._ffilters or self._tzinput:
+            return False
+        return all(line.mode == LineBuffer.UnBounded for line in self.lines)
+
+    def preload(self):
+        if not self._bulk_loadable():
+            return super().preload()
+
+        dates = self.lines.datetime
+        numbers = next(values for line, values in self._columns if line is dates)
+        lo = int(np.searchsorted(numbers, self.fromdate, side='left'))
+        hi = int(np.searchsorted(numbers, self.todate, side='right'))
+        size = max(hi - lo, 0)
+
+        loaded = {id(line): values for line, values in self._columns}
+        for line in self.lines:
+            values = loaded.get(id(line))
+            if values is None:
+                values = np.full(size, np.nan)
+            else:
+                values = np.ascontiguousarray(values[lo:hi], dtype=np.float64)
+            buffer = array.array('d')
+            buffer.frombytes(memoryview(values).cast('B'))
+            line.array = buffer
+            line.lencount = size
+            line.idx = size - 1
+
+        # Everything is loaded: later next() calls must not replay via _load
+        self._idx = self._length
+        self._last()
+        self.home()
+
+    def _load(self):
+        if self._rows is None:
+            self._rows = [(line, np.asarray(values, dtype=np.float64).tolist()) for line, values in self._columns]
+        self._idx += 1
+        if self._idx >= self._length:
+            return False
+        for line, values in self._rows:
+            line[0] = values[self._idx]
+        return True
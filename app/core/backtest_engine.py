@@ -1,15 +1,23 @@
 import backtrader as bt
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Dict, Any, List
-from .strategies.sma_cross import SMAStrategy
-from .strategies.donchian import DonchianBreakoutStrategy
-from .strategies.momentum import MomentumStrategy
-
-STRATEGY_MAP = {
-    'sma_cross': SMAStrategy,  
-    'donchian_breakout': DonchianBreakoutStrategy,
-    'momentum': MomentumStrategy
+from typing import Dict, Any, List, Optional, Union
+from .array_feed import ArrayData, frame_arrays
+from .engine_profile import build_cerebro
+from .ohlcv import OHLCVBlock
+from .records import PositionBuffer, TradeRecord, as_position_buffer
+from .run_control import RunCancelled, RunControl
+from .signals import SIGNAL_COLUMNS
+from .strategy_registry import STRATEGY_MAP, get_strategy_class, validate_strategy_params
+from ..utils.metrics import annual_returns, annual_sharpe, calculate_metrics_batch, calculate_trade_stats
+
+# Analyzers are opt-in: by default metrics come from the recorded equity
+ANALYZER_MAP = {
+    'sharpe': bt.analyzers.SharpeRatio,
+    'drawdown': bt.analyzers.DrawDown,
+    'trades': bt.analyzers.TradeAnalyzer,
+    'returns': bt.analyzers.Returns,
 }
 
 class PandasData(bt.feeds.PandasData):
@@ -25,53 +33,218 @@ class PandasData(bt.feeds.PandasData):
         ('openinterest', -1),
     )
 
-def run_backtest(df: pd.DataFrame, strategy_type: str, strategy_params: Dict[str, Any], 
-                initial_cash: float = 100000.0, commission: float = 0.001) -> Dict[str, Any]:
+class SignalArrayData(ArrayData):
+    """ArrayData plus the precomputed signal lines (signals.SIGNAL_COLUMNS)"""
+    lines = SIGNAL_COLUMNS
+
+def _data_feed(data: Union[pd.DataFrame, OHLCVBlock], strategy_type: str, strategy_params: Dict[str, Any],
+               engine_profile: Optional[Dict[str, Any]]) -> ArrayData:
+    """Array feed over the OHLCV columns, plus signal lines when precompute_signals applies"""
+    if (engine_profile or {}).get('precompute_signals'):
+        df = data.frame() if isinstance(data, OHLCVBlock) else data
+        signals = get_strategy_class(strategy_type).signal_frame(df, strategy_params)
+        if signals is not None:
+            return SignalArrayData(dataname=frame_arrays(df, signals))
+    return ArrayData(dataname=data.feed_arrays() if isinstance(data, OHLCVBlock) else frame_arrays(data))
+
+def _to_builtin(value):
+    """Convert analyzer output (AutoOrderedDict, numpy scalars) to JSON-safe types"""
+    if isinstance(value, dict):
+        return {str(k): _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, (np.floating, float)):
+        value = float(value)
+        return None if np.isnan(value) else value
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+def compute_run_metrics(daily_positions: Union[PositionBuffer, List[dict]], trades: List[TradeRecord],
+                        initial_cash: float, first_bar=None) -> Dict[str, Any]:
     """
-    Run backtest using Backtrader
+    Derive all run metrics once from the recorded equity and trades.
+
+    ``sharpe`` and ``win_rate`` follow the Backtrader analyzers they replace
+    (SharpeRatio over yearly returns with a 1% risk free rate, TradeAnalyzer
+    counting the open trade and net PnL >= 0 as won), so they match runs
+    stored with the analyzers attached. ``first_bar`` is the feed's first
+    date: warmup years before the first strategy bar then count as flat
+    years, as they do for the analyzer.
     """
-    cerebro = bt.Cerebro()
-    
+    columns = as_position_buffer(daily_positions).array
+    equity = columns['equity']
+    positions = columns['position_size']
+    cash = columns['cash']
+
+    yearly = annual_returns(columns['date'], equity, initial_cash)
+    if first_bar is not None and len(columns):
+        flat_years = int(columns['date'][0].astype('datetime64[Y]').astype(int)
+                         - np.datetime64(first_bar, 'Y').astype(int))
+        yearly = np.concatenate((np.zeros(max(flat_years, 0)), yearly))
+    open_trades = int(len(positions) > 0 and positions[-1] != 0)
+
+    # Prepend the pre-warmup state so the first strategy bar has a return
+    equity = np.concatenate(([initial_cash], equity))
+    positions = np.concatenate(([0.0], positions))
+    cash = np.concatenate(([initial_cash], cash))
+
+    batch = calculate_metrics_batch(equity, positions=positions, cash=cash)
+    metrics = {name: _to_builtin(values[0]) for name, values in batch.items()}
+    metrics['sharpe'] = annual_sharpe(yearly)
+
+    pnls = np.fromiter((t['pnl'] for t in trades), dtype=np.float64, count=len(trades))
+    commissions = np.fromiter((t.get('commission') or 0.0 for t in trades), dtype=np.float64, count=len(trades))
+    metrics.update(calculate_trade_stats(pnls))
+    metrics['win_rate'] = float((pnls - commissions >= 0).sum()) / max(len(trades) + open_trades, 1)
+    metrics['total_trades'] = len(trades)
+    return metrics
+
+def _run_cerebro(df: Union[pd.DataFrame, OHLCVBlock], strategy_type: str, strategy_params: Dict[str, Any],
+                 initial_cash: float, commission: float, analyzers: List[str],
+                 engine_profile: Optional[Dict[str, Any]], run_control: Optional[RunControl] = None):
+    """Build Cerebro for one strategy/feed, run it and return (cerebro, strategy)"""
+    cerebro = build_cerebro(engine_profile)
+
     # Set up broker
     cerebro.broker.set_cash(initial_cash)
     cerebro.broker.setcommission(commission=commission)
-    
+
     # Add data feed
-    data = PandasData(dataname=df)
+    data = _data_feed(df, strategy_type, strategy_params, engine_profile)
     cerebro.adddata(data)
-    
+
     # Add strategy
-    strategy_class = STRATEGY_MAP.get(strategy_type)
-    if not strategy_class:
-        raise ValueError(f"Unknown strategy type: {strategy_type}")
-    
-    cerebro.addstrategy(strategy_class, **strategy_params)
-    
+    cerebro.addstrategy(get_strategy_class(strategy_type), **strategy_params, run_control=run_control)
+
     # Add analyzers
-    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
-    cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
-    
+    for name in analyzers:
+        cerebro.addanalyzer(ANALYZER_MAP[name], _name=name)
+
     # Run backtest
     results = cerebro.run()
-    strategy_instance = results[0]
-    
+    if run_control is not None and run_control.cancelled:
+        raise RunCancelled(f"Run cancelled after {run_control.bars_processed} of {len(df)} bars")
+    return cerebro, results[0]
+
+def run_backtest(df: Union[pd.DataFrame, OHLCVBlock], strategy_type: str, strategy_params: Dict[str, Any],
+                initial_cash: float = 100000.0, commission: float = 0.001,
+                analyzers: Optional[List[str]] = None,
+                engine_profile: Optional[Dict[str, Any]] = None,
+                run_control: Optional[RunControl] = None) -> Dict[str, Any]:
+    """
+    Run backtest using Backtrader
+
+    ``df`` is an OHLCV DataFrame or an ohlcv.OHLCVBlock; a block feeds the
+    engine straight from its arrays.
+
+    ``analyzers`` selects Backtrader analyzers by ANALYZER_MAP key. None of
+    them are attached by default; the metrics are then derived once from the
+    recorded equity array after the run, with the analyzers' definitions
+    (see compute_run_metrics). Selected analyzers override the matching
+    metric and their full output is returned under ``analyzers``.
+
+    ``engine_profile`` overrides Cerebro runtime settings (preload, runonce,
+    exactbars, stdstats, observers, precompute_signals); see
+    engine_profile.DEFAULT_ENGINE_PROFILE.
+
+    ``run_control`` receives throttled progress and can cancel the run from
+    another thread, in which case RunCancelled is raised.
+    """
+    analyzers = list(analyzers or [])
+    unknown = [name for name in analyzers if name not in ANALYZER_MAP]
+    if unknown:
+        raise ValueError(f"Unknown analyzers: {', '.join(unknown)}")
+    strategy_params = validate_strategy_params(strategy_type, strategy_params)
+
+    cerebro, strategy_instance = _run_cerebro(
+        df, strategy_type, strategy_params, initial_cash, commission, analyzers, engine_profile, run_control
+    )
+
     final_value = cerebro.broker.getvalue()
     total_return = (final_value - initial_cash) / initial_cash
-    
+
     # Extract metrics
-    sharpe = strategy_instance.analyzers.sharpe.get_analysis().get('sharperatio', None)
-    drawdown = strategy_instance.analyzers.drawdown.get_analysis()
-    trades_analysis = strategy_instance.analyzers.trades.get_analysis()
-    
+    first_bar = df.dates[0] if isinstance(df, OHLCVBlock) else df.index[0]
+    metrics = compute_run_metrics(strategy_instance.daily_positions,
+                                  strategy_instance.trades_list, initial_cash, first_bar)
+    analysis = {
+        name: _to_builtin(getattr(strategy_instance.analyzers, name).get_analysis())
+        for name in analyzers
+    }
+
+    sharpe = metrics['sharpe']
+    max_drawdown = metrics['max_drawdown'] or 0.0
+    win_rate = metrics['win_rate']
+    avg_trade_return = metrics['avg_trade_return']
+
+    if 'sharpe' in analysis:
+        sharpe = analysis['sharpe'].get('sharperatio', None)
+    if 'drawdown' in analysis:
+        max_drawdown = -analysis['drawdown'].get('max', {}).get('drawdown', 0) / 100
+    if 'trades' in analysis:
+        trades_analysis = analysis['trades']
+        win_rate = trades_analysis.get('won', {}).get('total', 0) / max(trades_analysis.get('total', {}).get('total', 1), 1)
+        avg_trade_return = trades_analysis.get('pnl', {}).get('gross', {}).get('average', 0)
+
+    extra_metrics = {
+        key: value for key, value in metrics.items()
+        if key not in ('total_return', 'sharpe', 'max_drawdown', 'win_rate', 'avg_trade_return')
+    }
+    if analysis:
+        extra_metrics['analyzers'] = analysis
+
     return {
         'final_cash': final_value,
         'total_return': total_return,
         'sharpe': sharpe,
-        'max_drawdown': drawdown.get('max', {}).get('drawdown', 0) / 100,
+        'max_drawdown': max_drawdown,
+        'trades': strategy_instance.trades_list,
+        'daily_positions': strategy_instance.daily_positions,
+        'win_rate': win_rate,
+        'avg_trade_return': avg_trade_return,
+        'extra_metrics': extra_metrics,
+        'snapshot': strategy_instance.snapshot
+    }
+
+def resume_backtest(df: pd.DataFrame, strategy_type: str, strategy_params: Dict[str, Any],
+                    snapshot: Dict[str, Any], commission: float = 0.001,
+                    engine_profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Continue a run from its end-of-run snapshot over the bars after it.
+
+    Only ``resume_warmup`` bars before the checkpoint are replayed (to rebuild
+    indicators, without trading or recording), so extending a run by N bars
+    costs O(N). Returns the new trades and daily positions, the final value
+    and a fresh snapshot. Raises ValueError when the data up to the
+    checkpoint no longer matches it and a full re-run is needed.
+    """
+    strategy_class = get_strategy_class(strategy_type)
+    strategy_params = validate_strategy_params(strategy_type, strategy_params)
+
+    checkpoint = pd.Timestamp(snapshot['date'])
+    history = df.loc[df.index <= checkpoint]
+    if (history.empty or history.index[-1].normalize() != checkpoint
+            or not np.isclose(float(history['Close'].iloc[-1]), snapshot['close'])):
+        raise ValueError(f"Data changed at or before checkpoint {snapshot['date']}; full re-run required")
+
+    new_bars = df.loc[df.index > checkpoint]
+    if new_bars.empty:
+        raise ValueError(f"No bars after checkpoint {snapshot['date']}")
+
+    warmup = strategy_class.resume_warmup(strategy_params)
+    feed_df = pd.concat([history.tail(warmup + 1), new_bars])
+
+    cerebro, strategy_instance = _run_cerebro(
+        feed_df, strategy_type, dict(strategy_params, resume_from=snapshot),
+        snapshot['cash'], commission, [], engine_profile
+    )
+
+    return {
+        'final_cash': cerebro.broker.getvalue(),
         'trades': strategy_instance.trades_list,
         'daily_positions': strategy_instance.daily_positions,
-        'win_rate': trades_analysis.get('won', {}).get('total', 0) / max(trades_analysis.get('total', {}).get('total', 1), 1),
-        'avg_trade_return': trades_analysis.get('pnl', {}).get('gross', {}).get('average', 0)
+        'snapshot': strategy_instance.snapshot
     }
@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Any
+
+from ..utils.metrics import calculate_metrics_batch
+from .backtest_engine import _to_builtin
+
+PANEL_FIELDS = ('Open', 'High', 'Low', 'Close')
+
+# Rebalance on the last trading day of each pandas period
+REBALANCE_FREQUENCIES = {'daily': None, 'weekly': 'W', 'monthly': 'M'}
+
+WEIGHTINGS = ('equal', 'inverse_atr')
+
+def roc_panel(close: np.ndarray, lookback: int) -> np.ndarray:
+    """Rate of change over ``lookback`` rows for every column (NaN while warming up)"""
+    roc = np.full(close.shape, np.nan)
+    if lookback < close.shape[0]:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roc[lookback:] = (close[lookback:] - close[:-lookback]) / close[:-lookback]
+    roc[~np.isfinite(roc)] = np.nan
+    return roc
+
+def atr_panel(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder ATR for every column, vectorised across tickers.
+
+    Each column is seeded with the mean of its first ``period`` true ranges,
+    so tickers listed later warm up independently. Missing bars carry the
+    previous value forward.
+    """
+    rows, cols = close.shape
+    prev_close = np.vstack([np.full((1, cols), np.nan), close[:-1]])
+    true_range = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+
+    out = np.full((rows, cols), np.nan)
+    atr = np.full(cols, np.nan)
+    count = np.zeros(cols, dtype=np.int64)
+    total = np.zeros(cols)
+    alpha = 1.0 / period
+    for t in range(rows):
+        tr = true_range[t]
+        valid = ~np.isnan(tr)
+        warming = valid & (count < period)
+        smoothing = valid & ~warming
+
+        total[warming] += tr[warming]
+        count[warming] += 1
+        seeded = warming & (count == period)
+        atr[seeded] = total[seeded] / period
+        atr[smoothing] = atr[smoothing] * (1.0 - alpha) + tr[smoothing] * alpha
+        out[t] = atr
+    return out
+
+def percentile_rank(scores: np.ndarray) -> np.ndarray:
+    """
+    Row-wise percentile rank in [0, 1] ignoring NaNs (NaN stays NaN).
+
+    Ranks come from a single stable ``argsort`` per row; ties are ordered by
+    column position.
+    """
+    scores = np.atleast_2d(scores)
+    rows, cols = scores.shape
+    order = np.argsort(scores, axis=1, kind='stable')  # NaNs sort last
+    ranks = np.empty((rows, cols))
+    ranks[np.arange(rows)[:, None], order] = np.arange(cols)
+
+    valid = ~np.isnan(scores)
+    counts = valid.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(counts > 1, ranks / (counts - 1), 1.0)
+    return np.where(valid, pct, np.nan)
+
+def rebalance_rows(index: pd.DatetimeIndex, frequency: str) -> np.ndarray:
+    """Row positions of each period's last bar, excluding the final bar (no next open)"""
+    if frequency not in REBALANCE_FREQUENCIES:
+        raise ValueError(f"Unknown rebalance frequency: {frequency}")
+    n = len(index)
+    if n < 2:
+        return np.empty(0, dtype=np.int64)
+    period = REBALANCE_FREQUENCIES[frequency]
+    if period is None:
+        return np.arange(n - 1)
+    periods = index.to_period(period).asi8
+    return np.flatnonzero(periods[:-1] != periods[1:])
+
+def synthetic_panel(tickers: int = 50, bars: int = 750, seed: int = 7) -> Dict[str, pd.DataFrame]:
+    """Deterministic random-walk universe (with staggered listings) for tests and benchmarks"""
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0.0003, 0.0004, tickers)
+    close = 100.0 * np.cumprod(1 + rng.normal(drift, 0.02, (bars, tickers)), axis=0)
+    open_ = close * (1 + rng.normal(0, 0.003, (bars, tickers)))
+
+    listed = rng.integers(0, bars // 4, tickers)
+    listed[: max(1, tickers // 2)] = 0
+    close[np.arange(bars)[:, None] < listed] = np.nan
+    open_[np.isnan(close)] = np.nan
+
+    index = pd.date_range('2000-01-03', periods=bars, freq='B')
+    columns = [f"T{i:04d}" for i in range(tickers)]
+    return {
+        'Open': pd.DataFrame(open_, index=index, columns=columns),
+        'High': pd.DataFrame(np.fmax(open_, close) * 1.01, index=index, columns=columns),
+        'Low': pd.DataFrame(np.fmin(open_, close) * 0.99, index=index, columns=columns),
+        'Close': pd.DataFrame(close, index=index, columns=columns),
+    }
+
+def run_cross_sectional_momentum(panel: Dict[str, pd.DataFrame], lookback: int = 60,
+                                 top_k: int = 20, percentile_threshold: float = 70,
+                                 rebalance: str = 'monthly', weighting: str = 'equal',
+                                 atr_period: int = 14, initial_cash: float = 100000.0,
+                                 commission: float = 0.001,
+                                 risk_free_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Top-K momentum portfolio over a dates × tickers panel.
+
+    On each rebalance bar every ticker's ROC is ranked against the universe;
+    tickers at or above ``percentile_threshold`` with a positive ROC are
+    eligible and the ``top_k`` strongest are held until the next rebalance.
+    As in the single-ticker engine, decisions use the close and trades fill
+    at the next open, in whole shares, paying ``commission`` on notional.
+    Each slot gets 1/top_k of equity (``equal``) or a share proportional to
+    close/ATR (``inverse_atr``); unused slots stay in cash. Held tickers
+    without an open on the fill bar trade at their last close.
+    """
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"Unknown weighting: {weighting}")
+    if top_k < 1 or lookback < 1 or atr_period < 1:
+        raise ValueError("top_k, lookback and atr_period must be positive")
+    if not 0 <= percentile_threshold <= 100:
+        raise ValueError("percentile_threshold must be in [0, 100]")
+
+    close_df = panel['Close']
+    index, tickers = close_df.index, list(close_df.columns)
+    if close_df.empty:
+        raise ValueError("Universe panel is empty")
+    open_, high, low, close = (
+        panel[field].reindex(index=index, columns=tickers).to_numpy(dtype=np.float64)
+        for field in PANEL_FIELDS
+    )
+    n_rows, n_cols = close.shape
+
+    roc = roc_panel(close, lookback)
+    atr = atr_panel(high, low, close, atr_period) if weighting == 'inverse_atr' else None
+    last_close = np.nan_to_num(close_df.ffill().to_numpy(dtype=np.float64))
+
+    rows = rebalance_rows(index, rebalance)
+    ranks = percentile_rank(roc[rows]) if len(rows) else np.empty((0, n_cols))
+
+    cash = float(initial_cash)
+    holdings = np.zeros(n_cols)
+    equity = np.full(n_rows, float(initial_cash))
+    held_count = np.zeros(n_rows)
+    traded_notional = 0.0
+    commission_paid = 0.0
+    rebalances = []
+
+    fills = rows + 1
+    for i, t in enumerate(rows):
+        fill = fills[i]
+        next_fill = fills[i + 1] if i + 1 < len(fills) else n_rows
+
+        eligible = (ranks[i] >= percentile_threshold / 100) & (roc[t] > 0) & np.isfinite(open_[fill])
+        if atr is not None:
+            eligible &= atr[t] > 0
+        selected = np.flatnonzero(eligible)
+        if len(selected) > top_k:
+            selected = selected[np.argsort(-roc[t, selected], kind='stable')[:top_k]]
+
+        weights = np.zeros(n_cols)
+        if len(selected):
+            if atr is None:
+                weights[selected] = 1.0 / top_k
+            else:
+                inverse = close[t, selected] / atr[t, selected]
+                weights[selected] = inverse / inverse.sum() * len(selected) / top_k
+
+        price = np.where(np.isfinite(open_[fill]), open_[fill], last_close[t])
+        value = cash + holdings @ price
+        target = np.zeros(n_cols)
+        target[selected] = np.floor(weights[selected] * value / price[selected])
+        delta = target - holdings
+
+        sells = np.minimum(delta, 0.0)
+        sold = -(sells @ price)
+        cash += sold - sold * commission
+
+        buys = np.maximum(delta, 0.0)
+        cost = (buys @ price) * (1 + commission)
+        if cost > cash:
+            buys = np.floor(buys * cash / cost)
+            cost = (buys @ price) * (1 + commission)
+        cash -= cost
+
+        holdings = holdings + sells + buys
+        bought = buys @ price
+        traded_notional += sold + bought
+        commission_paid += (sold + bought) * commission
+
+        equity[fill:next_fill] = cash + last_close[fill:next_fill] @ holdings
+        held_count[fill:next_fill] = np.count_nonzero(holdings)
+        rebalances.append({
+            'date': index[fill].date(),
+            'tickers': [tickers[j] for j in np.flatnonzero(holdings)],
+            'weights': {tickers[j]: float(weights[j]) for j in selected},
+            'equity': float(equity[fill]),
+        })
+
+    batch = calculate_metrics_batch(equity, positions=held_count,
+                                    risk_free_rate=risk_free_rate)
+    metrics = {name: _to_builtin(values[0]) for name, values in batch.items()}
+    years = (n_rows - 1) / 252
+    metrics['turnover'] = traded_notional / equity.mean() / years if years > 0 else None
+    metrics['commission_paid'] = commission_paid
+    metrics['rebalances'] = len(rebalances)
+
+    final_value = float(equity[-1])
+    headline = ('total_return', 'sharpe', 'max_drawdown')
+    return {
+        'final_cash': final_value,
+        'total_return': (final_value - initial_cash) / initial_cash,
+        'sharpe': metrics['sharpe'],
+        'max_drawdown': metrics['max_drawdown'] or 0.0,
+        'equity_curve': [
+            {'date': d.date(), 'equity': float(e)} for d, e in zip(index, equity)
+        ],
+        'rebalances': rebalances,
+        'extra_metrics': {k: v for k, v in metrics.items() if k not in headline},
+    }
@@ -0,0 +1,155 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+import threading
+from typing import Dict, Any, Optional
+
+# Cerebro runtime settings. stdstats is off because the API never plots.
+# precompute_signals feeds vectorised entry/exit lines to strategies that
+# support it (BaseStrategy.signal_frame) instead of per-bar indicators.
+DEFAULT_ENGINE_PROFILE = {
+    'preload': True,
+    'runonce': True,
+    'exactbars': 0,
+    'stdstats': False,
+    'observers': [],
+    'precompute_signals': False,
+}
+
+OBSERVER_MAP = {
+    'broker': bt.observers.Broker,
+    'cash': bt.observers.Cash,
+    'value': bt.observers.Value,
+    'trades': bt.observers.Trades,
+    'buysell': bt.observers.BuySell,
+    'drawdown': bt.observers.DrawDown,
+}
+
+# Modes probed by the compatibility check, as overrides of the default profile
+ENGINE_MODES = {
+    'default': {},
+    'stdstats': {'stdstats': True},
+    'no_runonce': {'runonce': False},
+    'no_preload': {'preload': False, 'runonce': False},
+    'exactbars_1': {'exactbars': 1},
+    'exactbars_-1': {'exactbars': -1},
+    'exactbars_-2': {'exactbars': -2},
+    'precomputed_signals': {'precompute_signals': True},
+}
+
+def resolve_engine_profile(engine_profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge overrides over DEFAULT_ENGINE_PROFILE and validate them"""
+    profile = dict(DEFAULT_ENGINE_PROFILE)
+    overrides = engine_profile or {}
+
+    unknown = set(overrides) - set(DEFAULT_ENGINE_PROFILE)
+    if unknown:
+        raise ValueError(f"Unknown engine profile options: {', '.join(sorted(unknown))}")
+    profile.update(overrides)
+
+    if profile['exactbars'] not in (-2, -1, 0, 1):
+        raise ValueError("exactbars must be one of -2, -1, 0, 1")
+    bad_observers = [name for name in profile['observers'] if name not in OBSERVER_MAP]
+    if bad_observers:
+        raise ValueError(f"Unknown observers: {', '.join(bad_observers)}")
+
+    return profile
+
+def build_cerebro(engine_profile: Optional[Dict[str, Any]] = None) -> bt.Cerebro:
+    """Create a Cerebro configured with the given engine profile"""
+    profile = resolve_engine_profile(engine_profile)
+    cerebro = bt.Cerebro(
+        preload=profile['preload'],
+        runonce=profile['runonce'],
+        exactbars=profile['exactbars'],
+        stdstats=profile['stdstats'],
+    )
+    for name in profile['observers']:
+        cerebro.addobserver(OBSERVER_MAP[name])
+    return cerebro
+
+def synthetic_ohlcv(bars: int = 750, seed: int = 7) -> pd.DataFrame:
+    """Deterministic random-walk OHLCV frame for probes and benchmarks"""
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.cumprod(1 + rng.normal(0.0004, 0.015, bars))
+    return pd.DataFrame({
+        'Open': close,
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': np.full(bars, 1000.0),
+    }, index=pd.date_range('2000-01-03', periods=bars, freq='B'))
+
+# Probe results per strategy class: a plugin registered later (or a name
+# re-registered with another class) is probed when first asked about
+_compatibility: Dict[type, Dict[str, Dict[str, Any]]] = {}
+_compatibility_lock = threading.Lock()
+
+def _probe_strategy(strategy_type: str) -> Dict[str, Dict[str, Any]]:
+    from .backtest_engine import run_backtest
+
+    df = synthetic_ohlcv()
+    reference = run_backtest(df, strategy_type, {}, engine_profile=ENGINE_MODES['default'])
+    report = {}
+    for mode, overrides in ENGINE_MODES.items():
+        try:
+            result = reference if not overrides else run_backtest(df, strategy_type, {}, engine_profile=overrides)
+        except Exception as e:
+            report[mode] = {'supported': False, 'detail': f"{type(e).__name__}: {e}"}
+            continue
+
+        matches = (np.isclose(result['final_cash'], reference['final_cash'])
+                   and len(result['trades']) == len(reference['trades']))
+        report[mode] = {
+            'supported': bool(matches),
+            'detail': None if matches else "Results differ from the default profile",
+        }
+    return report
+
+def strategy_mode_compatibility(strategy_type: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Run one strategy under every ENGINE_MODES entry on synthetic data.
+
+    A mode is supported when it runs and reproduces the default mode's final
+    value and trade count. Lookbacks such as ``[-1]`` are what usually break
+    ``exactbars``, so this is checked by running rather than by inspection.
+    The probe takes a few hundred milliseconds per strategy; async callers
+    should run it in a thread.
+    """
+    from .strategy_registry import get_strategy_class
+
+    strategy_class = get_strategy_class(strategy_type)
+    with _compatibility_lock:
+        if strategy_class not in _compatibility:
+            _compatibility[strategy_class] = _probe_strategy(strategy_type)
+        return _compatibility[strategy_class]
+
+def engine_mode_compatibility() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """strategy_mode_compatibility of every currently registered strategy"""
+    from .strategy_registry import available_strategies
+
+    return {strategy_type: strategy_mode_compatibility(strategy_type) for strategy_type in available_strategies()}
+
+def is_profile_supported(strategy_type: str, engine_profile: Optional[Dict[str, Any]] = None) -> bool:
+    """Check the exactbars/preload/runonce combination against the probe results"""
+    from .strategy_registry import available_strategies
+
+    profile = resolve_engine_profile(engine_profile)
+
+    modes = []
+    if profile['exactbars']:
+        modes.append(f"exactbars_{profile['exactbars']}")
+    if not profile['preload']:
+        modes.append('no_preload')
+    elif not profile['runonce']:
+        modes.append('no_runonce')
+    if profile['precompute_signals']:
+        modes.append('precomputed_signals')
+    if not modes:
+        return True
+
+    # Only non-default modes pay for the (cached) probe runs
+    if strategy_type not in available_strategies():
+        return False
+    report = strategy_mode_compatibility(strategy_type)
+    return all(report[mode]['supported'] for mode in modes)
@@ -0,0 +1,94 @@
+"""
+Import-cost report for API and worker start-up.
+
+    python -m app.core.import_report [--module app.main] [--top 15]
+
+Imports ``--module`` in a fresh interpreter with ``-X importtime`` and
+prints the slowest top-level packages (cumulative), total import time,
+resident memory and which heavy modules ended up loaded.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Modules that should only be imported when a backtest/download actually runs
+HEAVY_MODULES = ('backtrader', 'yfinance', 'pandas', 'numpy', 'numba', 'apscheduler')
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+def loaded_heavy_modules() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+def resident_memory_mb() -> float:
+    """Current RSS on Linux, peak RSS elsewhere"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def startup_report(import_seconds: float) -> Dict[str, object]:
+    """Fields logged once the app has started"""
+    return {
+        'import_seconds': round(import_seconds, 3),
+        'rss_mb': round(resident_memory_mb(), 1),
+        'heavy_modules': loaded_heavy_modules(),
+    }
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) for each ``-X importtime`` line"""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+def measure_import_costs(module: str = 'app.main') -> Dict[str, object]:
+    """Import ``module`` in a subprocess and summarise where the time went"""
+    probe = (f"import {module}, json; from app.core import import_report as r; "
+             f"print(json.dumps({{'rss_mb': r.resident_memory_mb(), 'heavy': r.loaded_heavy_modules()}}))")
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe],
+                          capture_output=True, text=True, env=os.environ.copy())
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = parse_importtime(proc.stderr)
+    packages: Dict[str, int] = {}
+    for name, _, cumulative_us, _ in rows:
+        # Outermost import of a package covers its submodules' cumulative time
+        top = name.split('.')[0]
+        packages[top] = max(packages.get(top, 0), cumulative_us)
+
+    target = next((cumulative for name, _, cumulative, _ in rows if name == module), 0)
+    stats = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {
+        'module': module,
+        'total_seconds': target / 1e6,
+        'rss_mb': stats['rss_mb'],
+        'heavy_modules': stats['heavy'],
+        'packages': sorted(packages.items(), key=lambda item: -item[1]),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--module', default='app.main')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    report = measure_import_costs(args.module)
+    print(f"import {report['module']}: {report['total_seconds']:.3f}s, RSS {report['rss_mb']:.1f} MiB")
+    print(f"heavy modules loaded: {', '.join(report['heavy_modules']) or 'none'}")
+    print(f"{'package':<30}{'cumulative ms':>15}")
+    for package, cumulative_us in report['packages'][:args.top]:
+        print(f"{package:<30}{cumulative_us / 1000:>15.1f}")
+
+if __name__ == '__main__':
+    main()
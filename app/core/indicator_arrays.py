@@ -0,0 +1,51 @@
+import hashlib
+import json
+from typing import Any, Mapping, Tuple, Union
+
+import numpy as np
+
+# On-disk layout of a packed series: little-endian days since 1970-01-01 and
+# float64 values, both in date order
+DATE_DTYPE = np.dtype('<i4')
+VALUE_DTYPE = np.dtype('<f8')
+
+def canonical_params(params: Union[Mapping[str, Any], str, None]) -> str:
+    """Params as compact JSON with sorted keys; accepts a dict or a JSON string"""
+    if isinstance(params, str):
+        params = json.loads(params) if params else {}
+    return json.dumps(dict(params or {}), sort_keys=True, separators=(',', ':'))
+
+def indicator_key(name: str, params: Union[Mapping[str, Any], str, None]) -> str:
+    """
+    Stable identity of an indicator: sha256 of its upper-cased name and
+    canonical params, so ``{"period": 20}`` and ``{ "period":20 }`` match.
+    """
+    payload = f"{name.upper()}:{canonical_params(params)}"
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def pack_series(dates, values) -> Tuple[bytes, bytes]:
+    """Pack date-sorted dates (anything datetime64-able) and values into blobs"""
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64).astype(DATE_DTYPE)
+    return days.tobytes(), np.asarray(values, dtype=VALUE_DTYPE).tobytes()
+
+def unpack_series(dates_blob: bytes, values_blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse of pack_series: (datetime64[D] dates, float64 values), zero-copy over the blobs"""
+    days = np.frombuffer(dates_blob, dtype=DATE_DTYPE)
+    return days.astype('datetime64[D]'), np.frombuffer(values_blob, dtype=VALUE_DTYPE)
+
+def merge_series(dates, values, new_dates, new_values) -> Tuple[np.ndarray, np.ndarray]:
+    """Union of two date-sorted series; on dates present in both the first one wins"""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    new_dates = np.asarray(new_dates, dtype='datetime64[D]')
+    keep = ~np.isin(new_dates, dates)
+    merged_dates = np.concatenate([dates, new_dates[keep]])
+    merged_values = np.concatenate([np.asarray(values, dtype=VALUE_DTYPE),
+                                    np.asarray(new_values, dtype=VALUE_DTYPE)[keep]])
+    order = np.argsort(merged_dates, kind='stable')
+    return merged_dates[order], merged_values[order]
+
+def slice_series(dates: np.ndarray, values: np.ndarray, start=None, end=None) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows with start <= date <= end (either bound optional), as views"""
+    lo = np.searchsorted(dates, np.datetime64(start, 'D'), side='left') if start is not None else 0
+    hi = np.searchsorted(dates, np.datetime64(end, 'D'), side='right') if end is not None else len(dates)
+    return dates[lo:hi], values[lo:hi]
@@ -0,0 +1,332 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Tuple
+
+from .backtest_engine import compute_run_metrics
+from .records import PositionBuffer, TradeRecord
+from .strategy_registry import get_param_schema, validate_strategy_params
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # the kernels still run (slowly) as plain Python
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Mirrors SMAStrategy/DonchianBreakoutStrategy/MomentumStrategy: the percentile
+# rank needs this many returns before the momentum strategy trades
+MOMENTUM_WINDOW = 252
+MOMENTUM_MIN_HISTORY = 60
+
+# ---------------------------------------------------------------------------
+# Indicators (same arithmetic as Backtrader's runonce implementations)
+# ---------------------------------------------------------------------------
+
+@njit(cache=True)
+def _sma(src, period):
+    """Simple moving average with a compensated window sum (Backtrader uses fsum)"""
+    n = src.shape[0]
+    out = np.full(n, np.nan)
+    for i in range(period - 1, n):
+        total = 0.0
+        comp = 0.0
+        for j in range(i - period + 1, i + 1):
+            value = src[j]
+            t = total + value
+            if abs(total) >= abs(value):
+                comp += (total - t) + value
+            else:
+                comp += (value - t) + total
+            total = t
+        out[i] = (total + comp) / period
+    return out
+
+@njit(cache=True)
+def _atr(high, low, close, period):
+    """Wilder ATR: SMA seed of the true range, then 1/period smoothing"""
+    n = close.shape[0]
+    tr = np.full(n, np.nan)
+    for i in range(1, n):
+        tr[i] = max(high[i], close[i - 1]) - min(low[i], close[i - 1])
+
+    out = np.full(n, np.nan)
+    if n <= period:
+        return out
+    out[period] = _sma(tr[1:period + 1], period)[period - 1]
+    alpha = 1.0 / period
+    alpha1 = 1.0 - alpha
+    for i in range(period + 1, n):
+        out[i] = out[i - 1] * alpha1 + tr[i] * alpha
+    return out
+
+@njit(cache=True)
+def _rolling_extreme(src, period, highest):
+    n = src.shape[0]
+    out = np.full(n, np.nan)
+    for i in range(period - 1, n):
+        value = src[i - period + 1]
+        for j in range(i - period + 2, i + 1):
+            if (src[j] > value) if highest else (src[j] < value):
+                value = src[j]
+        out[i] = value
+    return out
+
+# ---------------------------------------------------------------------------
+# Strategy kernels: (open, high, low, close, *params) -> (entries, exits, atr, start)
+#
+# ``start`` is the first bar Backtrader calls next() on (the strategy's
+# minimum period). Signals only depend on prices, never on the position, so
+# the path-dependent part (stops, sizing, fills) lives in _simulate.
+# ---------------------------------------------------------------------------
+
+@njit(cache=True)
+def _sma_cross_signals(open_, high, low, close, fast, slow, atr_period):
+    n = close.shape[0]
+    sma_fast = _sma(close, fast)
+    sma_slow = _sma(close, slow)
+    atr = _atr(high, low, close, atr_period)
+    entries = np.zeros(n, dtype=np.bool_)
+    exits = np.zeros(n, dtype=np.bool_)
+
+    # CrossOver compares against the last non-zero difference
+    first = max(fast, slow) - 1
+    nzd = np.nan
+    for i in range(max(first, 0), n):
+        diff = sma_fast[i] - sma_slow[i]
+        if i > first:
+            entries[i] = nzd < 0.0 and sma_fast[i] > sma_slow[i]
+            exits[i] = nzd > 0.0 and sma_fast[i] < sma_slow[i]
+        if diff != 0.0 or i == first:
+            nzd = diff
+    return entries, exits, atr, max(fast, slow, atr_period)
+
+@njit(cache=True)
+def _donchian_breakout_signals(open_, high, low, close, entry_period, exit_period, atr_period):
+    n = close.shape[0]
+    highest = _rolling_extreme(high, entry_period, True)
+    lowest = _rolling_extreme(low, exit_period, False)
+    atr = _atr(high, low, close, atr_period)
+    entries = np.zeros(n, dtype=np.bool_)
+    exits = np.zeros(n, dtype=np.bool_)
+    for i in range(1, n):
+        entries[i] = close[i] > highest[i - 1]
+        exits[i] = close[i] < lowest[i - 1]
+    return entries, exits, atr, max(entry_period - 1, exit_period - 1, atr_period)
+
+@njit(cache=True)
+def _momentum_signals(open_, high, low, close, lookback, percentile_threshold, atr_period):
+    n = close.shape[0]
+    atr = _atr(high, low, close, atr_period)
+    entries = np.zeros(n, dtype=np.bool_)
+    exits = np.zeros(n, dtype=np.bool_)
+    start = max(lookback, atr_period)
+
+    # Insertion-ordered ring buffer plus the same values kept sorted
+    window = np.empty(MOMENTUM_WINDOW)
+    ranked = np.empty(MOMENTUM_WINDOW)
+    count = 0
+    for i in range(start, n):
+        ret = (close[i] - close[i - lookback]) / close[i - lookback]
+        slot = (i - start) % MOMENTUM_WINDOW
+        if count == MOMENTUM_WINDOW:
+            old = np.searchsorted(ranked[:count], window[slot])
+            ranked[old:count - 1] = ranked[old + 1:count].copy()
+            count -= 1
+        pos = np.searchsorted(ranked[:count], ret)
+        ranked[pos + 1:count + 1] = ranked[pos:count].copy()
+        ranked[pos] = ret
+        window[slot] = ret
+        count += 1
+        if count < MOMENTUM_MIN_HISTORY:
+            continue
+        threshold = ranked[int(count * percentile_threshold / 100)]
+        entries[i] = ret > threshold and ret > 0
+        exits[i] = ret < 0
+    return entries, exits, atr, start
+
+# ---------------------------------------------------------------------------
+# Bar loop
+# ---------------------------------------------------------------------------
+
+@njit(cache=True)
+def _simulate(open_, close, entries, exits, atr, start, initial_cash, commission):
+    """
+    Replay BaseStrategy + BackBroker semantics over precomputed signals.
+
+    Market orders are sent on a bar's close and filled at the next open; a
+    buy is rejected (margin) if its cost plus commission exceeds cash either
+    at the order's creation price or at the fill price. Commission is
+    ``abs(size) * commission * price`` per side; entries are sized with
+    BaseStrategy.calculate_position_size and a 2*ATR stop.
+    """
+    n = close.shape[0]
+    bars = max(n - start, 0)
+    position_size = np.zeros(bars)
+    cash_curve = np.zeros(bars)
+    equity = np.zeros(bars)
+    trade_bar = np.zeros(bars // 2 + 1, dtype=np.int64)
+    trade_price = np.zeros(bars // 2 + 1)
+    trade_commission = np.zeros(bars // 2 + 1)
+    trade_pnl = np.zeros(bars // 2 + 1)
+
+    cash = initial_cash
+    position = 0.0
+    entry_price = 0.0
+    entry_commission = 0.0
+    stop_price = np.nan
+    pending = 0.0
+    created_price = 0.0
+    trades = 0
+
+    for i in range(start, n):
+        # Broker: fill the order sent on the previous bar at this open
+        if pending > 0.0:
+            check = cash - pending * created_price
+            check -= pending * commission * created_price
+            if check >= 0.0:
+                filled = cash - pending * open_[i]
+                comm = pending * commission * open_[i]
+                filled -= comm
+                if filled >= 0.0:
+                    cash = filled
+                    position = pending
+                    entry_price = open_[i]
+                    entry_commission = comm
+        elif pending < 0.0:
+            size = -pending
+            pnl = size * (open_[i] - entry_price) * 1.0
+            cash += size * entry_price + pnl
+            comm = size * commission * open_[i]
+            cash -= comm
+            trade_bar[trades] = i
+            trade_price[trades] = entry_price
+            trade_commission[trades] = entry_commission + comm
+            trade_pnl[trades] = pnl
+            trades += 1
+            position = 0.0
+        pending = 0.0
+
+        value = cash + position * close[i]
+        position_size[i - start] = position
+        cash_curve[i - start] = cash
+        equity[i - start] = value
+
+        # Strategy
+        if position == 0.0:
+            if entries[i]:
+                price = close[i]
+                stop = price - (2 * atr[i])
+                risk_per_share = abs(price - stop)
+                size = 0
+                if risk_per_share != 0:
+                    size = min(int(value * 0.01 / risk_per_share), int(cash / price))
+                if size > 0:
+                    pending = float(size)
+                    created_price = price
+                    stop_price = stop
+        elif exits[i] or close[i] <= stop_price:
+            pending = -position
+            stop_price = np.nan
+
+    final_value = cash + position * close[n - 1] if n else initial_cash
+    return (position_size, cash_curve, equity, trade_bar[:trades], trade_price[:trades],
+            trade_commission[:trades], trade_pnl[:trades], final_value)
+
+# strategy_type -> (signal kernel, kernel params); defaults come from the
+# registered Backtrader strategy's params
+JIT_STRATEGY_MAP = {
+    'sma_cross': (_sma_cross_signals, ('fast', 'slow', 'atr_period')),
+    'donchian_breakout': (_donchian_breakout_signals, ('entry_period', 'exit_period', 'atr_period')),
+    'momentum': (_momentum_signals, ('lookback', 'percentile_threshold', 'atr_period')),
+}
+
+def _kernel_params(strategy_type: str, strategy_params: Dict[str, Any]) -> Tuple:
+    if strategy_type not in JIT_STRATEGY_MAP:
+        raise ValueError(f"Unknown strategy type: {strategy_type}")
+    _, names = JIT_STRATEGY_MAP[strategy_type]
+
+    params = {name: spec['default'] for name, spec in get_param_schema(strategy_type).items()}
+    params.update(validate_strategy_params(strategy_type, strategy_params))
+    values = []
+    for name in names:
+        if name == 'percentile_threshold':
+            if not 0 <= params[name] < 100:
+                raise ValueError("percentile_threshold must be in [0, 100)")
+            values.append(float(params[name]))
+        else:
+            if int(params[name]) < 1:
+                raise ValueError(f"{name} must be a positive integer")
+            values.append(int(params[name]))
+    return tuple(values)
+
+def simulate_arrays(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                    strategy_type: str, strategy_params: Dict[str, Any],
+                    initial_cash: float = 100000.0, commission: float = 0.001) -> Dict[str, Any]:
+    """Run a strategy kernel and the bar loop on raw float64 arrays"""
+    params = _kernel_params(strategy_type, strategy_params)
+    signals, _ = JIT_STRATEGY_MAP[strategy_type]
+
+    arrays = [np.ascontiguousarray(a, dtype=np.float64) for a in (open_, high, low, close)]
+    entries, exits, atr, start = signals(*arrays, *params)
+    (position_size, cash, equity, trade_bar, trade_price,
+     trade_commission, trade_pnl, final_value) = _simulate(
+        arrays[0], arrays[3], entries, exits, atr, start, float(initial_cash), float(commission)
+    )
+    return {
+        'start': int(start),
+        'position_size': position_size,
+        'cash': cash,
+        'equity': equity,
+        'trade_bar': trade_bar,
+        'trade_price': trade_price,
+        'trade_commission': trade_commission,
+        'trade_pnl': trade_pnl,
+        'final_value': float(final_value),
+    }
+
+def run_backtest_jit(df: pd.DataFrame, strategy_type: str, strategy_params: Dict[str, Any],
+                     initial_cash: float = 100000.0, commission: float = 0.001) -> Dict[str, Any]:
+    """
+    Compiled equivalent of run_backtest for the built-in strategies.
+
+    Returns the same keys as run_backtest (trades and daily positions in the
+    same format) so results can be stored with the same CRUD functions.
+    Analyzers, engine profiles and resume snapshots are Backtrader-only, so
+    ``snapshot`` is always None.
+    """
+    if df is None or df.empty:
+        raise ValueError("DataFrame is empty")
+
+    run = simulate_arrays(df['Open'].values, df['High'].values, df['Low'].values,
+                          df['Close'].values, strategy_type, strategy_params,
+                          initial_cash, commission)
+
+    daily_positions = PositionBuffer.from_arrays(
+        df.index[run['start']:].values, run['position_size'], run['cash'], run['equity']
+    )
+    trades = [
+        TradeRecord(date=df.index[bar].date(), side='BUY', price=float(price), size=0,
+                    commission=float(comm), pnl=float(pnl))
+        for bar, price, comm, pnl in zip(run['trade_bar'], run['trade_price'],
+                                         run['trade_commission'], run['trade_pnl'])
+    ]
+
+    final_value = run['final_value']
+    metrics = compute_run_metrics(daily_positions, trades, initial_cash, df.index[0])
+    headline = ('total_return', 'sharpe', 'max_drawdown', 'win_rate', 'avg_trade_return')
+    return {
+        'final_cash': final_value,
+        'total_return': (final_value - initial_cash) / initial_cash,
+        'sharpe': metrics['sharpe'],
+        'max_drawdown': metrics['max_drawdown'] or 0.0,
+        'trades': trades,
+        'daily_positions': daily_positions,
+        'win_rate': metrics['win_rate'],
+        'avg_trade_return': metrics['avg_trade_return'],
+        'extra_metrics': {k: v for k, v in metrics.items() if k not in headline},
+        'snapshot': None,
+    }
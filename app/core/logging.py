@@ -1,4 +1,5 @@
 import os
+import logging as std_logging
 import structlog
 from typing import Any, Dict
 
@@ -13,7 +14,7 @@ def configure_logging() -> None:
     processors = [
         structlog.contextvars.merge_contextvars,
         structlog.processors.add_log_level,
-        structlog.processors.add_logger_name,
+        structlog.stdlib.add_logger_name,
         structlog.processors.TimeStamper(fmt="iso"),
         structlog.processors.StackInfoRenderer(),
     ]
@@ -28,15 +29,13 @@ def configure_logging() -> None:
     structlog.configure(
         processors=processors,
         wrapper_class=structlog.make_filtering_bound_logger(
-            getattr(structlog.stdlib, log_level.upper(), structlog.stdlib.INFO)
+            getattr(std_logging, log_level.upper(), std_logging.INFO)
         ),
         logger_factory=structlog.stdlib.LoggerFactory(),
         cache_logger_on_first_use=True,
     )
 
 
-configure_logging()
-
 
 def get_logger(name: str) -> structlog.stdlib.BoundLogger:
     """Obter logger estruturado para um módulo"""
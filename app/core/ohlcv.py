@@ -0,0 +1,163 @@
+"""
+Ingestion-to-engine data contract.
+
+Raw bars travel as an ``OHLCVBlock``: one immutable, contiguous, typed
+array with exactly the OHLCV columns. Indicators computed from them live in
+an ``AlignedIndicators`` that shares the block's dates, so neither the raw
+bars nor the frame handed to the engine grow with derived columns.
+"""
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+# float32 halves the bytes held per bar (about 7 significant digits)
+STORAGE_DTYPES = (np.dtype(np.float64), np.dtype(np.float32))
+
+IndicatorSpec = Tuple[str, Mapping]
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+def _storage_dtype(dtype) -> np.dtype:
+    dtype = np.dtype(dtype)
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError(f"Unsupported OHLCV storage dtype: {dtype}")
+    return dtype
+
+class OHLCVBlock:
+    """
+    Immutable OHLCV bars: ``dates`` (datetime64[ns]) and ``values``, a
+    read-only C-contiguous (5, bars) array in OHLCV_COLUMNS order, so each
+    column is one contiguous run.
+
+    The constructor takes ownership of the arrays it is given and marks them
+    read-only; use the ``from_*`` constructors to build from data the caller
+    keeps. ``frame()`` returns a new DataFrame per call over the same memory
+    (no copy for float64), so callers sharing a block cannot affect each
+    other: writes to the values raise and added columns stay on their frame.
+    """
+    __slots__ = ('dates', 'values')
+
+    def __init__(self, dates: np.ndarray, values: np.ndarray):
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        values = np.ascontiguousarray(values)
+        _storage_dtype(values.dtype)
+        if values.ndim != 2 or values.shape != (len(OHLCV_COLUMNS), len(dates)):
+            raise ValueError(f"Expected values of shape ({len(OHLCV_COLUMNS)}, {len(dates)}), got {values.shape}")
+        object.__setattr__(self, 'dates', _readonly(dates))
+        object.__setattr__(self, 'values', _readonly(values))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        # Pickled by value (e.g. to worker processes); rebuilt read-only
+        return (OHLCVBlock, (self.dates, self.values))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype=np.float64) -> 'OHLCVBlock':
+        """Copy the OHLCV columns of a provider frame (extra columns are dropped)"""
+        missing = [column for column in OHLCV_COLUMNS if column not in df.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_convert(None)
+        values = np.empty((len(OHLCV_COLUMNS), len(df)), dtype=_storage_dtype(dtype))
+        for row, column in enumerate(OHLCV_COLUMNS):
+            series = df[column]
+            if isinstance(series, pd.DataFrame):
+                # (field, ticker) columns of a single-ticker download
+                series = series.iloc[:, 0]
+            values[row] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        return cls(np.array(index.values, dtype='datetime64[ns]'), values)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence], dtype=np.float64) -> 'OHLCVBlock':
+        """Build from (date, open, high, low, close, volume) rows, e.g. a DB query"""
+        dates = np.array([row[0] for row in rows], dtype='datetime64[ns]')
+        values = np.array([row[1:] for row in rows], dtype=_storage_dtype(dtype))
+        values = values.reshape(len(rows), len(OHLCV_COLUMNS))
+        return cls(dates, values.T.copy())
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.values.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self.dates.nbytes + self.values.nbytes
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of one column ('Close', ...)"""
+        return self.values[OHLCV_COLUMNS.index(name)]
+
+    def astype(self, dtype) -> 'OHLCVBlock':
+        """The same bars in another storage dtype (self when it already matches)"""
+        dtype = _storage_dtype(dtype)
+        if dtype == self.dtype:
+            return self
+        return OHLCVBlock(self.dates.copy(), self.values.astype(dtype))
+
+    def frame(self) -> pd.DataFrame:
+        """OHLCV DataFrame indexed by Date; float32 blocks are widened to float64"""
+        values = self.values if self.dtype == np.float64 else self.values.astype(np.float64)
+        return pd.DataFrame(values.T, index=pd.DatetimeIndex(self.dates, name='Date'),
+                            columns=list(OHLCV_COLUMNS), copy=False)
+
+    def feed_arrays(self) -> Dict[str, np.ndarray]:
+        """Line arrays for array_feed.ArrayData, as views"""
+        arrays = {'datetime': self.dates.view(np.int64)}
+        for row, column in enumerate(OHLCV_COLUMNS):
+            arrays[column.lower()] = self.values[row]
+        return arrays
+
+class AlignedIndicators:
+    """
+    Indicator columns aligned row-for-row with an OHLCVBlock: the same
+    ``dates`` array and a read-only float64 (len(specs), bars) ``values``,
+    NaN during each indicator's warmup.
+    """
+    __slots__ = ('dates', 'specs', 'values')
+
+    def __init__(self, dates: np.ndarray, specs: Iterable[IndicatorSpec], values: np.ndarray):
+        specs = tuple((name, dict(params)) for name, params in specs)
+        values = np.ascontiguousarray(values, dtype=np.float64).reshape(len(specs), len(dates))
+        object.__setattr__(self, 'dates', dates)
+        object.__setattr__(self, 'specs', specs)
+        object.__setattr__(self, 'values', _readonly(values))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def _row(self, name: str, params: Mapping) -> int:
+        try:
+            return self.specs.index((name, dict(params)))
+        except ValueError:
+            raise KeyError(f"{name} {dict(params)}") from None
+
+    def get(self, name: str, params: Mapping) -> np.ndarray:
+        """Read-only values of one indicator, aligned with the block's dates"""
+        return self.values[self._row(name, params)]
+
+    def valid(self, name: str, params: Mapping) -> Tuple[np.ndarray, np.ndarray]:
+        """(datetime64[D] dates, values) of one indicator without its NaN rows"""
+        values = self.get(name, params)
+        keep = ~np.isnan(values)
+        return self.dates[keep].astype('datetime64[D]'), values[keep]
+
+def as_block(data: Union[OHLCVBlock, pd.DataFrame], dtype: Optional[np.dtype] = None) -> OHLCVBlock:
+    """An OHLCVBlock for either contract; frames are copied once into a block"""
+    if isinstance(data, OHLCVBlock):
+        return data if dtype is None else data.astype(dtype)
+    return OHLCVBlock.from_frame(data, dtype=np.float64 if dtype is None else dtype)
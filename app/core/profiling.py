@@ -0,0 +1,57 @@
+"""
+Opt-in cProfile capture of a single backtest run.
+
+``profile_call`` runs a callable under cProfile in the calling thread; call
+it inside the run's worker thread, since cProfile only sees its own thread.
+The captured data is the marshalled stats dict, the same bytes
+``pstats.Stats.dump_stats`` writes, so a stored profile can be downloaded
+and opened with pstats or snakeviz. ``top_functions`` summarises it. This
+module is only imported when a profile is requested.
+"""
+import cProfile
+import marshal
+import pstats
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+# Sort key -> index in a pstats entry (primitive calls, calls, tottime, cumtime, callers)
+SORT_KEYS = {'cumulative': 3, 'tottime': 2, 'calls': 1}
+
+class CapturedProfile(NamedTuple):
+    stats: bytes  # marshalled pstats data
+    wall_seconds: float
+    total_calls: int
+
+def profile_call(fn: Callable, *args, **kwargs) -> Tuple[Any, CapturedProfile]:
+    """Run ``fn`` under cProfile; returns its result and the captured profile"""
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    result = profiler.runcall(fn, *args, **kwargs)
+    wall_seconds = time.perf_counter() - started
+    profiler.create_stats()
+    total_calls = sum(entry[1] for entry in profiler.stats.values())
+    return result, CapturedProfile(marshal.dumps(profiler.stats), wall_seconds, total_calls)
+
+def load_stats(data: bytes) -> pstats.Stats:
+    """pstats.Stats over stored profile bytes (no temporary file)"""
+    stats = pstats.Stats()
+    stats.stats = marshal.loads(data)
+    stats.get_top_level_stats()
+    return stats
+
+def top_functions(data: bytes, limit: int = 25, sort: str = 'cumulative') -> List[Dict[str, Any]]:
+    """The ``limit`` most expensive functions of a stored profile by ``sort``"""
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}. Available: {', '.join(SORT_KEYS)}")
+    column = SORT_KEYS[sort]
+    entries = sorted(load_stats(data).stats.items(), key=lambda item: item[1][column], reverse=True)
+    return [
+        {
+            'function': pstats.func_std_string(key),
+            'primitive_calls': primitive,
+            'calls': calls,
+            'tottime': tottime,
+            'cumtime': cumtime,
+        }
+        for key, (primitive, calls, tottime, cumtime, _) in entries[:limit]
+    ]
@@ -0,0 +1,142 @@
+import numpy as np
+from dataclasses import dataclass, fields
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# One row per strategy bar; dates are day-resolution like the DB column
+POSITION_DTYPE = np.dtype([
+    ('date', 'datetime64[D]'),
+    ('position_size', 'f8'),
+    ('cash', 'f8'),
+    ('equity', 'f8'),
+    ('drawdown', 'f8'),
+])
+
+# date.toordinal() of 1970-01-01; datetime64[D] fields accept days since the epoch
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+@dataclass(slots=True)
+class TradeRecord:
+    """A closed trade as reported by notify_trade"""
+    date: date
+    side: str
+    price: float
+    size: float
+    commission: float
+    pnl: float
+
+    # Dict-style read access, for callers written against the old dict trades
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+class PositionBuffer:
+    """
+    Growable structured array of daily positions (POSITION_DTYPE).
+
+    Appends are amortised O(1) (capacity doubles); ``array`` is a view of
+    the filled rows, so metrics and persistence read whole columns without
+    building per-bar objects. Indexing with an int or iterating yields
+    plain dicts, for callers that still want row access.
+    """
+    __slots__ = ('_data', '_size')
+
+    def __init__(self, capacity: int = 256):
+        self._data = np.zeros(max(capacity, 1), dtype=POSITION_DTYPE)
+        self._size = 0
+
+    @classmethod
+    def from_arrays(cls, dates, position_size, cash, equity, drawdown=None) -> 'PositionBuffer':
+        buffer = cls(len(dates))
+        data = buffer._data
+        data['date'][:len(dates)] = np.asarray(dates, dtype='datetime64[D]')
+        data['position_size'][:len(dates)] = position_size
+        data['cash'][:len(dates)] = cash
+        data['equity'][:len(dates)] = equity
+        if drawdown is not None:
+            data['drawdown'][:len(dates)] = drawdown
+        buffer._size = len(dates)
+        return buffer
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any]) -> 'PositionBuffer':
+        """From dicts or objects (e.g. DailyPosition rows) with the same field names"""
+        rows = list(rows)
+        get = (lambda row, name: row[name]) if rows and isinstance(rows[0], dict) else getattr
+        columns = [[get(row, name) for row in rows] for name in ('date', 'position_size', 'cash', 'equity')]
+        return cls.from_arrays(*columns)
+
+    @classmethod
+    def concat(cls, buffers: Iterable['PositionBuffer']) -> 'PositionBuffer':
+        arrays = [as_position_buffer(b).array for b in buffers]
+        merged = np.concatenate(arrays) if arrays else np.zeros(0, dtype=POSITION_DTYPE)
+        buffer = cls(len(merged))
+        buffer._data[:len(merged)] = merged
+        buffer._size = len(merged)
+        return buffer
+
+    def append(self, day: date, position_size: float, cash: float, equity: float,
+               drawdown: float = 0.0):
+        if self._size == len(self._data):
+            grown = np.zeros(len(self._data) * 2, dtype=POSITION_DTYPE)
+            grown[:self._size] = self._data
+            self._data = grown
+        # Integer days assign ~4x faster than converting a date object
+        self._data[self._size] = (day.toordinal() - _EPOCH_ORDINAL, position_size, cash, equity, drawdown)
+        self._size += 1
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._data[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def dates(self) -> List[date]:
+        return self.array['date'].astype(object).tolist()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            sliced = self.array[index]
+            buffer = PositionBuffer(len(sliced))
+            buffer._data[:len(sliced)] = sliced
+            buffer._size = len(sliced)
+            return buffer
+        row = self.array[index]
+        return {
+            'date': row['date'].astype(object),
+            'position_size': float(row['position_size']),
+            'cash': float(row['cash']),
+            'equity': float(row['equity']),
+            'drawdown': float(row['drawdown']),
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self._size):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f"PositionBuffer(rows={self._size}, capacity={len(self._data)})"
+
+def as_position_buffer(positions: Optional[Any]) -> PositionBuffer:
+    """Accept a PositionBuffer, a POSITION_DTYPE array or a list of dicts/rows"""
+    if isinstance(positions, PositionBuffer):
+        return positions
+    if isinstance(positions, np.ndarray) and positions.dtype == POSITION_DTYPE:
+        buffer = PositionBuffer(len(positions))
+        buffer._data[:len(positions)] = positions
+        buffer._size = len(positions)
+        return buffer
+    return PositionBuffer.from_rows(positions or [])
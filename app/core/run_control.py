@@ -0,0 +1,53 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Minimum seconds between progress callbacks from a running strategy
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+class RunCancelled(Exception):
+    """A run stopped early because its RunControl was cancelled"""
+
+class RunControl:
+    """
+    Side-channel between a running strategy and whoever started it.
+
+    The strategy calls ``tick`` once per bar; it reports progress at most
+    every ``interval`` seconds through ``on_progress`` and returns True once
+    ``cancel`` has been called (from any thread), so the strategy can stop
+    Cerebro cleanly with ``runstop``.
+    """
+
+    def __init__(self, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 bars_total: Optional[int] = None, interval: float = PROGRESS_INTERVAL_SECONDS):
+        self.on_progress = on_progress
+        self.bars_total = bars_total
+        self.interval = interval
+        self.bars_processed = 0
+        self._cancelled = threading.Event()
+        self._started = time.monotonic()
+        self._last_report = float('-inf')
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            'bars_processed': self.bars_processed,
+            'bars_total': self.bars_total,
+            'elapsed_seconds': round(time.monotonic() - self._started, 3),
+        }
+
+    def tick(self, bars_processed: int) -> bool:
+        """Record progress (throttled callback); True when the run should stop"""
+        self.bars_processed = bars_processed
+        if self.on_progress is not None:
+            now = time.monotonic()
+            if now - self._last_report >= self.interval:
+                self._last_report = now
+                self.on_progress(self.progress())
+        return self._cancelled.is_set()
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+# Extra feed lines read by strategies in precomputed-signal mode. Entries and
+# exits are 0/1 floats (Backtrader lines are float arrays)
+SIGNAL_COLUMNS = ('signal_entry', 'signal_exit', 'signal_atr')
+
+def wilder_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int) -> pd.Series:
+    """Backtrader's ATR: true range against the previous close, SMA seed, then 1/period smoothing"""
+    prev_close = close.shift(1)
+    true_range = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+
+    seeded = pd.Series(np.nan, index=close.index)
+    if len(close) > period:
+        seeded.iloc[period] = true_range.iloc[1:period + 1].mean()
+        seeded.iloc[period + 1:] = true_range.iloc[period + 1:]
+    # adjust=False starts from the first non-NaN value, i.e. the seed
+    return seeded.ewm(alpha=1.0 / period, adjust=False).mean()
+
+def _frame(entries: pd.Series, exits: pd.Series, atr: pd.Series) -> pd.DataFrame:
+    return pd.DataFrame({
+        'signal_entry': entries.astype(np.float64),
+        'signal_exit': exits.astype(np.float64),
+        'signal_atr': atr,
+    })
+
+def sma_cross_signals(df: pd.DataFrame, fast: int, slow: int, atr_period: int) -> pd.DataFrame:
+    """CrossOver(SMA(fast), SMA(slow)) up/down crosses and ATR"""
+    close = df['Close']
+    sma_fast = close.rolling(fast).mean()
+    sma_slow = close.rolling(slow).mean()
+    diff = sma_fast - sma_slow
+
+    # CrossOver compares against the last non-zero difference, seeded with
+    # the first defined one even when it is zero
+    first = max(fast, slow) - 1
+    last_nonzero = diff.where(diff != 0)
+    if first < len(diff):
+        last_nonzero.iloc[first] = diff.iloc[first]
+    previous = last_nonzero.ffill().shift(1)
+
+    entries = (previous < 0) & (sma_fast > sma_slow)
+    exits = (previous > 0) & (sma_fast < sma_slow)
+    return _frame(entries, exits, wilder_atr(df['High'], df['Low'], close, atr_period))
+
+def donchian_breakout_signals(df: pd.DataFrame, entry_period: int, exit_period: int,
+                              atr_period: int) -> pd.DataFrame:
+    """Close breaking the previous bar's channel high (entry) or low (exit), and ATR"""
+    close = df['Close']
+    entries = close > df['High'].rolling(entry_period).max().shift(1)
+    exits = close < df['Low'].rolling(exit_period).min().shift(1)
+    return _frame(entries, exits, wilder_atr(df['High'], df['Low'], close, atr_period))
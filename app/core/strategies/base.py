@@ -1,15 +1,36 @@
 import backtrader as bt
 import pandas as pd
-from abc import ABC, abstractmethod
-from typing import Dict, Any
+from abc import ABCMeta, abstractmethod
+from typing import Dict, Any, Optional
 
-class BaseStrategy(bt.Strategy, ABC):
+from ..records import PositionBuffer, TradeRecord
+
+class _StrategyMeta(type(bt.Strategy), ABCMeta):
+    """Backtrader's strategy metaclass combined with ABCMeta"""
+
+
+class BaseStrategy(bt.Strategy, metaclass=_StrategyMeta):
     """Base class for all trading strategies"""
+    params = (
+        ('resume_from', None),
+        ('run_control', None),
+    )
+
+    # Extra bars fed before a resume checkpoint so smoothed indicators (ATR) converge
+    RESUME_WARMUP_BARS = 250
     
     def __init__(self):
         super().__init__()
         self.trades_list = []
-        self.daily_positions = []
+        self.daily_positions = PositionBuffer()
+        self.stop_price = None
+        self.snapshot = None
+        self._resume_pending = self.params.resume_from is not None
+        # Feed built from signal_frame (engine profile precompute_signals)
+        self.signals = self.data if 'signal_entry' in self.data.getlinealiases() else None
+        # Without indicators Backtrader calls next() from the first bar, so
+        # signal-mode strategies set the minimum period their indicators had
+        self.signal_minperiod = 1
         
     def log(self, txt, dt=None):
         dt = dt or self.datas[0].datetime.date(0)
@@ -17,28 +38,135 @@ class BaseStrategy(bt.Strategy, ABC):
     
     def notify_trade(self, trade):
         if trade.isclosed:
-            self.trades_list.append({
-                'date': self.datas[0].datetime.date(0),
-                'side': 'SELL' if trade.size < 0 else 'BUY',
-                'price': trade.price,
-                'size': abs(trade.size),
-                'commission': trade.commission,
-                'pnl': trade.pnl
-            })
+            self.trades_list.append(TradeRecord(
+                date=self.datas[0].datetime.date(0),
+                side='SELL' if trade.size < 0 else 'BUY',
+                price=trade.price,
+                size=abs(trade.size),
+                commission=trade.commission,
+                pnl=trade.pnl,
+            ))
     
     def next(self):
+        control = self.params.run_control
+        if control is not None and control.tick(len(self.data)):
+            # Cancelled: finish this bar and let Cerebro stop cleanly
+            self.env.runstop()
+            return
+        if len(self.data) < self.signal_minperiod:
+            return
+        
+        if self._resume_pending:
+            self._resume_step()
+            return
         
-        self.daily_positions.append({
-            'date': self.datas[0].datetime.date(0),
-            'position_size': self.position.size,
-            'cash': self.broker.get_cash(),
-            'equity': self.broker.get_value(),
-            'drawdown': 0.0  
-        })
+        self.daily_positions.append(
+            self.datas[0].datetime.date(0),
+            self.position.size,
+            self.broker.get_cash(),
+            self.broker.get_value(),
+        )
         
         
         self.strategy_logic()
     
+    def stop(self):
+        if self.daily_positions:
+            self.snapshot = self.take_snapshot()
+    
+    @classmethod
+    def params_with_defaults(cls, strategy_params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        params = dict(cls.params._getitems())
+        params.update(strategy_params or {})
+        return params
+    
+    @classmethod
+    def resume_warmup(cls, strategy_params: Dict[str, Any]) -> int:
+        """Bars needed before a checkpoint to rebuild indicator state"""
+        params = cls.params_with_defaults(strategy_params)
+        periods = [v for k, v in params.items() if isinstance(v, int) and not isinstance(v, bool)]
+        return max(periods, default=0) + cls.RESUME_WARMUP_BARS
+    
+    @classmethod
+    def signal_frame(cls, df: pd.DataFrame, strategy_params: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        """
+        Entry/exit/ATR columns (signals.SIGNAL_COLUMNS) computed over the whole
+        frame before the run. Strategies that override it read them from
+        ``self.signals`` instead of building Backtrader indicators; None means
+        the strategy has no precomputed mode.
+        """
+        return None
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Strategy-specific state needed to resume; extend in subclasses"""
+        return {'stop_price': self.stop_price}
+    
+    def set_state(self, state: Dict[str, Any]):
+        self.stop_price = state.get('stop_price')
+    
+    def take_snapshot(self) -> Dict[str, Any]:
+        """Broker, position and strategy state at the current (last) bar"""
+        position = self.broker.getposition(self.data)
+        trades = self._trades[self.data][0]
+        open_trade = trades[-1] if trades and trades[-1].isopen else None
+        
+        return {
+            'date': self.datas[0].datetime.date(0).isoformat(),
+            'close': float(self.data.close[0]),
+            'cash': float(self.broker.get_cash()),
+            'value': float(self.broker.get_value()),
+            'position': {'size': float(position.size), 'price': float(position.price)},
+            'open_trade': {
+                'size': float(open_trade.size),
+                'price': float(open_trade.price),
+                'commission': float(open_trade.commission),
+            } if open_trade else None,
+            'pending_orders': [
+                {'side': 'BUY' if order.isbuy() else 'SELL', 'size': abs(float(order.created.size))}
+                for order in self._open_orders() if order.data is self.data
+            ],
+            'state': self.get_state(),
+        }
+    
+    def _open_orders(self):
+        # Orders sent on the last bar are still in the broker's submission queue
+        return list(getattr(self.broker, 'submitted', [])) + self.broker.get_orders_open()
+    
+    def _resume_step(self):
+        """Skip warmup bars, then restore the snapshot on the checkpoint bar"""
+        snapshot = self.params.resume_from
+        current = self.datas[0].datetime.date(0).isoformat()
+        if current < snapshot['date']:
+            return
+        if current > snapshot['date']:
+            # ValueError like resume_backtest's own checks: callers fall back to a full re-run
+            raise ValueError(f"Resume checkpoint {snapshot['date']} was not reached during warmup")
+        
+        self.broker.set_cash(snapshot['cash'])
+        self.broker.getposition(self.data).set(snapshot['position']['size'], snapshot['position']['price'])
+        
+        if snapshot['open_trade']:
+            trade = bt.Trade(data=self.data, tradeid=0)
+            trade.size = snapshot['open_trade']['size']
+            trade.price = snapshot['open_trade']['price']
+            trade.commission = snapshot['open_trade']['commission']
+            trade.long = trade.size > 0
+            trade.isopen = True
+            trade.status = trade.Open
+            trade.baropen = len(self.data)
+            trade.dtopen = self.data.datetime[0]
+            self._trades[self.data][0].append(trade)
+        
+        # Orders sent on the checkpoint bar would have filled on the next open
+        for order in snapshot['pending_orders']:
+            if order['side'] == 'BUY':
+                self.buy(size=order['size'])
+            else:
+                self.sell(size=order['size'])
+        
+        self.set_state(snapshot['state'])
+        self._resume_pending = False
+    
     @abstractmethod
     def strategy_logic(self):
         """Implement specific strategy logic here"""
@@ -1,5 +1,6 @@
 import backtrader as bt
 from .base import BaseStrategy
+from ..signals import donchian_breakout_signals
 
 class DonchianBreakoutStrategy(BaseStrategy):
     params = (
@@ -10,13 +11,29 @@ class DonchianBreakoutStrategy(BaseStrategy):
     
     def __init__(self):
         super().__init__()
-        self.highest = bt.indicators.Highest(self.data.high, period=self.params.entry_period)
-        self.lowest = bt.indicators.Lowest(self.data.low, period=self.params.exit_period)
-        self.atr = bt.indicators.ATR(self.data, period=self.params.atr_period)
+        if self.signals is not None:
+            # Same first bar as the indicators below would give (ATR needs period + 1)
+            self.signal_minperiod = max(self.params.entry_period, self.params.exit_period, self.params.atr_period + 1)
+            self.atr = self.signals.signal_atr
+        else:
+            self.highest = bt.indicators.Highest(self.data.high, period=self.params.entry_period)
+            self.lowest = bt.indicators.Lowest(self.data.low, period=self.params.exit_period)
+            self.atr = bt.indicators.ATR(self.data, period=self.params.atr_period)
+    
+    @classmethod
+    def signal_frame(cls, df, strategy_params):
+        params = cls.params_with_defaults(strategy_params)
+        return donchian_breakout_signals(df, params['entry_period'], params['exit_period'], params['atr_period'])
         
     def strategy_logic(self):
+        if self.signals is not None:
+            breakout, breakdown = self.signals.signal_entry[0] > 0, self.signals.signal_exit[0] > 0
+        else:
+            breakout = self.data.close[0] > self.highest[-1]
+            breakdown = self.data.close[0] < self.lowest[-1]
+        
         if not self.position:
-            if self.data.close[0] > self.highest[-1]:  # Breakout above highest
+            if breakout:  # Breakout above highest
                 current_price = self.data.close[0]
                 stop_price = current_price - (2 * self.atr[0])
                 size = self.calculate_position_size(current_price, stop_price)
@@ -24,5 +41,5 @@ class DonchianBreakoutStrategy(BaseStrategy):
                     self.buy(size=size)
                     self.stop_price = stop_price
         else:
-            if self.data.close[0] < self.lowest[-1] or self.data.close[0] <= self.stop_price:
+            if breakdown or self.data.close[0] <= self.stop_price:
                 self.sell(size=self.position.size)
\ No newline at end of file
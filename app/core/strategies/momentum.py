@@ -14,6 +14,15 @@ class MomentumStrategy(BaseStrategy):
         self.atr = bt.indicators.ATR(self.data, period=self.params.atr_period)
         self.returns_history = []
         
+    def get_state(self):
+        state = super().get_state()
+        state['returns_history'] = [float(r) for r in self.returns_history]
+        return state
+        
+    def set_state(self, state):
+        super().set_state(state)
+        self.returns_history = list(state.get('returns_history', []))
+        
     def strategy_logic(self):
         
         if len(self.returns_history) >= 252:  
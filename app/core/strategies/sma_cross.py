@@ -1,5 +1,6 @@
 import backtrader as bt
 from .base import BaseStrategy
+from ..signals import sma_cross_signals
 
 class SMAStrategy(BaseStrategy): 
     """Estratégia de cruzamento de médias móveis simples"""
@@ -11,15 +12,30 @@ class SMAStrategy(BaseStrategy):
     
     def __init__(self):
         super().__init__()
-        self.sma_fast = bt.indicators.SMA(self.data.close, period=self.params.fast)
-        self.sma_slow = bt.indicators.SMA(self.data.close, period=self.params.slow)
-        self.atr = bt.indicators.ATR(self.data, period=self.params.atr_period)
-        self.crossover = bt.indicators.CrossOver(self.sma_fast, self.sma_slow)
+        if self.signals is not None:
+            # Same first bar as the indicators below (CrossOver and ATR need one extra bar)
+            self.signal_minperiod = max(self.params.fast, self.params.slow, self.params.atr_period) + 1
+            self.atr = self.signals.signal_atr
+        else:
+            self.sma_fast = bt.indicators.SMA(self.data.close, period=self.params.fast)
+            self.sma_slow = bt.indicators.SMA(self.data.close, period=self.params.slow)
+            self.atr = bt.indicators.ATR(self.data, period=self.params.atr_period)
+            self.crossover = bt.indicators.CrossOver(self.sma_fast, self.sma_slow)
         self.stop_price = None
+    
+    @classmethod
+    def signal_frame(cls, df, strategy_params):
+        params = cls.params_with_defaults(strategy_params)
+        return sma_cross_signals(df, params['fast'], params['slow'], params['atr_period'])
         
     def strategy_logic(self):
+        if self.signals is not None:
+            entry, exit_ = self.signals.signal_entry[0] > 0, self.signals.signal_exit[0] > 0
+        else:
+            entry, exit_ = self.crossover > 0, self.crossover < 0
+        
         if not self.position:
-            if self.crossover > 0:
+            if entry:
                 current_price = self.data.close[0]
                 stop_price = current_price - (2 * self.atr[0])
                 size = self.calculate_position_size(current_price, stop_price)
@@ -27,6 +43,6 @@ class SMAStrategy(BaseStrategy):
                     self.buy(size=size)
                     self.stop_price = stop_price
         else:
-            if self.crossover < 0 or self.data.close[0] <= self.stop_price:
+            if exit_ or self.data.close[0] <= self.stop_price:
                 self.sell(size=self.position.size)
                 self.stop_price = None
\ No newline at end of file
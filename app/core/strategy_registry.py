@@ -0,0 +1,151 @@
+import importlib
+import inspect
+import pkgutil
+from collections.abc import Mapping
+from functools import lru_cache
+from importlib.metadata import entry_points
+from typing import Dict, Any, List, Optional
+
+from . import config
+
+# Built-in strategies as "module:Class" so listing them imports nothing
+BUILTIN_STRATEGIES = {
+    'sma_cross': 'app.core.strategies.sma_cross:SMAStrategy',
+    'donchian_breakout': 'app.core.strategies.donchian:DonchianBreakoutStrategy',
+    'momentum': 'app.core.strategies.momentum:MomentumStrategy',
+}
+
+# Params every strategy inherits from BaseStrategy that are not user settings
+INTERNAL_PARAMS = ('resume_from', 'run_control')
+
+def _load_spec(spec: str):
+    module_name, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+def _scan_package(package_name: str) -> Dict[str, str]:
+    """
+    Find BaseStrategy subclasses declaring ``strategy_name`` in a package.
+
+    Scanning has to import the package's modules, so it only runs for the
+    packages listed in STRATEGY_PACKAGES.
+    """
+    from .strategies.base import BaseStrategy
+
+    package = importlib.import_module(package_name)
+    module_names = [package_name]
+    if hasattr(package, '__path__'):
+        module_names += [info.name for info in pkgutil.walk_packages(package.__path__, f"{package_name}.")]
+
+    found = {}
+    for module_name in module_names:
+        module = importlib.import_module(module_name)
+        for attr, obj in vars(module).items():
+            if (inspect.isclass(obj) and issubclass(obj, BaseStrategy) and obj.__module__ == module_name
+                    and getattr(obj, 'strategy_name', None)):
+                found[obj.strategy_name] = f"{module_name}:{attr}"
+    return found
+
+@lru_cache(maxsize=None)
+def _strategy_specs() -> Dict[str, Any]:
+    """name -> "module:Class" or an unloaded EntryPoint, built-ins first"""
+    specs: Dict[str, Any] = dict(BUILTIN_STRATEGIES)
+    for entry_point in entry_points(group=config.STRATEGY_ENTRY_POINT_GROUP):
+        specs.setdefault(entry_point.name, entry_point)
+    for package_name in config.STRATEGY_PACKAGES:
+        for name, spec in _scan_package(package_name).items():
+            specs.setdefault(name, spec)
+    return specs
+
+def available_strategies() -> List[str]:
+    """Registered strategy names (does not import the strategies themselves)"""
+    return list(_strategy_specs())
+
+@lru_cache(maxsize=None)
+def get_strategy_class(strategy_type: str):
+    """Import (once) and return the strategy class registered under ``strategy_type``"""
+    from .strategies.base import BaseStrategy
+
+    spec = _strategy_specs().get(strategy_type)
+    if spec is None:
+        raise ValueError(f"Unknown strategy type: {strategy_type}")
+
+    strategy_class = _load_spec(spec) if isinstance(spec, str) else spec.load()
+    if not (inspect.isclass(strategy_class) and issubclass(strategy_class, BaseStrategy)):
+        raise ValueError(f"Strategy {strategy_type} does not subclass BaseStrategy")
+    return strategy_class
+
+@lru_cache(maxsize=None)
+def get_param_schema(strategy_type: str) -> Dict[str, Dict[str, Any]]:
+    """User-settable params of a strategy: {name: {'default', 'type'}}"""
+    strategy_class = get_strategy_class(strategy_type)
+    return {
+        name: {'default': default, 'type': type(default).__name__ if default is not None else 'any'}
+        for name, default in strategy_class.params._getitems()
+        if name not in INTERNAL_PARAMS
+    }
+
+def _coerce(strategy_type: str, name: str, value: Any, default: Any) -> Any:
+    error = ValueError(f"Parameter {name} of {strategy_type} must be {type(default).__name__}, got {value!r}")
+    if default is None:
+        return value
+    if isinstance(default, bool):
+        if not isinstance(value, bool):
+            raise error
+        return value
+    if isinstance(default, int):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or int(value) != value:
+            raise error
+        return int(value)
+    if isinstance(default, float):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise error
+        return float(value)
+    if not isinstance(value, type(default)):
+        raise error
+    return value
+
+def validate_strategy_params(strategy_type: str, strategy_params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Check ``strategy_params`` against the strategy's declared params.
+
+    Raises ValueError for unknown names or values that do not match the
+    default's type (ints accept integral floats, floats accept ints).
+    Returns the params with values coerced; defaults are not filled in.
+    """
+    schema = get_param_schema(strategy_type)
+    strategy_params = strategy_params or {}
+
+    unknown = sorted(set(strategy_params) - set(schema))
+    if unknown:
+        raise ValueError(f"Unknown parameters for {strategy_type}: {', '.join(unknown)}")
+
+    return {
+        name: _coerce(strategy_type, name, value, schema[name]['default'])
+        for name, value in strategy_params.items()
+    }
+
+def clear_registry_cache():
+    """Forget discovered strategies (e.g. after installing a plugin)"""
+    _strategy_specs.cache_clear()
+    get_strategy_class.cache_clear()
+    get_param_schema.cache_clear()
+
+class _LazyStrategyMap(Mapping):
+    """Read-only name -> class mapping over the registry, importing on access"""
+
+    def __getitem__(self, strategy_type):
+        try:
+            return get_strategy_class(strategy_type)
+        except ValueError as e:
+            raise KeyError(strategy_type) from e
+
+    def __contains__(self, strategy_type):
+        return strategy_type in _strategy_specs()
+
+    def __iter__(self):
+        return iter(available_strategies())
+
+    def __len__(self):
+        return len(_strategy_specs())
+
+STRATEGY_MAP = _LazyStrategyMap()
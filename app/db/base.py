@@ -1,33 +1,37 @@
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import QueuePool
+from .pool_metrics import InstrumentedQueuePool
 
 # Importar configuração centralizada
 from ..core.config import DATABASE_URL
 
 # Configurações específicas para PostgreSQL
-def get_engine_config(db_url: str):
+def get_engine_config(db_url: str, pool_name: str = 'api', env_prefix: str = 'DB_',
+                      default_size: int = 10, default_overflow: int = 20):
     """Retorna configuração otimizada baseada no tipo de banco"""
     config = {
         'echo': os.getenv('SQLALCHEMY_ECHO', 'false').lower() == 'true',
+        'pool_logging_name': pool_name,
     }
     
     if db_url.startswith('postgresql'):
         # Configurações específicas para PostgreSQL
         config.update({
-            'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
-            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')), 
-            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
-            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '3600')),  # 1 hora
+            'pool_size': int(os.getenv(f'{env_prefix}POOL_SIZE', str(default_size))),
+            'max_overflow': int(os.getenv(f'{env_prefix}MAX_OVERFLOW', str(default_overflow))), 
+            'pool_timeout': int(os.getenv(f'{env_prefix}POOL_TIMEOUT', '30')),
+            'pool_recycle': int(os.getenv(f'{env_prefix}POOL_RECYCLE', '3600')),  # 1 hora
             'pool_pre_ping': True,  # Verificar conexões antes de usar
-            'poolclass': QueuePool,
+            'poolclass': InstrumentedQueuePool,
         })
     elif db_url.startswith('sqlite'):
         # Configurações específicas para SQLite (desenvolvimento)
         config.update({
             'connect_args': {"check_same_thread": False}
         })
+        if ":memory:" not in db_url and db_url != "sqlite://":
+            config['poolclass'] = InstrumentedQueuePool
         # Criar diretório para SQLite se necessário
         if ":///" in db_url:
             db_path = db_url.split("///")[1]
@@ -41,6 +45,13 @@ def get_engine_config(db_url: str):
 engine_config = get_engine_config(DATABASE_URL)
 engine = create_engine(DATABASE_URL, **engine_config)
 
+# Pool dedicado para trabalho em background (backtests, jobs), separado das requests
+background_engine = create_engine(
+    DATABASE_URL,
+    **get_engine_config(DATABASE_URL, pool_name='background', env_prefix='DB_BG_',
+                        default_size=5, default_overflow=10)
+)
+
 # Configurar SessionLocal
 SessionLocal = sessionmaker(
     bind=engine,
@@ -50,6 +61,13 @@ SessionLocal = sessionmaker(
     expire_on_commit=False  # Evita lazy loading depois do commit
 )
 
+BackgroundSessionLocal = sessionmaker(
+    bind=background_engine,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base para modelos ORM (SQLAlchemy 2.0)
 Base = declarative_base()
 
@@ -1,13 +1,34 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from typing import List, Tuple, Optional
-from datetime import date
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Tuple, Optional
+from datetime import date, datetime, timedelta
+from itertools import repeat
 from . import models
+from ..core import config
+import csv
+import io
 import json
 
 def create_backtest(db: Session, obj_in: dict):
     """Criar novo backtest"""
-    obj = models.Backtest(
+    obj = _new_backtest(obj_in)
+    db.add(obj)
+    db.commit()
+    db.refresh(obj)
+    return obj
+
+def create_backtest_with_results(db: Session, obj_in: dict, results: dict) -> int:
+    """Criar um backtest já concluído e seus resultados numa transação; retorna o id"""
+    obj = _new_backtest(obj_in)
+    db.add(obj)
+    db.flush()
+    _insert_results(db, obj.id, results)
+    db.commit()
+    return obj.id
+
+def _new_backtest(obj_in: dict) -> models.Backtest:
+    return models.Backtest(
         ticker=obj_in.get('ticker'),
         start_date=obj_in.get('start_date'),
         end_date=obj_in.get('end_date'),
@@ -15,65 +36,410 @@ def create_backtest(db: Session, obj_in: dict):
         strategy_params_json=json.dumps(obj_in.get('strategy_params_json', {})),
         initial_cash=obj_in.get('initial_cash'),
         commission=obj_in.get('commission'),
-        status=obj_in.get('status', 'pending')
+        status=obj_in.get('status', 'pending'),
+        analyzers_json=json.dumps(obj_in.get('analyzers', [])),
+        engine_profile_json=json.dumps(obj_in.get('engine_profile', {}), sort_keys=True),
+        group_id=obj_in.get('group_id')
     )
-    db.add(obj)
+
+def create_backtest_group(db: Session, obj_in: dict, backtests: List[dict]):
+    """Criar um grupo e seus backtests numa transação; retorna (grupo, backtests)"""
+    group = models.BacktestGroup(
+        kind=obj_in.get('kind', 'compare'),
+        ticker=obj_in.get('ticker'),
+        start_date=obj_in.get('start_date'),
+        end_date=obj_in.get('end_date')
+    )
+    db.add(group)
+    db.flush()
+    members = [_new_backtest(dict(item, group_id=group.id)) for item in backtests]
+    db.add_all(members)
     db.commit()
-    db.refresh(obj)
-    return obj
+    return group, members
 
 def update_backtest_status(db: Session, backtest_id: int, status: str, message: str = None):
     """Atualizar status do backtest"""
     backtest = db.query(models.Backtest).filter(models.Backtest.id == backtest_id).first()
     if backtest:
         backtest.status = status
-        if message:
-           
-            pass
+        backtest.message = message
         db.commit()
         return backtest
     return None
 
+# Column order of the tuples built by _trade_rows/_position_rows
+_TRADE_COLUMNS = ('backtest_id', 'date', 'side', 'price', 'size', 'commission', 'pnl')
+_POSITION_COLUMNS = ('backtest_id', 'date', 'position_size', 'cash', 'equity', 'drawdown')
+_RESULT_RELATIONSHIPS = ('trades', 'daily_positions', 'metrics', 'snapshot_json')
+
+def _trade_rows(backtest_id: int, trades: list) -> List[tuple]:
+    """Tuplas de trades a partir dos TradeRecord do engine"""
+    return [(backtest_id, t.date, t.side, t.price, t.size, t.commission, t.pnl) for t in trades]
+
+def _position_rows(backtest_id: int, positions) -> List[tuple]:
+    """Tuplas de posições diárias lidas por coluna do PositionBuffer"""
+    # numpy only loads when results are stored, not when the API imports crud
+    from ..core.records import as_position_buffer
+
+    columns = as_position_buffer(positions).array
+    return list(zip(
+        repeat(backtest_id, len(columns)), columns['date'].astype(object).tolist(),
+        columns['position_size'].tolist(), columns['cash'].tolist(),
+        columns['equity'].tolist(), columns['drawdown'].tolist()
+    ))
+
+def _copy_rows(db: Session, table, columns: Tuple[str, ...], rows: List[tuple]) -> bool:
+    """COPY FROM STDIN no PostgreSQL (psycopg2); False se indisponível"""
+    connection = db.connection()
+    if not config.RESULTS_USE_COPY or connection.dialect.name != 'postgresql':
+        return False
+    cursor = connection.connection.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        return False
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    for start in range(0, len(rows), config.RESULTS_INSERT_BATCH_SIZE):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows[start:start + config.RESULTS_INSERT_BATCH_SIZE])
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+    return True
+
+def _bulk_insert(db: Session, model, columns: Tuple[str, ...], rows: List[tuple]):
+    """Core insert() com executemany em lotes limitados, sem identity map"""
+    if not rows or _copy_rows(db, model.__table__, columns, rows):
+        return
+    statement = insert(model.__table__)
+    for start in range(0, len(rows), config.RESULTS_INSERT_BATCH_SIZE):
+        batch = rows[start:start + config.RESULTS_INSERT_BATCH_SIZE]
+        db.execute(statement, [dict(zip(columns, row)) for row in batch])
+
+def _expire_results(db: Session, backtest_id: int):
+    """Descartar relacionamentos já carregados de um Backtest da sessão após escrita via Core"""
+    backtest = db.identity_map.get(db.identity_key(models.Backtest, backtest_id))
+    if backtest is not None:
+        db.expire(backtest, _RESULT_RELATIONSHIPS)
+
 def store_backtest_results(db: Session, backtest_id: int, results: dict):
-    """Armazenar resultados completos do backtest"""
-    
-    
-    for trade_data in results.get('trades', []):
-        trade = models.Trade(
-            backtest_id=backtest_id,
-            date=trade_data['date'],
-            side=trade_data['side'],
-            price=trade_data['price'],
-            size=trade_data['size'],
-            commission=trade_data.get('commission', 0),
-            pnl=trade_data.get('pnl', 0)
-        )
-        db.add(trade)
-    
-    
-    for pos_data in results.get('daily_positions', []):
-        position = models.DailyPosition(
-            backtest_id=backtest_id,
-            date=pos_data['date'],
-            position_size=pos_data['position_size'],
-            cash=pos_data['cash'],
-            equity=pos_data['equity'],
-            drawdown=pos_data.get('drawdown', 0)
-        )
-        db.add(position)
-    
-   
-    metrics = models.Metrics(
+    """Armazenar resultados completos do backtest (uma transação, escrita em lote)"""
+    _insert_results(db, backtest_id, results)
+    db.commit()
+    _expire_results(db, backtest_id)
+
+def _insert_results(db: Session, backtest_id: int, results: dict):
+    """Inserir trades, posições, métricas e snapshot (sem commit)"""
+    _bulk_insert(db, models.Trade, _TRADE_COLUMNS, _trade_rows(backtest_id, results.get('trades', [])))
+    _bulk_insert(db, models.DailyPosition, _POSITION_COLUMNS,
+                 _position_rows(backtest_id, results.get('daily_positions')))
+
+    db.execute(insert(models.Metrics.__table__).values(
         backtest_id=backtest_id,
         total_return=results.get('total_return', 0),
         sharpe=results.get('sharpe'),
         max_drawdown=results.get('max_drawdown', 0),
         win_rate=results.get('win_rate'),
-        avg_trade_return=results.get('avg_trade_return')
-    )
-    db.add(metrics)
+        avg_trade_return=results.get('avg_trade_return'),
+        extra_json=json.dumps(results.get('extra_metrics', {}))
+    ))
+
+    if results.get('snapshot') is not None:
+        db.execute(update(models.Backtest.__table__)
+                   .where(models.Backtest.__table__.c.id == backtest_id)
+                   .values(snapshot_json=json.dumps(results['snapshot'])))
+
+    _delete_result_payloads(db, [backtest_id])
+
+def _delete_results(db: Session, backtest_id: int):
+    db.query(models.Trade).filter(models.Trade.backtest_id == backtest_id).delete()
+    db.query(models.DailyPosition).filter(models.DailyPosition.backtest_id == backtest_id).delete()
+    db.query(models.Metrics).filter(models.Metrics.backtest_id == backtest_id).delete()
+    _delete_result_payloads(db, [backtest_id])
+
+def clear_backtest_results(db: Session, backtest_id: int):
+    """Remover trades, posições e métricas (para re-execução completa)"""
+    _delete_results(db, backtest_id)
+    db.commit()
+
+def replace_backtest_results(db: Session, backtest: models.Backtest, results: dict):
+    """
+    Trocar os resultados de um re-run numa transação: se a escrita falhar,
+    os resultados anteriores continuam. end_date passa à última barra do run.
+    """
+    _delete_results(db, backtest.id)
+    _insert_results(db, backtest.id, results)
+    if results.get('daily_positions'):
+        backtest.end_date = results['daily_positions'][-1]['date']
+    db.commit()
+    _expire_results(db, backtest.id)
+
+def extend_backtest_results(db: Session, backtest: models.Backtest, resumed: dict, metrics: dict):
+    """Anexar barras de um resume e substituir métricas e snapshot"""
+    _bulk_insert(db, models.Trade, _TRADE_COLUMNS, _trade_rows(backtest.id, resumed.get('trades', [])))
+    _bulk_insert(db, models.DailyPosition, _POSITION_COLUMNS,
+                 _position_rows(backtest.id, resumed.get('daily_positions')))
+    
+    db.query(models.Metrics).filter(models.Metrics.backtest_id == backtest.id).update({
+        'total_return': metrics.get('total_return', 0),
+        'sharpe': metrics.get('sharpe'),
+        'max_drawdown': metrics.get('max_drawdown', 0),
+        'win_rate': metrics.get('win_rate'),
+        'avg_trade_return': metrics.get('avg_trade_return'),
+        'extra_json': json.dumps(metrics.get('extra_metrics', {}))
+    })
     
+    if resumed['daily_positions']:
+        backtest.end_date = resumed['daily_positions'][-1]['date']
+    backtest.snapshot_json = json.dumps(resumed['snapshot']) if resumed.get('snapshot') else None
+    _delete_result_payloads(db, [backtest.id])
     db.commit()
+    db.expire(backtest, ('trades', 'daily_positions', 'metrics'))
+
+def _delete_result_payloads(db: Session, backtest_ids: List[int]):
+    """Invalidar respostas cacheadas (sem commit; vai na transação de quem altera os resultados)"""
+    table = models.ResultPayload.__table__
+    db.execute(delete(table).where(table.c.backtest_id.in_(backtest_ids)))
+
+def get_result_payload_etag(db: Session, backtest_id: int) -> Optional[str]:
+    """ETag da resposta cacheada, sem ler o payload"""
+    row = (db.query(models.ResultPayload.etag)
+           .filter(models.ResultPayload.backtest_id == backtest_id)
+           .first())
+    return row.etag if row else None
+
+def get_result_payload(db: Session, backtest_id: int) -> Optional[models.ResultPayload]:
+    """Resposta cacheada completa (payload comprimido)"""
+    return db.query(models.ResultPayload).filter(models.ResultPayload.backtest_id == backtest_id).first()
+
+def store_result_payload(db: Session, backtest_id: int, etag: str, encoding: str,
+                         size: int, payload: bytes) -> bool:
+    """Gravar a resposta cacheada; False se outro processo gravou antes"""
+    try:
+        db.execute(insert(models.ResultPayload.__table__).values(
+            backtest_id=backtest_id, etag=etag, encoding=encoding, size=size,
+            payload=payload, created_at=datetime.utcnow()
+        ))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
+def store_backtest_profile(db: Session, backtest_id: int, stats: bytes,
+                           wall_seconds: float, total_calls: int) -> models.BacktestProfile:
+    """Gravar o profile de um run"""
+    profile = models.BacktestProfile(backtest_id=backtest_id, stats=stats,
+                                     wall_seconds=wall_seconds, total_calls=total_calls)
+    db.add(profile)
+    db.commit()
+    return profile
+
+def get_backtest_profile(db: Session, backtest_id: int) -> Optional[models.BacktestProfile]:
+    """Profile gravado de um backtest"""
+    return db.query(models.BacktestProfile).filter(models.BacktestProfile.backtest_id == backtest_id).first()
+
+def get_indicator_series_for_symbol(db: Session, symbol_id: int) -> Dict[str, models.IndicatorSeries]:
+    """Séries de indicadores de um símbolo por indicator_key"""
+    rows = db.query(models.IndicatorSeries).filter(models.IndicatorSeries.symbol_id == symbol_id).all()
+    return {row.indicator_key: row for row in rows}
+
+def get_indicator_series(db: Session, ticker: str, indicator_key: str) -> Optional[models.IndicatorSeries]:
+    """Série empacotada de um indicador de um ticker (uma query)"""
+    return (db.query(models.IndicatorSeries)
+            .join(models.Symbol, models.Symbol.id == models.IndicatorSeries.symbol_id)
+            .filter(and_(models.Symbol.ticker == ticker, models.IndicatorSeries.indicator_key == indicator_key))
+            .first())
+
+def get_expired_backtest_ids(db: Session, failed_before: Optional[datetime],
+                             completed_before: Optional[datetime]) -> List[int]:
+    """Ids de backtests failed/cancelled e concluídos criados antes dos cortes (None = sem corte)"""
+    conditions = []
+    if failed_before is not None:
+        conditions.append(and_(models.Backtest.status.in_(('failed', 'cancelled')),
+                               models.Backtest.created_at < failed_before))
+    if completed_before is not None:
+        conditions.append(and_(models.Backtest.status == 'completed',
+                               models.Backtest.created_at < completed_before))
+    if not conditions:
+        return []
+    return [row.id for row in db.query(models.Backtest.id).filter(or_(*conditions)).all()]
+
+def delete_backtests(db: Session, backtest_ids: List[int]) -> int:
+    """Remover backtests e resultados em lotes (bulk delete, sem carregar no ORM)"""
+    batch_size = config.RETENTION_DELETE_BATCH_SIZE
+    for i in range(0, len(backtest_ids), batch_size):
+        batch = backtest_ids[i:i + batch_size]
+        for model in (models.Trade, models.DailyPosition, models.Metrics, models.ResultPayload,
+                      models.BacktestProfile):
+            db.execute(delete(model.__table__).where(model.__table__.c.backtest_id.in_(batch)))
+        # Tarefas de sweep continuam registradas, só perdem o resultado
+        db.execute(update(models.SweepTask.__table__)
+                   .where(models.SweepTask.__table__.c.backtest_id.in_(batch))
+                   .values(backtest_id=None))
+        db.execute(delete(models.Backtest.__table__).where(models.Backtest.__table__.c.id.in_(batch)))
+        db.commit()
+    return len(backtest_ids)
+
+def get_completed_backtests_for_ticker(db: Session, ticker: str) -> List[models.Backtest]:
+    """Backtests concluídos de um ticker (para refresh)"""
+    return (db.query(models.Backtest)
+            .filter(and_(models.Backtest.ticker == ticker, models.Backtest.status == 'completed'))
+            .all())
+
+def create_job_run(db: Session, job_name: str) -> models.JobRun:
+    """Registrar início de um job"""
+    job_run = models.JobRun(job_name=job_name, started_at=datetime.utcnow(), status='running')
+    db.add(job_run)
+    db.commit()
+    db.refresh(job_run)
+    return job_run
+
+def has_running_job(db: Session, job_name: str, stale_after_seconds: int) -> bool:
+    """Existe execução em andamento (não expirada) deste job?"""
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+    return db.query(models.JobRun).filter(and_(
+        models.JobRun.job_name == job_name,
+        models.JobRun.status == 'running',
+        models.JobRun.started_at >= cutoff
+    )).first() is not None
+
+def finish_job_run(db: Session, job_run: models.JobRun, status: str, message: str = None,
+                   rows_processed: Optional[int] = None):
+    """Registrar fim de um job com duração e linhas processadas"""
+    job_run.finished_at = datetime.utcnow()
+    job_run.duration_seconds = (job_run.finished_at - job_run.started_at).total_seconds()
+    job_run.status = status
+    job_run.message = message
+    job_run.rows_processed = rows_processed
+    db.commit()
+    return job_run
+
+def create_child_job_run(db: Session, job_name: str, parent_id: int) -> models.JobRun:
+    """Registrar início de um job subordinado (ex.: worker de um sweep)"""
+    job_run = models.JobRun(job_name=job_name, started_at=datetime.utcnow(), status='running',
+                            heartbeat_at=datetime.utcnow(), parent_id=parent_id)
+    db.add(job_run)
+    db.commit()
+    db.refresh(job_run)
+    return job_run
+
+def heartbeat_job_run(db: Session, job_run_id: int, rows_processed: Optional[int] = None):
+    """Atualizar o heartbeat (e o progresso) de um job em andamento"""
+    values = {'heartbeat_at': datetime.utcnow()}
+    if rows_processed is not None:
+        values['rows_processed'] = rows_processed
+    db.execute(update(models.JobRun.__table__).where(models.JobRun.__table__.c.id == job_run_id).values(**values))
+    db.commit()
+
+def create_sweep_tasks(db: Session, sweep_id: int, tasks: List[dict]) -> int:
+    """Enfileirar tarefas de um sweep (insert em lote)"""
+    rows = [dict(task, sweep_id=sweep_id, status='pending', attempts=0) for task in tasks]
+    for start in range(0, len(rows), config.RESULTS_INSERT_BATCH_SIZE):
+        db.execute(insert(models.SweepTask.__table__), rows[start:start + config.RESULTS_INSERT_BATCH_SIZE])
+    db.commit()
+    return len(rows)
+
+def claim_sweep_tasks(db: Session, worker_id: str, limit: int,
+                      sweep_id: Optional[int] = None) -> List[models.SweepTask]:
+    """
+    Reservar até ``limit`` tarefas pendentes para um worker.
+
+    FOR UPDATE SKIP LOCKED (PostgreSQL) deixa workers concorrentes pegarem
+    lotes disjuntos sem esperar uns pelos outros; a ordem por ticker agrupa
+    tarefas que compartilham a mesma carga de preços. Tarefas de sweeps
+    cancelados nunca são reservadas.
+    """
+    cancelled_sweeps = select(models.JobRun.id).where(models.JobRun.status == 'cancelled')
+    query = db.query(models.SweepTask).filter(and_(models.SweepTask.status == 'pending',
+                                                   models.SweepTask.sweep_id.notin_(cancelled_sweeps)))
+    if sweep_id is not None:
+        query = query.filter(models.SweepTask.sweep_id == sweep_id)
+    tasks = (query.order_by(models.SweepTask.ticker, models.SweepTask.id)
+             .limit(limit)
+             .with_for_update(skip_locked=True)
+             .all())
+    now = datetime.utcnow()
+    for task in tasks:
+        task.status = 'running'
+        task.worker_id = worker_id
+        task.attempts = (task.attempts or 0) + 1
+        task.heartbeat_at = now
+    db.commit()
+    return tasks
+
+def touch_sweep_tasks(db: Session, task_ids: List[int], worker_id: str):
+    """Heartbeat das tarefas em execução de um worker"""
+    if not task_ids:
+        return
+    table = models.SweepTask.__table__
+    db.execute(update(table)
+               .where(and_(table.c.id.in_(task_ids), table.c.worker_id == worker_id, table.c.status == 'running'))
+               .values(heartbeat_at=datetime.utcnow()))
+    db.commit()
+
+def complete_sweep_task(db: Session, task_id: int, backtest_id: int):
+    """Marcar tarefa concluída com o backtest gravado (se não foi cancelada antes)"""
+    table = models.SweepTask.__table__
+    db.execute(update(table).where(and_(table.c.id == task_id, table.c.status == 'running'))
+               .values(status='completed', backtest_id=backtest_id, last_error=None))
+    db.commit()
+
+def fail_sweep_task(db: Session, task_id: int, error: str, max_attempts: int) -> bool:
+    """Registrar falha; volta para a fila enquanto houver tentativas (True = será re-tentada)"""
+    task = db.query(models.SweepTask).filter(models.SweepTask.id == task_id).first()
+    if task is None or task.status == 'cancelled':
+        return False
+    retry = (task.attempts or 0) < max_attempts
+    task.status = 'pending' if retry else 'failed'
+    task.worker_id = None
+    task.last_error = error
+    db.commit()
+    return retry
+
+def requeue_stale_sweep_tasks(db: Session, stale_before: datetime, max_attempts: int,
+                              sweep_id: Optional[int] = None) -> int:
+    """Devolver à fila tarefas cujo worker parou de enviar heartbeat"""
+    query = db.query(models.SweepTask).filter(and_(models.SweepTask.status == 'running',
+                                                   models.SweepTask.heartbeat_at < stale_before))
+    if sweep_id is not None:
+        query = query.filter(models.SweepTask.sweep_id == sweep_id)
+    stale = query.with_for_update(skip_locked=True).all()
+    for task in stale:
+        task.status = 'pending' if (task.attempts or 0) < max_attempts else 'failed'
+        task.last_error = f"Worker {task.worker_id} stopped sending heartbeats"
+        task.worker_id = None
+    db.commit()
+    return len(stale)
+
+def cancel_sweep_tasks(db: Session, sweep_id: int) -> int:
+    """Cancelar tarefas pendentes e em execução de um sweep; retorna quantas"""
+    table = models.SweepTask.__table__
+    result = db.execute(update(table)
+                        .where(and_(table.c.sweep_id == sweep_id, table.c.status.in_(('pending', 'running'))))
+                        .values(status='cancelled', worker_id=None))
+    db.commit()
+    return result.rowcount
+
+def is_job_run_cancelled(db: Session, job_run_id: int) -> bool:
+    """O job_run (ex.: um sweep) foi cancelado?"""
+    return db.query(models.JobRun.status).filter(models.JobRun.id == job_run_id).scalar() == 'cancelled'
+
+def count_sweep_tasks(db: Session, sweep_id: int) -> Dict[str, int]:
+    """Tarefas por status e total de re-tentativas de um sweep"""
+    counts = dict(db.query(models.SweepTask.status, func.count(models.SweepTask.id))
+                  .filter(models.SweepTask.sweep_id == sweep_id)
+                  .group_by(models.SweepTask.status)
+                  .all())
+    retries = (db.query(func.coalesce(func.sum(models.SweepTask.attempts - 1), 0))
+               .filter(and_(models.SweepTask.sweep_id == sweep_id, models.SweepTask.attempts > 1))
+               .scalar())
+    statuses = ('pending', 'running', 'completed', 'failed', 'cancelled')
+    return {**{status: counts.get(status, 0) for status in statuses},
+            'retries': int(retries)}
+
+def get_backtest_status(db: Session, backtest_id: int) -> Optional[Tuple[str, Optional[str]]]:
+    """(status, mensagem) do backtest, sem carregar resultados"""
+    return (db.query(models.Backtest.status, models.Backtest.message)
+            .filter(models.Backtest.id == backtest_id)
+            .first())
 
 def get_backtest_with_results(db: Session, backtest_id: int):
     """Obter backtest com todos os resultados"""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Float, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Date, Float, Text, DateTime, Boolean, ForeignKey, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -16,9 +16,10 @@ class Symbol(Base):
 
 class Price(Base):
     __tablename__ = 'prices'
-    id = Column(Integer, primary_key=True, index=True)
+    # PostgreSQL: particionada por ano de date, PK (id, date) (migração 007)
+    id = Column(Integer, primary_key=True)
     symbol_id = Column(Integer, ForeignKey('symbols.id'))
-    date = Column(Date, index=True)
+    date = Column(Date)
     open = Column(Float)
     high = Column(Float)
     low = Column(Float)
@@ -28,18 +29,36 @@ class Price(Base):
     __table_args__ = (UniqueConstraint('symbol_id', 'date'),)
     symbol = relationship("Symbol")
 
-class Indicator(Base):
-    __tablename__ = 'indicators'
-    id = Column(Integer, primary_key=True, index=True)
-    symbol_id = Column(Integer, ForeignKey('symbols.id'))
-    date = Column(Date, index=True)
+class IndicatorSeries(Base):
+    __tablename__ = 'indicator_series'
+    # Uma linha por (símbolo, indicador): série inteira empacotada (ver core.indicator_arrays)
+    id = Column(Integer, primary_key=True)
+    symbol_id = Column(Integer, ForeignKey('symbols.id'), nullable=False)
+    indicator_key = Column(String(64), nullable=False)  # sha256 de nome + params canônicos
     name = Column(String)
-    value = Column(Float)
-    params_hash = Column(String)
-    
-    __table_args__ = (UniqueConstraint('symbol_id', 'date', 'name', 'params_hash'),)
+    params_json = Column(Text)  # JSON canônico (chaves ordenadas)
+    start_date = Column(Date)
+    end_date = Column(Date)
+    length = Column(Integer)
+    dates = Column(LargeBinary)  # int32 LE, dias desde 1970-01-01
+    values = Column(LargeBinary)  # float64 LE, alinhado a dates
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint('symbol_id', 'indicator_key'),)
     symbol = relationship("Symbol")
 
+class BacktestGroup(Base):
+    __tablename__ = 'backtest_groups'
+    # Backtests criados juntos sobre a mesma carga de dados (POST /backtests/compare)
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    kind = Column(String, default='compare')
+    ticker = Column(String)
+    start_date = Column(Date)
+    end_date = Column(Date)
+
+    backtests = relationship("Backtest", back_populates="group")
+
 class Backtest(Base):
     __tablename__ = 'backtests'
     id = Column(Integer, primary_key=True, index=True)
@@ -52,14 +71,46 @@ class Backtest(Base):
     initial_cash = Column(Float)
     commission = Column(Float)
     status = Column(String, default='pending')
+    message = Column(Text)  # failure/cancellation reason
+    snapshot_json = Column(Text)
+    # Opções do run original, reaplicadas quando o refresh re-executa
+    analyzers_json = Column(Text)
+    engine_profile_json = Column(Text)
+    group_id = Column(Integer, ForeignKey('backtest_groups.id'))  # comparação que o criou
+
+    __table_args__ = (
+        Index('ix_backtests_ticker_status', 'ticker', 'status'),
+        Index('ix_backtests_group_id', 'group_id'),
+        Index('ix_backtests_status_created_at', 'status', 'created_at'),
+    )
 
     trades = relationship("Trade", back_populates="backtest", cascade="all, delete-orphan")
     daily_positions = relationship("DailyPosition", back_populates="backtest", cascade="all, delete-orphan")
     metrics = relationship("Metrics", back_populates="backtest", uselist=False, cascade="all, delete-orphan")
+    group = relationship("BacktestGroup", back_populates="backtests")
+
+class ResultPayload(Base):
+    __tablename__ = 'result_payloads'
+    # GET /backtests/{id}/results serializado uma vez (ver services.result_cache)
+    backtest_id = Column(Integer, ForeignKey('backtests.id'), primary_key=True)
+    etag = Column(String(64), nullable=False)  # sha256 do JSON
+    encoding = Column(String(16), nullable=False)  # gzip
+    size = Column(Integer)  # bytes do JSON sem compressão
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class BacktestProfile(Base):
+    __tablename__ = 'backtest_profiles'
+    # cProfile de um run pedido com profile=true (ver core.profiling)
+    backtest_id = Column(Integer, ForeignKey('backtests.id'), primary_key=True)
+    wall_seconds = Column(Float)
+    total_calls = Column(Integer)
+    stats = Column(LargeBinary, nullable=False)  # dados do pstats (formato de dump_stats)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 class Trade(Base):
     __tablename__ = 'trades'
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     backtest_id = Column(Integer, ForeignKey('backtests.id'))
     date = Column(Date)
     side = Column(String)  # BUY/SELL
@@ -68,11 +119,13 @@ class Trade(Base):
     commission = Column(Float)
     pnl = Column(Float)
     
+    __table_args__ = (Index('ix_trades_backtest_id_date', 'backtest_id', 'date'),)
     backtest = relationship("Backtest", back_populates="trades")
 
 class DailyPosition(Base):
     __tablename__ = 'daily_positions'
-    id = Column(Integer, primary_key=True, index=True)
+    # PostgreSQL: particionada por hash de backtest_id, PK (id, backtest_id) (migração 007)
+    id = Column(Integer, primary_key=True)
     backtest_id = Column(Integer, ForeignKey('backtests.id'))
     date = Column(Date)
     position_size = Column(Float)
@@ -80,6 +133,7 @@ class DailyPosition(Base):
     equity = Column(Float)
     drawdown = Column(Float)
 
+    __table_args__ = (Index('ix_daily_positions_backtest_id_date', 'backtest_id', 'date'),)
     backtest = relationship("Backtest", back_populates="daily_positions")
 
 class Metrics(Base):
@@ -91,6 +145,7 @@ class Metrics(Base):
     max_drawdown = Column(Float)
     win_rate = Column(Float)
     avg_trade_return = Column(Float)
+    extra_json = Column(Text)
 
     backtest = relationship("Backtest", back_populates="metrics")
 
@@ -101,4 +156,36 @@ class JobRun(Base):
     started_at = Column(DateTime)
     finished_at = Column(DateTime)
     status = Column(String)
-    message = Column(Text)
\ No newline at end of file
+    message = Column(Text)
+    rows_processed = Column(Integer)
+    duration_seconds = Column(Float)
+    heartbeat_at = Column(DateTime)  # workers de sweep: último sinal de vida
+    parent_id = Column(Integer, ForeignKey('job_runs.id'))  # worker -> sweep
+
+    __table_args__ = (Index('ix_job_runs_job_name_status', 'job_name', 'status'),)
+
+class SweepTask(Base):
+    __tablename__ = 'sweep_tasks'
+    # Fila de (ticker, params) de um sweep; workers reservam com FOR UPDATE SKIP LOCKED
+    id = Column(Integer, primary_key=True)
+    sweep_id = Column(Integer, ForeignKey('job_runs.id'), nullable=False)
+    ticker = Column(String, nullable=False)
+    strategy_type = Column(String, nullable=False)
+    params_json = Column(Text)
+    start_date = Column(Date)
+    end_date = Column(Date)
+    initial_cash = Column(Float)
+    commission = Column(Float)
+    engine_profile_json = Column(Text)
+    store_positions = Column(Boolean, default=False)
+    status = Column(String, default='pending')  # pending/running/completed/failed/cancelled
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String)
+    heartbeat_at = Column(DateTime)
+    last_error = Column(Text)
+    backtest_id = Column(Integer, ForeignKey('backtests.id'))
+
+    __table_args__ = (
+        Index('ix_sweep_tasks_status_ticker', 'status', 'ticker'),
+        Index('ix_sweep_tasks_sweep_id_status', 'sweep_id', 'status'),
+    )
\ No newline at end of file
@@ -0,0 +1,73 @@
+import re
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from ..core import config
+
+# Partições anuais de prices criadas pela migração 007: prices_y2024, ...
+_PRICE_PARTITION = re.compile(r'^prices_y(\d{4})$')
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    """A tabela é particionada (PostgreSQL com a migração 007 aplicada)?"""
+    if conn.dialect.name != 'postgresql':
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {'table': table}).scalar()
+
+def price_partition_years(conn: Connection) -> List[int]:
+    """Anos com partição própria em prices (sem a DEFAULT)"""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('prices')"
+    )).scalars()
+    return sorted(int(match.group(1)) for match in map(_PRICE_PARTITION.match, names) if match)
+
+def price_retention_start(today: date) -> Optional[date]:
+    """Primeiro dia mantido por PRICES_RETENTION_YEARS (None = manter tudo)"""
+    if config.PRICES_RETENTION_YEARS <= 0:
+        return None
+    return date(today.year - config.PRICES_RETENTION_YEARS + 1, 1, 1)
+
+def ensure_price_partitions(conn: Connection, through_year: int, min_year: Optional[int] = None) -> List[str]:
+    """
+    Criar as partições anuais faltantes: os anos até ``through_year`` (antes
+    de os dados chegarem), buracos entre partições existentes e anos com
+    linhas em prices_default (ex.: um ano removido e baixado de novo). Essas
+    linhas passam para a partição nova, senão o PostgreSQL recusaria
+    anexá-la. Anos antes de ``min_year`` (fora da retenção) são ignorados.
+    """
+    existing = price_partition_years(conn)
+    wanted = set(range(existing[0] if existing else through_year, through_year + 1))
+    wanted.update(conn.execute(text(
+        "SELECT DISTINCT extract(year FROM date)::int FROM prices_default WHERE date IS NOT NULL"
+    )).scalars())
+    created = []
+    for year in sorted(wanted - set(existing)):
+        if min_year is not None and year < min_year:
+            continue
+        name = f"prices_y{year}"
+        bounds = {'lo': date(year, 1, 1), 'hi': date(year + 1, 1, 1)}
+        conn.execute(text(f"CREATE TABLE {name} (LIKE prices INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        conn.execute(text(f"WITH moved AS (DELETE FROM prices_default WHERE date >= :lo AND date < :hi "
+                          f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"), bounds)
+        conn.execute(text(f"ALTER TABLE prices ATTACH PARTITION {name} "
+                          f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"))
+        created.append(name)
+    return created
+
+def drop_price_partitions_before(conn: Connection, year: int) -> List[str]:
+    """Desanexar e remover partições de anos anteriores a ``year`` e apagar esses anos de prices_default"""
+    dropped = []
+    for old_year in price_partition_years(conn):
+        if old_year >= year:
+            break
+        name = f"prices_y{old_year}"
+        conn.execute(text(f"ALTER TABLE prices DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    conn.execute(text("DELETE FROM prices_default WHERE date < :cutoff"), {'cutoff': date(year, 1, 1)})
+    return dropped
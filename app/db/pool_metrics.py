@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from typing import Dict, Any
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from ..core.logging import get_logger
+
+logger = get_logger("db.pool")
+
+# Checkouts slower than this are logged individually
+SLOW_CHECKOUT_MS = float(os.getenv('DB_POOL_SLOW_CHECKOUT_MS', '100'))
+
+class PoolStats:
+    """Contadores de um pool (thread-safe), agregados por nome do pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.peak_in_use = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def record_checkout(self, wait_ms: float, in_use: int):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+
+    def record_overflow(self):
+        with self._lock:
+            self.overflow_events += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'wait_avg_ms': round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max_ms, 3),
+                'peak_in_use': self.peak_in_use,
+                'overflow_events': self.overflow_events,
+                'timeouts': self.timeouts,
+            }
+
+POOL_STATS: Dict[str, PoolStats] = {}
+
+def get_pool_stats(name: str) -> PoolStats:
+    if name not in POOL_STATS:
+        POOL_STATS[name] = PoolStats(name)
+    return POOL_STATS[name]
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool que mede espera no checkout, conexões em uso e overflow.
+
+    As estatísticas ficam em POOL_STATS pelo ``pool_logging_name`` do engine,
+    então sobrevivem a ``recreate()``/``dispose()``.
+    """
+
+    @property
+    def stats(self) -> PoolStats:
+        return get_pool_stats(self._orig_logging_name or 'default')
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            logger.error("Pool checkout timed out", pool=self.stats.name,
+                         in_use=self.checkedout(), size=self.size(), overflow=self.overflow())
+            raise
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        in_use = self.checkedout()
+        self.stats.record_checkout(wait_ms, in_use)
+        if wait_ms >= SLOW_CHECKOUT_MS:
+            logger.warning("Slow pool checkout", pool=self.stats.name, wait_ms=round(wait_ms, 1),
+                           in_use=in_use, size=self.size())
+        return connection
+
+    def _inc_overflow(self) -> bool:
+        created = super()._inc_overflow()
+        if created and self._overflow > 0:
+            self.stats.record_overflow()
+            logger.info("Pool overflow connection opened", pool=self.stats.name,
+                        overflow=self._overflow, max_overflow=self._max_overflow)
+        return created
+
+def pool_status(engine) -> Dict[str, Any]:
+    """Estado atual + contadores do pool de um engine (para /health)"""
+    pool = engine.pool
+    status = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'in_use': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.stats.as_dict())
+    return status
@@ -1,7 +1,17 @@
-from .base import SessionLocal, engine
+from contextlib import contextmanager
+from .base import SessionLocal, BackgroundSessionLocal, engine
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+@contextmanager
+def background_session():
+    """Sessão curta do pool de background; nunca reutilizar a sessão da request"""
+    db = BackgroundSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
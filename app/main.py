@@ -1,7 +1,12 @@
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
 from app.api import routes
 from app.db import session, base, models
 from app.core.logging import configure_logging, get_logger
+from app.core import config
+from app.core.import_report import startup_report
 import os
 
 # Configurar logging no startup
@@ -15,10 +20,14 @@ app = FastAPI(
 )
 
 app.include_router(routes.router)
+scheduler = None
+events_listener = None
+_import_seconds = time.perf_counter() - _import_started
 
 @app.on_event("startup")
 def startup():
     """Inicializar aplicação"""
+    global scheduler, events_listener
     logger.info("Starting Trading Backtest API")
     
     try:
@@ -29,8 +38,29 @@ def startup():
     except Exception as e:
         logger.error("Failed to create database tables", error=str(e))
         raise
+    
+    if config.SCHEDULER_ENABLED:
+        from app.services.scheduler import create_scheduler
+        scheduler = create_scheduler()
+        scheduler.start()
+        logger.info("Scheduler started", tickers=len(config.SCHEDULER_TICKERS), cron=config.INGESTION_CRON)
+    
+    from app.services.events import create_listener
+    events_listener = create_listener()
+    if events_listener is not None:
+        events_listener.start()
+        logger.info("Events listener started", channel=config.EVENTS_CHANNEL)
+    
+    logger.info("Startup complete", **startup_report(_import_seconds))
 
 @app.on_event("shutdown") 
 def shutdown():
     """Finalizar aplicação"""
-    logger.info("Shutting down Trading Backtest API")
\ No newline at end of file
+    logger.info("Shutting down Trading Backtest API")
+    if scheduler is not None:
+        scheduler.shutdown(wait=False)
+    if events_listener is not None:
+        events_listener.stop()
+    # Só existe se alguma comparação rodou; importar aqui não carrega o engine
+    from app.services.compare import shutdown_pool
+    shutdown_pool()
\ No newline at end of file
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+from datetime import date, timedelta
+from typing import Dict, Any, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.records import PositionBuffer
+from ..core.backtest_engine import STRATEGY_MAP, run_backtest, resume_backtest, compute_run_metrics
+from ..db import crud, models
+from .yfinance_client import get_price_data
+
+logger = logging.getLogger(__name__)
+
+def _warmup_days(backtest: models.Backtest, params: Dict[str, Any]) -> int:
+    """Calendar days that cover the strategy's resume warmup in trading bars"""
+    bars = STRATEGY_MAP[backtest.strategy_type].resume_warmup(params)
+    return int(bars * 1.5) + 10
+
+def _resumable(backtest: models.Backtest) -> bool:
+    """
+    Resume needs a snapshot and no analyzers: analyzer state is not part of
+    the snapshot, so their metrics and output only come from a full re-run
+    """
+    return bool(backtest.snapshot_json) and not json.loads(backtest.analyzers_json or '[]')
+
+def _merged_metrics(backtest: models.Backtest, resumed: Dict[str, Any]) -> Dict[str, Any]:
+    """Recompute metrics over stored + resumed bars"""
+    stored = PositionBuffer.from_rows(sorted(backtest.daily_positions, key=lambda p: p.date))
+    positions = PositionBuffer.concat([stored, resumed['daily_positions']])
+    trades = [{'pnl': trade.pnl, 'commission': trade.commission} for trade in backtest.trades] + resumed['trades']
+
+    metrics = compute_run_metrics(positions, trades, backtest.initial_cash, backtest.start_date)
+    headline = ('total_return', 'sharpe', 'max_drawdown', 'win_rate', 'avg_trade_return')
+    return {
+        'total_return': (resumed['final_cash'] - backtest.initial_cash) / backtest.initial_cash,
+        'sharpe': metrics['sharpe'],
+        'max_drawdown': metrics['max_drawdown'] or 0.0,
+        'win_rate': metrics['win_rate'],
+        'avg_trade_return': metrics['avg_trade_return'],
+        'extra_metrics': {k: v for k, v in metrics.items() if k not in headline},
+    }
+
+async def refresh_backtests_for_ticker(ticker: str, db: Session,
+                                       end_date: Optional[date] = None) -> Dict[str, int]:
+    """
+    Extend every completed backtest of a ticker up to ``end_date``.
+
+    Backtests with a snapshot and no analyzers are resumed over the new bars
+    only; the rest (or those whose data changed before the checkpoint) are
+    fully re-run with their original analyzers and engine profile. Either way the
+    backtest's end_date moves to the last bar available, which is the point
+    of a refresh. Runs happen in a worker thread; ``db`` is only used from
+    the calling one.
+    """
+    job_run = crud.create_job_run(db, f"refresh_backtests:{ticker}")
+    counts = {'resumed': 0, 'rerun': 0, 'unchanged': 0, 'failed': 0}
+
+    try:
+        backtests = crud.get_completed_backtests_for_ticker(db, ticker)
+        if not backtests:
+            crud.finish_job_run(db, job_run, "completed", json.dumps(counts))
+            return counts
+
+        end_date = end_date or date.today()
+
+        # One download covering the earliest bar any backtest needs
+        starts = []
+        for backtest in backtests:
+            params = json.loads(backtest.strategy_params_json or '{}')
+            if _resumable(backtest):
+                checkpoint = date.fromisoformat(json.loads(backtest.snapshot_json)['date'])
+                starts.append(checkpoint - timedelta(days=_warmup_days(backtest, params)))
+            else:
+                starts.append(backtest.start_date)
+
+        data_start = min(starts)
+        data_end = end_date + timedelta(days=1)
+        df = await get_price_data(ticker, data_start, data_end, db)
+        if df is None or df.empty:
+            crud.finish_job_run(db, job_run, "failed", "No data found")
+            return counts
+
+        for backtest in backtests:
+            params = json.loads(backtest.strategy_params_json or '{}')
+            engine_profile = json.loads(backtest.engine_profile_json or '{}')
+            try:
+                if _resumable(backtest):
+                    snapshot = json.loads(backtest.snapshot_json)
+                    if df.index[-1].date().isoformat() <= snapshot['date']:
+                        counts['unchanged'] += 1
+                        continue
+                    try:
+                        resumed = await asyncio.to_thread(
+                            resume_backtest, df, backtest.strategy_type, params, snapshot,
+                            backtest.commission, engine_profile
+                        )
+                        crud.extend_backtest_results(db, backtest, resumed, _merged_metrics(backtest, resumed))
+                        counts['resumed'] += 1
+                        continue
+                    except ValueError as e:
+                        logger.warning(f"Resume not possible for backtest {backtest.id}: {str(e)}")
+
+                # Full re-run from the original start date
+                if backtest.start_date >= data_start:
+                    full_df = df.loc[df.index >= str(backtest.start_date)]
+                else:
+                    full_df = await get_price_data(ticker, backtest.start_date, data_end, db)
+                results = await asyncio.to_thread(
+                    run_backtest, full_df, backtest.strategy_type, params,
+                    backtest.initial_cash, backtest.commission,
+                    analyzers=json.loads(backtest.analyzers_json or '[]'),
+                    engine_profile=engine_profile
+                )
+                crud.replace_backtest_results(db, backtest, results)
+                counts['rerun'] += 1
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error refreshing backtest {backtest.id}: {str(e)}")
+                counts['failed'] += 1
+
+        crud.finish_job_run(db, job_run, "completed", json.dumps(counts))
+        return counts
+
+    except Exception as e:
+        crud.finish_job_run(db, job_run, "failed", str(e))
+        raise e
@@ -0,0 +1,143 @@
+"""
+Comparação de estratégias sobre uma única carga de dados.
+
+O bloco OHLCV é carregado uma vez e cada configuração roda num processo de
+um pool compartilhado (Backtrader é CPU-bound e não paraleliza em threads).
+As curvas de equity são alinhadas ao eixo de datas do bloco e as métricas
+de todas saem de uma passada vetorizada (calculate_metrics_batch).
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core import config
+from ..core.ohlcv import OHLCVBlock
+from ..core.records import as_position_buffer
+from ..core.run_control import RunCancelled, RunControl
+from ..utils.metrics import calculate_metrics_batch, calculate_trade_stats
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _executor(max_workers: int) -> ProcessPoolExecutor:
+    """Pool reaproveitado entre requisições; spawn evita fork de um processo com threads"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def shutdown_pool():
+    """Encerrar o pool (shutdown da aplicação ou pool quebrado)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def run_config(block: OHLCVBlock, strategy_type: str, strategy_params: Dict[str, Any],
+               initial_cash: float, commission: float, engine_profile: Optional[Dict[str, Any]],
+               run_control: Optional[RunControl] = None):
+    """Uma configuração sobre o bloco; roda no processo do pool (ou no chamador)"""
+    from ..core.backtest_engine import run_backtest
+
+    return run_backtest(block, strategy_type, strategy_params, initial_cash, commission,
+                        engine_profile=engine_profile, run_control=run_control)
+
+def run_configs(block: OHLCVBlock, configs: List[Dict[str, Any]], initial_cash: float,
+                commission: float, max_workers: Optional[int] = None,
+                controls: Optional[List[RunControl]] = None) -> List[Any]:
+    """
+    Rodar cada config (strategy_type, strategy_params, engine_profile) sobre
+    o mesmo bloco. Devolve os resultados na ordem das configs, com a exceção
+    no lugar do resultado das que falharam. ``max_workers`` <= 1 roda tudo
+    no thread chamador.
+
+    ``controls`` traz um RunControl por config. No thread chamador ele para
+    o run na barra seguinte; no pool (outro processo) o run cancelado não é
+    interrompido, mas não começa se ainda estiver na fila e seu resultado
+    vira RunCancelled.
+    """
+    max_workers = config.COMPARE_MAX_WORKERS if max_workers is None else max_workers
+    controls = controls or [None] * len(configs)
+    calls = [(block, item['strategy_type'], item['strategy_params'], initial_cash, commission,
+              item.get('engine_profile')) for item in configs]
+
+    if max_workers <= 1 or len(calls) == 1:
+        outcomes = []
+        for args, control in zip(calls, controls):
+            try:
+                outcomes.append(run_config(*args, run_control=control))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+    # O bloco vai por valor a cada processo: alguns KB por ano de dados
+    futures = [_executor(max_workers).submit(run_config, *args) for args in calls]
+    outcomes = []
+    for future, control in zip(futures, controls):
+        if control is not None and control.cancelled:
+            future.cancel()
+            outcomes.append(RunCancelled("Run cancelled"))
+            continue
+        try:
+            outcome = future.result()
+        except BrokenProcessPool:
+            logger.error("Comparison worker pool broke; recreating it on the next request")
+            shutdown_pool()
+            raise
+        except Exception as e:
+            outcome = e
+        if control is not None and control.cancelled:
+            outcome = RunCancelled("Run cancelled")
+        outcomes.append(outcome)
+    return outcomes
+
+def _to_float(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
+
+def comparison_table(dates: np.ndarray, results: List[Dict[str, Any]],
+                     initial_cash: float) -> Tuple[np.ndarray, List[Dict[str, Optional[float]]]]:
+    """
+    Curvas de equity (runs x datas) alinhadas a ``dates`` e as métricas de
+    cada run, calculadas juntas sobre o mesmo eixo. Antes da primeira barra
+    de uma estratégia (aquecimento) vale o capital inicial, sem posição.
+    """
+    days = np.asarray(dates).astype('datetime64[D]')
+    shape = (len(results), len(days))
+    equity, positions, cash = np.full(shape, np.nan), np.zeros(shape), np.full(shape, np.nan)
+    for row, result in enumerate(results):
+        columns = as_position_buffer(result['daily_positions']).array
+        index = np.searchsorted(days, columns['date'])
+        equity[row, index] = columns['equity']
+        positions[row, index] = columns['position_size']
+        cash[row, index] = columns['cash']
+
+    # Carrega o último valor conhecido adiante (datas sem barra da estratégia)
+    bars = np.broadcast_to(np.arange(len(days)), shape)
+    last = np.maximum.accumulate(np.where(np.isnan(equity), -1, bars), axis=1)
+    seen = last >= 0
+    last = np.maximum(last, 0)
+    equity = np.where(seen, np.take_along_axis(equity, last, axis=1), initial_cash)
+    positions = np.where(seen, np.take_along_axis(positions, last, axis=1), 0.0)
+    cash = np.where(seen, np.take_along_axis(cash, last, axis=1), initial_cash)
+
+    batch = calculate_metrics_batch(equity, positions=positions, cash=cash)
+    table = []
+    for row, result in enumerate(results):
+        pnls = np.fromiter((t['pnl'] for t in result['trades']), dtype=np.float64, count=len(result['trades']))
+        stats = calculate_trade_stats(pnls)
+        metrics = {name: _to_float(values[row]) for name, values in batch.items()}
+        metrics.update(win_rate=stats['win_rate'], avg_trade_return=stats['avg_trade_return'],
+                       total_trades=float(len(pnls)))
+        table.append(metrics)
+    return equity, table
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..core import config
+
+logger = logging.getLogger(__name__)
+
+# Status após o qual um backtest não emite mais eventos
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+# Eventos por assinante antes de descartar os mais antigos (cliente lento)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Limite do payload do NOTIFY no PostgreSQL é 8000 bytes
+_MAX_MESSAGE_CHARS = 1000
+
+def _offer(queue: asyncio.Queue, event: Dict[str, Any]):
+    """put_nowait descartando o evento mais antigo se a fila estiver cheia"""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+class EventBus:
+    """
+    Pub/sub em processo de eventos de status por backtest.
+
+    ``dispatch`` pode ser chamado de qualquer thread (os runs do Cerebro rodam
+    em threads); a entrega em cada fila acontece no loop do assinante. O
+    último evento de cada run ainda não terminado fica guardado para quem
+    assina no meio do run.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, List[Tuple[asyncio.Queue, asyncio.AbstractEventLoop]]] = {}
+        self._latest: Dict[int, Dict[str, Any]] = {}
+        self._hooks: List[Callable[[int, Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[int, Dict[str, Any]], None]):
+        """Chamado a cada evento despachado, na thread que despacha (ex.: cancelamento)"""
+        self._hooks.append(hook)
+
+    def subscribe(self, backtest_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(backtest_id, []).append((queue, asyncio.get_running_loop()))
+        return queue
+
+    def unsubscribe(self, backtest_id: int, queue: asyncio.Queue):
+        with self._lock:
+            remaining = [entry for entry in self._subscribers.get(backtest_id, []) if entry[0] is not queue]
+            if remaining:
+                self._subscribers[backtest_id] = remaining
+            else:
+                self._subscribers.pop(backtest_id, None)
+
+    def latest(self, backtest_id: int) -> Optional[Dict[str, Any]]:
+        return self._latest.get(backtest_id)
+
+    def subscriber_count(self, backtest_id: int) -> int:
+        return len(self._subscribers.get(backtest_id, []))
+
+    def dispatch(self, backtest_id: int, event: Dict[str, Any]):
+        with self._lock:
+            if event.get('status') in TERMINAL_STATUSES:
+                self._latest.pop(backtest_id, None)
+            else:
+                self._latest[backtest_id] = event
+            subscribers = list(self._subscribers.get(backtest_id, []))
+
+        for hook in self._hooks:
+            hook(backtest_id, event)
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        for queue, loop in subscribers:
+            if loop is current_loop:
+                _offer(queue, event)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(_offer, queue, event)
+
+bus = EventBus()
+
+def publish(backtest_id: int, status: str, stage: Optional[str] = None, **fields):
+    """
+    Publicar um evento de status/progresso de um backtest.
+
+    Com EVENTS_BACKEND=postgres o evento vai por NOTIFY e é entregue pelo
+    listener de cada worker (inclusive este); senão, direto no bus local.
+    """
+    event = {'backtest_id': backtest_id, 'status': status, 'stage': stage, **fields}
+    if event.get('message'):
+        event['message'] = str(event['message'])[:_MAX_MESSAGE_CHARS]
+
+    if config.EVENTS_BACKEND != 'postgres':
+        bus.dispatch(backtest_id, event)
+        return
+
+    from sqlalchemy import text
+    from ..db.base import background_engine
+
+    try:
+        with background_engine.connect() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"),
+                               {'channel': config.EVENTS_CHANNEL, 'payload': json.dumps(event, default=str)})
+            connection.commit()
+    except Exception as e:
+        # Eventos são best-effort; o status persistido continua valendo
+        logger.warning(f"Failed to publish event for backtest {backtest_id}: {e}")
+        bus.dispatch(backtest_id, event)
+
+class PostgresListener:
+    """LISTEN no canal de eventos numa thread, repassando ao bus local"""
+
+    def __init__(self, dsn: str, channel: str = None):
+        self.dsn = dsn
+        self.channel = channel or config.EVENTS_CHANNEL
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='events-listener', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        import psycopg2
+
+        while not self._stop.is_set():
+            try:
+                connection = psycopg2.connect(self.dsn)
+                connection.autocommit = True
+                connection.cursor().execute(f"LISTEN {self.channel}")
+                while not self._stop.is_set():
+                    if select.select([connection], [], [], 1.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notification = connection.notifies.pop(0)
+                        event = json.loads(notification.payload)
+                        bus.dispatch(event['backtest_id'], event)
+                connection.close()
+            except Exception as e:
+                logger.error(f"Events listener error, reconnecting: {e}")
+                self._stop.wait(5)
+
+def create_listener() -> Optional[PostgresListener]:
+    """Listener do PostgreSQL quando EVENTS_BACKEND=postgres, senão None"""
+    if config.EVENTS_BACKEND != 'postgres':
+        return None
+    from sqlalchemy.engine import make_url
+
+    # libpq não aceita o sufixo de driver do SQLAlchemy (postgresql+psycopg2)
+    dsn = make_url(config.DATABASE_URL).set(drivername='postgresql').render_as_string(hide_password=False)
+    return PostgresListener(dsn)
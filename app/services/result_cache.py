@@ -0,0 +1,169 @@
+"""
+Cache das respostas de GET /backtests/{id}/results.
+
+Os resultados de um backtest concluído só mudam num refresh ou re-run, e
+quem os altera apaga o payload na mesma transação. Por isso o JSON é
+serializado uma vez, comprimido com gzip e guardado em result_payloads,
+com o sha256 do JSON como ETag forte.
+
+Cada processo mantém um LRU, limitado em bytes, dos payloads mais lidos.
+A entrada só é usada se o ETag gravado no banco (uma leitura pela chave
+primária) ainda for o mesmo, então nenhum worker serve um payload já
+invalidado.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from ..api import schemas
+from ..core import config
+from ..db import crud, models
+
+logger = logging.getLogger(__name__)
+
+ENCODING = 'gzip'
+
+class CachedPayload(NamedTuple):
+    etag: str
+    encoding: str
+    body: bytes  # comprimido com ``encoding``
+    size: int  # bytes do JSON sem compressão
+
+class PayloadLRU:
+    """LRU de CachedPayload por backtest_id, limitado pela soma dos bodies"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: 'OrderedDict[int, CachedPayload]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, backtest_id: int, etag: str) -> Optional[CachedPayload]:
+        """Payload em memória se ainda corresponde ao ETag gravado"""
+        with self._lock:
+            payload = self._entries.get(backtest_id)
+            if payload is None or payload.etag != etag:
+                return None
+            self._entries.move_to_end(backtest_id)
+            return payload
+
+    def put(self, backtest_id: int, payload: CachedPayload):
+        if len(payload.body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(backtest_id, None)
+            if previous is not None:
+                self.nbytes -= len(previous.body)
+            self._entries[backtest_id] = payload
+            self.nbytes += len(payload.body)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted.body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+lru = PayloadLRU(config.RESULT_CACHE_MAX_MB * 1024 * 1024)
+
+def build_response(backtest: models.Backtest) -> schemas.BacktestResultResponse:
+    """Resposta de resultados a partir das linhas de trades/posições/métricas"""
+    from ..utils.metrics import calculate_drawdown_series
+
+    drawdowns = calculate_drawdown_series([pos.equity for pos in backtest.daily_positions])
+    metrics = backtest.metrics
+    return schemas.BacktestResultResponse(
+        backtest_id=backtest.id,
+        metrics=schemas.MetricsInfo(
+            total_return=metrics.total_return,
+            sharpe=metrics.sharpe,
+            max_drawdown=metrics.max_drawdown,
+            win_rate=metrics.win_rate,
+            avg_trade_return=metrics.avg_trade_return,
+            extra=json.loads(metrics.extra_json) if metrics.extra_json else {}
+        ),
+        trades=[
+            schemas.TradeInfo(
+                date=trade.date,
+                side=trade.side,
+                price=trade.price,
+                size=trade.size,
+                commission=trade.commission,
+                pnl=trade.pnl
+            ) for trade in backtest.trades
+        ],
+        daily_positions=[
+            schemas.DailyPositionInfo(
+                date=pos.date,
+                position_size=pos.position_size,
+                cash=pos.cash,
+                equity=pos.equity,
+                drawdown=drawdowns[i]
+            ) for i, pos in enumerate(backtest.daily_positions)
+        ],
+        equity_curve=[
+            {"date": pos.date.isoformat(), "equity": pos.equity}
+            for pos in backtest.daily_positions
+        ]
+    )
+
+def serialize(backtest: models.Backtest) -> CachedPayload:
+    """JSON da resposta comprimido; mtime=0 para o mesmo JSON dar os mesmos bytes"""
+    raw = build_response(backtest).model_dump_json().encode()
+    return CachedPayload(
+        etag=hashlib.sha256(raw).hexdigest(),
+        encoding=ENCODING,
+        body=gzip.compress(raw, compresslevel=config.RESULT_CACHE_GZIP_LEVEL, mtime=0),
+        size=len(raw)
+    )
+
+def cache_backtest(db: Session, backtest: models.Backtest) -> CachedPayload:
+    """Serializar, gravar e guardar no LRU a resposta de um backtest concluído"""
+    payload = serialize(backtest)
+    if not crud.store_result_payload(db, backtest.id, payload.etag, payload.encoding,
+                                     payload.size, payload.body):
+        # Outro processo gravou antes: serve-se a versão gravada
+        row = crud.get_result_payload(db, backtest.id)
+        if row is not None:
+            payload = CachedPayload(row.etag, row.encoding, row.payload, row.size)
+    lru.put(backtest.id, payload)
+    return payload
+
+def cache_results(db: Session, backtest_id: int) -> Optional[CachedPayload]:
+    """
+    Serializar no fim de um run. Falhas só são registradas: o backtest
+    continua concluído e o GET monta a resposta sob demanda.
+    """
+    try:
+        backtest = crud.get_backtest_with_results(db, backtest_id)
+        if backtest is None or backtest.status != 'completed':
+            return None
+        return cache_backtest(db, backtest)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not cache results of backtest {backtest_id}: {str(e)}")
+        return None
+
+def get_payload(db: Session, backtest_id: int) -> Optional[CachedPayload]:
+    """Resposta cacheada (LRU ou banco), ou None se ainda não foi serializada"""
+    etag = crud.get_result_payload_etag(db, backtest_id)
+    if etag is None:
+        return None
+    payload = lru.get(backtest_id, etag)
+    if payload is None:
+        row = crud.get_result_payload(db, backtest_id)
+        if row is None:
+            return None
+        payload = CachedPayload(row.etag, row.encoding, row.payload, row.size)
+        lru.put(backtest_id, payload)
+    return payload
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import text
+
+from ..core import config
+from ..db import crud
+from ..db.base import BackgroundSessionLocal, background_engine
+
+logger = logging.getLogger(__name__)
+
+INGESTION_JOB_NAME = "nightly_ingestion"
+RETENTION_JOB_NAME = "results_retention"
+
+@contextmanager
+def job_lock(job_name: str):
+    """
+    Lock entre processos para não sobrepor execuções do mesmo job.
+
+    Postgres usa advisory lock numa conexão dedicada (mantida durante o job);
+    outros bancos caem numa checagem de job_runs em andamento.
+    """
+    if background_engine.dialect.name == 'postgresql':
+        key = zlib.crc32(job_name.encode())
+        with background_engine.connect() as conn:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {'key': key}).scalar()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': key})
+        return
+
+    db = BackgroundSessionLocal()
+    try:
+        running = crud.has_running_job(db, job_name, config.JOB_LOCK_STALE_SECONDS)
+    finally:
+        db.close()
+    yield not running
+
+def _batches(tickers: List[str], size: int) -> List[List[str]]:
+    return [tickers[i:i + size] for i in range(0, len(tickers), size)]
+
+def run_ingestion_job(tickers: Optional[List[str]] = None,
+                      end_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Ingestão em lote do universo configurado + refresh de indicadores/backtests.
+
+    Função comum, como o job de retenção: o APScheduler a roda no seu
+    executor, e download, gravação e backtests não travam o event loop da
+    API. As etapas assíncronas rodam num loop próprio desta thread.
+    """
+    return asyncio.run(_ingest(tickers, end_date))
+
+async def _ingest(tickers: Optional[List[str]], end_date: Optional[date]) -> Dict[str, Any]:
+    # Importados só quando o job roda, não no startup do scheduler
+    from .yfinance_client import download_and_store_batch
+    from .backtest_refresh import refresh_backtests_for_ticker
+
+    tickers = tickers if tickers is not None else config.SCHEDULER_TICKERS
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=config.INGESTION_LOOKBACK_DAYS)
+
+    with job_lock(INGESTION_JOB_NAME) as acquired:
+        if not acquired:
+            logger.warning(f"{INGESTION_JOB_NAME} already running; skipping this execution")
+            return {'status': 'skipped'}
+
+        db = BackgroundSessionLocal()
+        job_run = crud.create_job_run(db, INGESTION_JOB_NAME)
+        started = time.perf_counter()
+        rows: Dict[str, int] = {}
+        failed: List[str] = []
+
+        try:
+            for batch in _batches(tickers, config.INGESTION_BATCH_SIZE):
+                try:
+                    rows.update(await download_and_store_batch(
+                        batch, start_date.isoformat(), (end_date + timedelta(days=1)).isoformat(), db
+                    ))
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Ingestion failed for batch {batch}: {str(e)}")
+                    failed.extend(batch)
+
+            if config.INGESTION_REFRESH_BACKTESTS:
+                for ticker in tickers:
+                    if ticker not in failed:
+                        await refresh_backtests_for_ticker(ticker, db, end_date=end_date)
+
+            status = "completed" if not failed else "partial"
+            summary = {
+                'tickers': len(tickers),
+                'failed': failed,
+                'rows': rows,
+                'elapsed_seconds': round(time.perf_counter() - started, 3),
+            }
+            crud.finish_job_run(db, job_run, status, json.dumps(summary), rows_processed=sum(rows.values()))
+            logger.info(f"{INGESTION_JOB_NAME} {status}: {sum(rows.values())} new rows for {len(tickers)} tickers")
+            return {'status': status, **summary}
+
+        except Exception as e:
+            db.rollback()
+            crud.finish_job_run(db, job_run, "failed", str(e), rows_processed=sum(rows.values()))
+            raise e
+        finally:
+            db.close()
+
+def _maintain_price_partitions(today: date) -> Dict[str, List[str]]:
+    """Partição do próximo ano criada antes dos dados; anos além de PRICES_RETENTION_YEARS removidos"""
+    from ..db import partitions
+
+    with background_engine.begin() as conn:
+        if not partitions.is_partitioned(conn, 'prices'):
+            return {'created': [], 'dropped': []}
+        retention_start = partitions.price_retention_start(today)
+        created = partitions.ensure_price_partitions(
+            conn, today.year + 1, retention_start.year if retention_start else None
+        )
+        dropped = []
+        if retention_start is not None:
+            dropped = partitions.drop_price_partitions_before(conn, retention_start.year)
+    return {'created': created, 'dropped': dropped}
+
+def run_retention_job(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Remover backtests expirados com seus resultados e manter as partições de preços"""
+    now = now or datetime.utcnow()
+    failed_before = (now - timedelta(days=config.FAILED_RESULTS_RETENTION_DAYS)
+                     if config.FAILED_RESULTS_RETENTION_DAYS > 0 else None)
+    completed_before = (now - timedelta(days=config.RESULTS_RETENTION_DAYS)
+                        if config.RESULTS_RETENTION_DAYS > 0 else None)
+
+    with job_lock(RETENTION_JOB_NAME) as acquired:
+        if not acquired:
+            logger.warning(f"{RETENTION_JOB_NAME} already running; skipping this execution")
+            return {'status': 'skipped'}
+
+        db = BackgroundSessionLocal()
+        job_run = crud.create_job_run(db, RETENTION_JOB_NAME)
+        started = time.perf_counter()
+        deleted = 0
+
+        try:
+            expired = crud.get_expired_backtest_ids(db, failed_before, completed_before)
+            deleted = crud.delete_backtests(db, expired)
+            price_partitions = _maintain_price_partitions(now.date())
+
+            summary = {
+                'deleted_backtests': deleted,
+                'price_partitions': price_partitions,
+                'elapsed_seconds': round(time.perf_counter() - started, 3),
+            }
+            crud.finish_job_run(db, job_run, "completed", json.dumps(summary), rows_processed=deleted)
+            logger.info(f"{RETENTION_JOB_NAME} completed: {deleted} backtests removed")
+            return {'status': 'completed', **summary}
+
+        except Exception as e:
+            db.rollback()
+            crud.finish_job_run(db, job_run, "failed", str(e), rows_processed=deleted)
+            raise e
+        finally:
+            db.close()
+
+def create_scheduler() -> AsyncIOScheduler:
+    """Scheduler com o job noturno de ingestão (INGESTION_CRON, fora do pico) e o de retenção"""
+    scheduler = AsyncIOScheduler(timezone=config.SCHEDULER_TIMEZONE)
+    scheduler.add_job(
+        run_ingestion_job,
+        CronTrigger.from_crontab(config.INGESTION_CRON, timezone=config.SCHEDULER_TIMEZONE),
+        id=INGESTION_JOB_NAME,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=3600,
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        run_retention_job,
+        CronTrigger.from_crontab(config.RETENTION_CRON, timezone=config.SCHEDULER_TIMEZONE),
+        id=RETENTION_JOB_NAME,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=3600,
+        replace_existing=True,
+    )
+    return scheduler
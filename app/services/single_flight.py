@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+def canonical_key(*parts: Any) -> str:
+    """Hash estável de partes JSON (dicts com chaves ordenadas, datas em ISO)"""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave numa única execução.
+
+    A primeira chamada executa; as que chegam enquanto ela está em andamento
+    aguardam o mesmo resultado (ou a mesma exceção). Nada é guardado depois
+    que a execução termina, então não é um cache.
+
+    Futures pertencem a um event loop, então o agrupamento é por loop: um
+    thread com seu próprio loop (ex.: worker de sweep com asyncio.run) não
+    aguarda a execução de outro loop, só as do seu.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return any(inflight_key == key for _, inflight_key in self._inflight)
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Executa ``func()`` ou aguarda a execução em andamento; retorna (resultado, compartilhado)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future: Optional[asyncio.Future] = self._inflight.get((loop, key))
+            if future is None:
+                future = loop.create_future()
+                self._inflight[(loop, key)] = future
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            # shield: cancelar quem aguarda não cancela a execução compartilhada
+            return await asyncio.shield(future), True
+
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # marca como lida quando ninguém estava aguardando
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._inflight[(loop, key)]
@@ -0,0 +1,579 @@
+"""
+Sweeps distribuídos de backtests: coordenador, workers e transportes.
+
+    python -m app.services.sweep submit --tickers PETR4.SA,VALE3.SA --strategy sma_cross \
+        --grid '{"fast": [10, 20], "slow": [50, 100]}' --start 2015-01-01 --end 2024-12-31
+    python -m app.services.sweep worker [--worker-id node-1] [--until-idle]
+    python -m app.services.sweep monitor SWEEP_ID
+    python -m app.services.sweep cancel SWEEP_ID
+
+O coordenador grava um job_run "sweep" e enfileira uma tarefa por
+(ticker, params). Workers em qualquer máquina com acesso ao banco reservam
+lotes de tarefas, rodam os backtests, gravam os resultados em lote e
+registram heartbeats no seu job_run "sweep_worker:<id>" (filho do sweep).
+Tarefas que falham ou cujo worker some voltam para a fila até
+SWEEP_MAX_ATTEMPTS tentativas. Cancelar um sweep marca o job_run e as
+tarefas pendentes/em execução como "cancelled"; workers param os runs em
+andamento na barra seguinte ao próximo heartbeat.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Union
+
+from ..core import config
+from ..core.run_control import RunCancelled, RunControl
+from ..db import crud, models
+from ..db.base import BackgroundSessionLocal
+
+logger = logging.getLogger(__name__)
+
+SWEEP_JOB_NAME = "sweep"
+WORKER_JOB_PREFIX = "sweep_worker"
+
+def expand_param_grid(grid: Union[Mapping[str, Iterable[Any]], Iterable[Mapping[str, Any]]]) -> List[Dict[str, Any]]:
+    """Dict de listas -> produto cartesiano; lista de dicts -> como está"""
+    if isinstance(grid, Mapping):
+        names = sorted(grid)
+        return [dict(zip(names, values)) for values in itertools.product(*(list(grid[n]) for n in names))]
+    return [dict(params) for params in grid]
+
+def _task_dict(task) -> Dict[str, Any]:
+    """Linha de sweep_tasks como dict independente da sessão"""
+    return {
+        'id': task.id,
+        'sweep_id': task.sweep_id,
+        'ticker': task.ticker,
+        'strategy_type': task.strategy_type,
+        'params': json.loads(task.params_json or '{}'),
+        'start_date': task.start_date,
+        'end_date': task.end_date,
+        'initial_cash': task.initial_cash,
+        'commission': task.commission,
+        'engine_profile': json.loads(task.engine_profile_json or '{}'),
+        'store_positions': bool(task.store_positions),
+        'attempts': task.attempts,
+    }
+
+# ---------------------------------------------------------------------------
+# Transportes
+# ---------------------------------------------------------------------------
+
+class SweepTransport(ABC):
+    """
+    Fila de tarefas entre coordenador e workers.
+
+    Tarefas são dicts (ver ``_task_dict``); ``fail`` e ``requeue_stale``
+    devolvem a tarefa à fila enquanto ``attempts < max_attempts``.
+    """
+
+    @abstractmethod
+    def submit(self, sweep_id: int, tasks: List[Dict[str, Any]]) -> int:
+        """Enfileirar tarefas; retorna quantas"""
+
+    @abstractmethod
+    def claim(self, worker_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Reservar até ``limit`` tarefas pendentes"""
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str, task_ids: List[int]):
+        """Renovar o heartbeat das tarefas em execução do worker"""
+
+    @abstractmethod
+    def complete(self, task_id: int, backtest_id: int):
+        """Marcar a tarefa concluída com o backtest gravado"""
+
+    @abstractmethod
+    def fail(self, task_id: int, error: str, max_attempts: int) -> bool:
+        """Registrar falha; True se a tarefa volta para a fila"""
+
+    @abstractmethod
+    def requeue_stale(self, sweep_id: int, stale_before: datetime, max_attempts: int) -> int:
+        """Devolver à fila tarefas sem heartbeat desde ``stale_before``"""
+
+    @abstractmethod
+    def counts(self, sweep_id: int) -> Dict[str, int]:
+        """Tarefas por status e total de re-tentativas"""
+
+    @abstractmethod
+    def cancel(self, sweep_id: int) -> int:
+        """Cancelar o sweep: nada mais é reservado e as tarefas abertas viram "cancelled" """
+
+    @abstractmethod
+    def is_cancelled(self, sweep_id: int) -> bool:
+        """O sweep foi cancelado?"""
+
+class DatabaseTransport(SweepTransport):
+    """Fila na tabela sweep_tasks; no PostgreSQL os claims usam FOR UPDATE SKIP LOCKED"""
+
+    def __init__(self, session_factory: Callable = None, sweep_id: Optional[int] = None):
+        self.session_factory = session_factory or BackgroundSessionLocal
+        self.sweep_id = sweep_id  # workers dedicados a um sweep
+
+    def _call(self, func, *args):
+        db = self.session_factory()
+        try:
+            return func(db, *args)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def submit(self, sweep_id, tasks):
+        rows = [{
+            'ticker': task['ticker'],
+            'strategy_type': task['strategy_type'],
+            'params_json': json.dumps(task['params'], sort_keys=True),
+            'start_date': task['start_date'],
+            'end_date': task['end_date'],
+            'initial_cash': task['initial_cash'],
+            'commission': task['commission'],
+            'engine_profile_json': json.dumps(task.get('engine_profile') or {}, sort_keys=True),
+            'store_positions': task.get('store_positions', False),
+        } for task in tasks]
+        return self._call(crud.create_sweep_tasks, sweep_id, rows)
+
+    def claim(self, worker_id, limit):
+        def claim(db):
+            return [_task_dict(task) for task in crud.claim_sweep_tasks(db, worker_id, limit, self.sweep_id)]
+        return self._call(claim)
+
+    def heartbeat(self, worker_id, task_ids):
+        self._call(crud.touch_sweep_tasks, task_ids, worker_id)
+
+    def complete(self, task_id, backtest_id):
+        self._call(crud.complete_sweep_task, task_id, backtest_id)
+
+    def fail(self, task_id, error, max_attempts):
+        return self._call(crud.fail_sweep_task, task_id, error, max_attempts)
+
+    def requeue_stale(self, sweep_id, stale_before, max_attempts):
+        return self._call(crud.requeue_stale_sweep_tasks, stale_before, max_attempts, sweep_id)
+
+    def counts(self, sweep_id):
+        return self._call(crud.count_sweep_tasks, sweep_id)
+
+    def cancel(self, sweep_id):
+        # O job_run do sweep já está "cancelled" (cancel_sweep), então nenhum claim pega estas tarefas
+        return self._call(crud.cancel_sweep_tasks, sweep_id)
+
+    def is_cancelled(self, sweep_id):
+        return self._call(crud.is_job_run_cancelled, sweep_id)
+
+class LocalTransport(SweepTransport):
+    """
+    Fila em memória com a mesma semântica do DatabaseTransport, para rodar
+    coordenador e workers (threads) num único processo sem a tabela de fila.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[int, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._cancelled = set()
+        self._lock = threading.Lock()
+
+    def submit(self, sweep_id, tasks):
+        with self._lock:
+            for task in tasks:
+                task_id = next(self._ids)
+                self._tasks[task_id] = dict(task, id=task_id, sweep_id=sweep_id, status='pending', attempts=0,
+                                            worker_id=None, heartbeat_at=None, last_error=None, backtest_id=None)
+        return len(tasks)
+
+    def claim(self, worker_id, limit):
+        with self._lock:
+            pending = sorted((t for t in self._tasks.values()
+                              if t['status'] == 'pending' and t['sweep_id'] not in self._cancelled),
+                             key=lambda t: (t['ticker'], t['id']))[:limit]
+            now = datetime.utcnow()
+            for task in pending:
+                task.update(status='running', worker_id=worker_id, attempts=task['attempts'] + 1, heartbeat_at=now)
+            return [dict(task) for task in pending]
+
+    def heartbeat(self, worker_id, task_ids):
+        with self._lock:
+            now = datetime.utcnow()
+            for task_id in task_ids:
+                task = self._tasks[task_id]
+                if task['worker_id'] == worker_id and task['status'] == 'running':
+                    task['heartbeat_at'] = now
+
+    def complete(self, task_id, backtest_id):
+        with self._lock:
+            if self._tasks[task_id]['status'] == 'running':
+                self._tasks[task_id].update(status='completed', backtest_id=backtest_id, last_error=None)
+
+    def fail(self, task_id, error, max_attempts):
+        with self._lock:
+            task = self._tasks[task_id]
+            if task['status'] == 'cancelled':
+                return False
+            retry = task['attempts'] < max_attempts
+            task.update(status='pending' if retry else 'failed', worker_id=None, last_error=error)
+            return retry
+
+    def requeue_stale(self, sweep_id, stale_before, max_attempts):
+        with self._lock:
+            stale = [t for t in self._tasks.values()
+                     if t['sweep_id'] == sweep_id and t['status'] == 'running' and t['heartbeat_at'] < stale_before]
+            for task in stale:
+                task.update(status='pending' if task['attempts'] < max_attempts else 'failed',
+                            last_error=f"Worker {task['worker_id']} stopped sending heartbeats", worker_id=None)
+            return len(stale)
+
+    def counts(self, sweep_id):
+        with self._lock:
+            tasks = [t for t in self._tasks.values() if t['sweep_id'] == sweep_id]
+        counts = {status: sum(t['status'] == status for t in tasks)
+                  for status in ('pending', 'running', 'completed', 'failed', 'cancelled')}
+        counts['retries'] = sum(max(t['attempts'] - 1, 0) for t in tasks)
+        return counts
+
+    def cancel(self, sweep_id):
+        with self._lock:
+            self._cancelled.add(sweep_id)
+            open_tasks = [t for t in self._tasks.values()
+                          if t['sweep_id'] == sweep_id and t['status'] in ('pending', 'running')]
+            for task in open_tasks:
+                task.update(status='cancelled', worker_id=None)
+            return len(open_tasks)
+
+    def is_cancelled(self, sweep_id):
+        with self._lock:
+            return sweep_id in self._cancelled
+
+# ---------------------------------------------------------------------------
+# Coordenador
+# ---------------------------------------------------------------------------
+
+def submit_sweep(transport: SweepTransport, tickers: List[str], strategy_type: str, param_grid,
+                 start_date: date, end_date: date, initial_cash: float = 100000.0, commission: float = 0.001,
+                 engine_profile: Optional[Dict[str, Any]] = None, store_positions: bool = False,
+                 session_factory: Callable = None) -> int:
+    """
+    Registrar o sweep em job_runs e enfileirar uma tarefa por (ticker, params).
+
+    Params são validados aqui, antes de qualquer worker rodar. Sem
+    ``store_positions`` só trades e métricas de cada run são gravados.
+    """
+    from ..core.strategy_registry import validate_strategy_params
+
+    param_sets = [validate_strategy_params(strategy_type, params) for params in expand_param_grid(param_grid)]
+    tasks = [{
+        'ticker': ticker,
+        'strategy_type': strategy_type,
+        'params': params,
+        'start_date': start_date,
+        'end_date': end_date,
+        'initial_cash': initial_cash,
+        'commission': commission,
+        'engine_profile': engine_profile or {},
+        'store_positions': store_positions,
+    } for ticker in tickers for params in param_sets]
+
+    db = (session_factory or BackgroundSessionLocal)()
+    try:
+        job_run = crud.create_job_run(db, SWEEP_JOB_NAME)
+        job_run.message = json.dumps({
+            'strategy_type': strategy_type, 'tickers': len(tickers), 'param_sets': len(param_sets),
+            'tasks': len(tasks), 'start_date': str(start_date), 'end_date': str(end_date),
+        })
+        db.commit()
+        sweep_id = job_run.id
+    finally:
+        db.close()
+
+    transport.submit(sweep_id, tasks)
+    logger.info(f"Sweep {sweep_id}: {len(tasks)} tasks queued ({len(tickers)} tickers x {len(param_sets)} params)")
+    return sweep_id
+
+def monitor_sweep(transport: SweepTransport, sweep_id: int, poll_seconds: float = None,
+                  stale_seconds: float = None, max_attempts: int = None, timeout: float = None,
+                  session_factory: Callable = None) -> Dict[str, Any]:
+    """
+    Acompanhar um sweep até todas as tarefas terminarem.
+
+    A cada ciclo devolve à fila tarefas sem heartbeat há ``stale_seconds``
+    (worker morto). No fim grava o resumo (concluídas, falhas, re-tentativas)
+    no job_run do sweep.
+    """
+    poll_seconds = poll_seconds if poll_seconds is not None else config.SWEEP_POLL_SECONDS
+    stale_seconds = stale_seconds if stale_seconds is not None else config.SWEEP_STALE_SECONDS
+    max_attempts = max_attempts or config.SWEEP_MAX_ATTEMPTS
+    started = time.monotonic()
+
+    while True:
+        requeued = transport.requeue_stale(sweep_id, datetime.utcnow() - timedelta(seconds=stale_seconds),
+                                           max_attempts)
+        if requeued:
+            logger.warning(f"Sweep {sweep_id}: requeued {requeued} tasks from unresponsive workers")
+        counts = transport.counts(sweep_id)
+        if counts['pending'] == 0 and counts['running'] == 0:
+            break
+        if timeout is not None and time.monotonic() - started > timeout:
+            return {'status': 'running', **counts}
+        time.sleep(poll_seconds)
+
+    if transport.is_cancelled(sweep_id):
+        status = 'cancelled'
+    else:
+        status = 'completed' if counts['failed'] == 0 else 'partial'
+    db = (session_factory or BackgroundSessionLocal)()
+    try:
+        job_run = db.get(models.JobRun, sweep_id)
+        spec = json.loads(job_run.message or '{}')
+        crud.finish_job_run(db, job_run, status, json.dumps({**spec, **counts}),
+                            rows_processed=counts['completed'])
+    finally:
+        db.close()
+    logger.info(f"Sweep {sweep_id} {status}: {counts}")
+    return {'status': status, **counts}
+
+def cancel_sweep(transport: SweepTransport, sweep_id: int, session_factory: Callable = None) -> Dict[str, Any]:
+    """
+    Cancelar um sweep em andamento.
+
+    O job_run vira "cancelled" primeiro (claims deixam de pegar tarefas do
+    sweep), depois as tarefas pendentes e em execução. Workers percebem no
+    próximo heartbeat e param os runs em andamento. Raises ValueError se o
+    sweep não existe ou já terminou.
+    """
+    db = (session_factory or BackgroundSessionLocal)()
+    try:
+        job_run = db.get(models.JobRun, sweep_id)
+        if job_run is None or job_run.job_name != SWEEP_JOB_NAME:
+            raise ValueError(f"Sweep {sweep_id} not found")
+        if job_run.status != 'running':
+            raise ValueError(f"Sweep {sweep_id} already {job_run.status}")
+        spec = json.loads(job_run.message or '{}')
+        crud.finish_job_run(db, job_run, 'cancelled', json.dumps(spec))
+
+        transport.cancel(sweep_id)
+        counts = transport.counts(sweep_id)
+        crud.finish_job_run(db, job_run, 'cancelled', json.dumps({**spec, **counts}),
+                            rows_processed=counts['completed'])
+    finally:
+        db.close()
+    logger.info(f"Sweep {sweep_id} cancelled: {counts}")
+    return {'status': 'cancelled', **counts}
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+def load_prices(ticker: str, start_date: date, end_date: date, db):
+    """Bloco OHLCV armazenado (ou download) para uma tarefa; roda no thread do worker"""
+    from .yfinance_client import get_price_block
+
+    return asyncio.run(get_price_block(ticker, start_date, end_date, db))
+
+class SweepWorker:
+    """
+    Consome tarefas de um transporte até ficar sem trabalho (ou ser parado).
+
+    Tarefas do mesmo (ticker, período) num lote compartilham uma carga de
+    preços. Um thread envia heartbeats das tarefas em execução e do
+    job_run do worker a cada ``heartbeat_seconds`` e, se o sweep de uma
+    delas foi cancelado, cancela o RunControl dos runs desse sweep.
+    """
+
+    def __init__(self, transport: SweepTransport, sweep_id: int, worker_id: Optional[str] = None,
+                 batch_size: int = None, heartbeat_seconds: float = None, max_attempts: int = None,
+                 session_factory: Callable = None, price_loader: Callable = load_prices):
+        self.transport = transport
+        self.sweep_id = sweep_id
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+        self.batch_size = batch_size or config.SWEEP_CLAIM_BATCH_SIZE
+        self.heartbeat_seconds = heartbeat_seconds or config.SWEEP_HEARTBEAT_SECONDS
+        self.max_attempts = max_attempts or config.SWEEP_MAX_ATTEMPTS
+        self.session_factory = session_factory or BackgroundSessionLocal
+        self.price_loader = price_loader
+        self.counts = {'completed': 0, 'retried': 0, 'failed': 0, 'cancelled': 0}
+        self._running: set = set()
+        self._controls: Dict[int, RunControl] = {}  # sweep_id -> cancelado junto com o sweep
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, until_idle: bool = True, idle_poll_seconds: float = None) -> Dict[str, Any]:
+        """Processar tarefas; com ``until_idle`` retorna quando a fila esvazia"""
+        idle_poll_seconds = idle_poll_seconds if idle_poll_seconds is not None else config.SWEEP_POLL_SECONDS
+        db = self.session_factory()
+        try:
+            job_run = crud.create_child_job_run(db, f"{WORKER_JOB_PREFIX}:{self.worker_id}", self.sweep_id)
+        finally:
+            db.close()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(job_run.id,),
+                                     name=f"sweep-heartbeat-{self.worker_id}", daemon=True)
+        heartbeat.start()
+
+        status, message = 'completed', None
+        try:
+            while not self._stop.is_set():
+                tasks = self.transport.claim(self.worker_id, self.batch_size)
+                if not tasks:
+                    if until_idle:
+                        break
+                    self._stop.wait(idle_poll_seconds)
+                    continue
+                self._run_batch(tasks)
+        except Exception as e:
+            status, message = 'failed', str(e)
+            raise
+        finally:
+            self._stop.set()
+            heartbeat.join()
+            db = self.session_factory()
+            try:
+                job_run = db.get(models.JobRun, job_run.id)
+                crud.finish_job_run(db, job_run, status, message or json.dumps(self.counts),
+                                    rows_processed=self.counts['completed'])
+            finally:
+                db.close()
+        return {'worker_id': self.worker_id, **self.counts}
+
+    def _heartbeat_loop(self, job_run_id: int):
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                self.transport.heartbeat(self.worker_id, list(self._running))
+                db = self.session_factory()
+                try:
+                    crud.heartbeat_job_run(db, job_run_id, self.counts['completed'])
+                finally:
+                    db.close()
+                for sweep_id, control in list(self._controls.items()):
+                    if not control.cancelled and self.transport.is_cancelled(sweep_id):
+                        logger.info(f"Sweep {sweep_id} cancelled; worker {self.worker_id} stops its runs")
+                        control.cancel()
+            except Exception as e:
+                logger.warning(f"Sweep worker {self.worker_id} heartbeat failed: {e}")
+
+    def _run_batch(self, tasks: List[Dict[str, Any]]):
+        self._running.update(task['id'] for task in tasks)
+        # Registrado já no claim: um cancelamento durante a carga de dados também é visto
+        for task in tasks:
+            self._controls.setdefault(task['sweep_id'], RunControl())
+        key = lambda task: (task['ticker'], task['start_date'], task['end_date'])
+        for (ticker, start_date, end_date), group in itertools.groupby(sorted(tasks, key=key), key=key):
+            group = list(group)
+            db = self.session_factory()
+            try:
+                df = self.price_loader(ticker, start_date, end_date, db)
+                if df is None or len(df) == 0:
+                    raise ValueError(f"No data found for {ticker}")
+                for task in group:
+                    self._run_task(task, df, db)
+            except Exception as e:
+                db.rollback()
+                for task in group:
+                    if task['id'] in self._running:
+                        self._fail(task, e)
+            finally:
+                db.close()
+
+    def _run_task(self, task: Dict[str, Any], df, db):
+        from ..core.backtest_engine import run_backtest
+
+        control = self._controls[task['sweep_id']]
+        try:
+            if control.cancelled:
+                raise RunCancelled(f"Sweep {task['sweep_id']} cancelled")
+            results = run_backtest(df, task['strategy_type'], task['params'], task['initial_cash'],
+                                   task['commission'], engine_profile=task['engine_profile'],
+                                   run_control=control)
+            if not task['store_positions']:
+                results = dict(results, daily_positions=None)
+            # Backtest e resultados na mesma transação: nunca um "completed" sem resultados
+            backtest_id = crud.create_backtest_with_results(db, {
+                'ticker': task['ticker'], 'start_date': task['start_date'], 'end_date': task['end_date'],
+                'strategy_type': task['strategy_type'], 'strategy_params_json': task['params'],
+                'initial_cash': task['initial_cash'], 'commission': task['commission'],
+                'engine_profile': task['engine_profile'], 'status': 'completed',
+            }, results)
+        except RunCancelled:
+            # A tarefa já está "cancelled" no transporte
+            db.rollback()
+            self._running.discard(task['id'])
+            self.counts['cancelled'] += 1
+            return
+        except Exception as e:
+            db.rollback()
+            self._fail(task, e)
+            return
+        self.transport.complete(task['id'], backtest_id)
+        self._running.discard(task['id'])
+        self.counts['completed'] += 1
+
+    def _fail(self, task: Dict[str, Any], error: Exception):
+        self._running.discard(task['id'])
+        message = f"{type(error).__name__}: {error}"
+        if self.transport.fail(task['id'], message, self.max_attempts):
+            self.counts['retried'] += 1
+            logger.warning(f"Sweep task {task['id']} ({task['ticker']}) failed, will retry: {message}")
+        else:
+            self.counts['failed'] += 1
+            logger.error(f"Sweep task {task['id']} ({task['ticker']}) failed permanently: {message}")
+
+def run_local_sweep(transport: SweepTransport, sweep_id: int, workers: int = 2, **worker_kwargs) -> Dict[str, Any]:
+    """Rodar ``workers`` workers em threads e acompanhar o sweep até o fim (um nó)"""
+    pool = [SweepWorker(transport, sweep_id, worker_id=f"local-{i}", **worker_kwargs) for i in range(workers)]
+    threads = [threading.Thread(target=worker.run, name=f"sweep-{worker.worker_id}") for worker in pool]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return monitor_sweep(transport, sweep_id, session_factory=worker_kwargs.get('session_factory'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    submit = commands.add_parser('submit')
+    submit.add_argument('--tickers', required=True, help="Comma-separated tickers")
+    submit.add_argument('--strategy', required=True)
+    submit.add_argument('--grid', required=True, help='JSON: {"param": [values]} or [{...}, ...]')
+    submit.add_argument('--start', required=True, type=date.fromisoformat)
+    submit.add_argument('--end', required=True, type=date.fromisoformat)
+    submit.add_argument('--initial-cash', type=float, default=100000.0)
+    submit.add_argument('--commission', type=float, default=0.001)
+    submit.add_argument('--store-positions', action='store_true')
+
+    worker = commands.add_parser('worker')
+    worker.add_argument('--sweep-id', type=int, help="Only take tasks of this sweep")
+    worker.add_argument('--worker-id')
+    worker.add_argument('--until-idle', action='store_true', help="Exit when the queue is empty")
+
+    monitor = commands.add_parser('monitor')
+    monitor.add_argument('sweep_id', type=int)
+
+    cancel = commands.add_parser('cancel')
+    cancel.add_argument('sweep_id', type=int)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=config.LOG_LEVEL)
+
+    if args.command == 'submit':
+        sweep_id = submit_sweep(DatabaseTransport(), [t.strip() for t in args.tickers.split(',') if t.strip()],
+                                args.strategy, json.loads(args.grid), args.start, args.end,
+                                args.initial_cash, args.commission, store_positions=args.store_positions)
+        print(sweep_id)
+    elif args.command == 'worker':
+        print(json.dumps(SweepWorker(DatabaseTransport(sweep_id=args.sweep_id), args.sweep_id,
+                                     worker_id=args.worker_id).run(until_idle=args.until_idle)))
+    elif args.command == 'cancel':
+        print(json.dumps(cancel_sweep(DatabaseTransport(), args.sweep_id)))
+    else:
+        print(json.dumps(monitor_sweep(DatabaseTransport(), args.sweep_id)))
+
+if __name__ == '__main__':
+    main()
@@ -1,126 +1,315 @@
+import asyncio
+import numpy as np
 import yfinance as yf
 import pandas as pd
 from sqlalchemy.orm import Session
-from datetime import datetime
-from ..db import models, crud
+from datetime import date, datetime, timedelta
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple, Union
+from ..core import config
+from ..core.indicator_arrays import (canonical_params, indicator_key, merge_series, pack_series,
+                                     slice_series, unpack_series)
+from ..core.ohlcv import OHLCV_COLUMNS, AlignedIndicators, OHLCVBlock
+from ..db import models, crud, partitions
+from .single_flight import SingleFlight
 import logging
 from sqlalchemy import and_
 
 logger = logging.getLogger(__name__)
 
+# Dias sem barra (fins de semana/feriados) tolerados ao decidir se os preços
+# guardados cobrem um período: nas bordas e entre barras consecutivas
+COVERAGE_TOLERANCE_DAYS = 5
+
+# Downloads concorrentes do mesmo ticker/período compartilham uma requisição
+_downloads = SingleFlight()
+
 async def download_and_store_data(ticker: str, start_date: str, end_date: str, db: Session) -> pd.DataFrame:
     """Download de dados do Yahoo Finance e armazenamento no banco"""
+    block = await download_and_store_block(ticker, start_date, end_date, db)
+    return block.frame() if block is not None else None
+
+async def download_and_store_block(ticker: str, start_date: str, end_date: str,
+                                   db: Session) -> Optional[OHLCVBlock]:
+    """Como download_and_store_data, devolvendo o bloco OHLCV imutável"""
+    return await _download_block(ticker, start_date, end_date, lambda: nullcontext(db))
+
+async def _download_block(ticker: str, start_date: str, end_date: str,
+                          sessions: Callable[[], ContextManager[Session]]) -> Optional[OHLCVBlock]:
+    key = (ticker, str(start_date), str(end_date))
+    block, shared = await _downloads.run(key, lambda: _download_and_store(ticker, start_date, end_date, sessions))
+    if shared:
+        # Sem cópia defensiva: o bloco é somente leitura
+        logger.info(f"Coalesced download for {ticker} {start_date}..{end_date}")
+    return block
+
+async def _download_and_store(ticker: str, start_date: str, end_date: str,
+                              sessions: Callable[[], ContextManager[Session]]) -> Optional[OHLCVBlock]:
     try:
-        
-        df = yf.download(ticker, start=start_date, end=end_date, progress=False)
+        # Em thread para não bloquear o loop (e deixar downloads idênticos se sobreporem)
+        df = await asyncio.to_thread(yf.download, ticker, start=start_date, end=end_date, progress=False)
         
         if df.empty:
             logger.warning(f"No data found for {ticker}")
             return None
         
-        
-        required_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
-        for col in required_columns:
-            if col not in df.columns:
-                logger.error(f"Missing column {col} for {ticker}")
+        # Só OHLCV segue adiante; o DataFrame do provedor é descartado aqui
+        block = _to_block(ticker, df)
+        if block is None:
+            return None
+        with sessions() as db:
+            if await store_price_data(ticker, block, db) is None:
                 return None
         
-        
-        symbol = db.query(models.Symbol).filter(models.Symbol.ticker == ticker).first()
-        if not symbol:
-            symbol = models.Symbol(
-                ticker=ticker,
-                name=ticker,  
-                exchange="UNKNOWN",
-                currency="USD"
-            )
-            db.add(symbol)
-            db.commit()
-            db.refresh(symbol)
-        
-        
-        for date, row in df.iterrows():
-            
-            existing = db.query(models.Price).filter(
-                and_(models.Price.symbol_id == symbol.id, 
-                     models.Price.date == date.date())
-            ).first()
-            
-            if not existing:
-                price = models.Price(
-                    symbol_id=symbol.id,
-                    date=date.date(),
-                    open=float(row['Open']),
-                    high=float(row['High']),
-                    low=float(row['Low']),
-                    close=float(row['Close']),
-                    volume=int(row['Volume']) if pd.notna(row['Volume']) else 0
-                )
-                db.add(price)
-        
-        db.commit()
-        
-        
-        await calculate_and_store_indicators(symbol.id, df, db)
-        
-        logger.info(f"Successfully stored data for {ticker}: {len(df)} records")
-        return df
+        logger.info(f"Successfully stored data for {ticker}: {len(block)} records")
+        return block
         
     except Exception as e:
         logger.error(f"Error downloading/storing data for {ticker}: {str(e)}")
         raise e
 
-async def calculate_and_store_indicators(symbol_id: int, df: pd.DataFrame, db: Session):
-    """Calcular e armazenar indicadores técnicos"""
-    try:
-       
-        df['SMA_20'] = df['Close'].rolling(window=20).mean()
-        df['SMA_50'] = df['Close'].rolling(window=50).mean()
-        df['SMA_200'] = df['Close'].rolling(window=200).mean()
-        
-        
-        df['TR'] = df[['High', 'Low', 'Close']].apply(
-            lambda x: max(x['High'] - x['Low'], 
-                         abs(x['High'] - x['Close']), 
-                         abs(x['Low'] - x['Close'])), axis=1)
-        df['ATR_14'] = df['TR'].rolling(window=14).mean()
-        
-        
-        df['ROC_60'] = df['Close'].pct_change(periods=60)
+def _to_block(ticker: str, df: pd.DataFrame) -> Optional[OHLCVBlock]:
+    """Bloco OHLCV de um DataFrame do provedor; None (com log) se faltar coluna"""
+    for col in OHLCV_COLUMNS:
+        if col not in df.columns:
+            logger.error(f"Missing column {col} for {ticker}")
+            return None
+    return OHLCVBlock.from_frame(df)
+
+async def store_price_data(ticker: str, data: Union[OHLCVBlock, pd.DataFrame], db: Session) -> int:
+    """Armazenar OHLCV já baixado e recalcular indicadores; retorna linhas novas"""
+    block = data if isinstance(data, OHLCVBlock) else _to_block(ticker, data)
+    if block is None:
+        return None
+    
+    
+    symbol = db.query(models.Symbol).filter(models.Symbol.ticker == ticker).first()
+    if not symbol:
+        symbol = models.Symbol(
+            ticker=ticker,
+            name=ticker,  
+            exchange="UNKNOWN",
+            currency="USD"
+        )
+        db.add(symbol)
+        db.commit()
+        db.refresh(symbol)
+    
+    
+    inserted = 0
+    # Anos já removidos pela retenção não voltam (iriam para prices_default)
+    retention_start = partitions.price_retention_start(date.today())
+    days = block.dates.astype('datetime64[D]').tolist()
+    for day, (open_, high, low, close, volume) in zip(days, block.values.T.tolist()):
+        if retention_start is not None and day < retention_start:
+            continue
         
+        existing = db.query(models.Price).filter(
+            and_(models.Price.symbol_id == symbol.id, 
+                 models.Price.date == day)
+        ).first()
         
-        indicators_to_store = [
-            ('SMA', df['SMA_20'], '{"period": 20}'),
-            ('SMA', df['SMA_50'], '{"period": 50}'),
-            ('SMA', df['SMA_200'], '{"period": 200}'),
-            ('ATR', df['ATR_14'], '{"period": 14}'),
-            ('ROC', df['ROC_60'], '{"period": 60}')
-        ]
+        if not existing:
+            price = models.Price(
+                symbol_id=symbol.id,
+                date=day,
+                open=open_,
+                high=high,
+                low=low,
+                close=close,
+                volume=int(volume) if not np.isnan(volume) else 0
+            )
+            db.add(price)
+            inserted += 1
+    
+    db.commit()
+    
+    
+    await calculate_and_store_indicators(symbol.id, block, db)
+    return inserted
+
+def load_stored_prices(ticker: str, start_date: date, end_date: date, db: Session) -> Optional[pd.DataFrame]:
+    """OHLCV do banco se cobrir o período inteiro, senão None"""
+    block = load_stored_block(ticker, start_date, end_date, db)
+    return block.frame() if block is not None else None
+
+def load_stored_block(ticker: str, start_date: date, end_date: date, db: Session,
+                      dtype=np.float64) -> Optional[OHLCVBlock]:
+    """Como load_stored_prices, como bloco OHLCV (float64 ou float32)"""
+    # Antes da janela de retenção o banco não guarda preços: sempre download
+    retention_start = partitions.price_retention_start(date.today())
+    if retention_start is not None and start_date < retention_start:
+        return None
+    
+    rows = (db.query(models.Price.date, models.Price.open, models.Price.high,
+                     models.Price.low, models.Price.close, models.Price.volume)
+            .join(models.Symbol, models.Symbol.id == models.Price.symbol_id)
+            .filter(and_(models.Symbol.ticker == ticker,
+                         models.Price.date >= start_date,
+                         models.Price.date < end_date))
+            .order_by(models.Price.date)
+            .all())
+    if not rows:
+        return None
+    
+    # Um buraco no meio (ex.: um ano que nunca foi baixado) também não é cobertura
+    last_expected = min(end_date, date.today()) - timedelta(days=1)
+    days = np.array([start_date - timedelta(days=1)] + [row.date for row in rows]
+                    + [last_expected + timedelta(days=1)], dtype='datetime64[D]')
+    if np.diff(days).astype(np.int64).max() - 1 > COVERAGE_TOLERANCE_DAYS:
+        return None
+    
+    return OHLCVBlock.from_rows(rows, dtype=dtype)
+
+def load_universe_panel(tickers: List[str], start_date: date, end_date: date,
+                        db: Session) -> Dict[str, pd.DataFrame]:
+    """
+    Painel datas × tickers (Open/High/Low/Close) com uma única query.
+
+    Tickers sem preços no período ficam como colunas só de NaN.
+    """
+    query = (db.query(models.Symbol.ticker, models.Price.date, models.Price.open,
+                      models.Price.high, models.Price.low, models.Price.close)
+             .join(models.Symbol, models.Symbol.id == models.Price.symbol_id)
+             .filter(and_(models.Symbol.ticker.in_(tickers),
+                          models.Price.date >= start_date,
+                          models.Price.date < end_date)))
+    df = pd.DataFrame(db.execute(query.statement).all(),
+                      columns=['Ticker', 'Date', 'Open', 'High', 'Low', 'Close'])
+    df['Date'] = pd.to_datetime(df['Date'])
+    if df.empty:
+        return {field: pd.DataFrame(columns=tickers, dtype='float64')
+                for field in ('Open', 'High', 'Low', 'Close')}
+
+    wide = df.pivot(index='Date', columns='Ticker').sort_index()
+    return {
+        field: wide[field].reindex(columns=tickers).astype('float64')
+        for field in ('Open', 'High', 'Low', 'Close')
+    }
+
+async def get_price_data(ticker: str, start_date: date, end_date: date, db: Session) -> pd.DataFrame:
+    """Dados aquecidos pela ingestão agendada quando disponíveis; senão download"""
+    block = await get_price_block(ticker, start_date, end_date, db, dtype=np.float64)
+    return block.frame() if block is not None else None
+
+async def fetch_price_data(ticker: str, start_date: date, end_date: date,
+                           sessions: Callable[[], ContextManager[Session]]) -> pd.DataFrame:
+    """
+    Como get_price_data, com sessões curtas de ``sessions`` (ex.:
+    background_session): uma para a leitura e outra para gravar o download,
+    sem conexão do pool presa durante o yf.download
+    """
+    with sessions() as db:
+        block = load_stored_block(ticker, start_date, end_date, db, dtype=np.float64)
+    if block is not None:
+        logger.info(f"Using stored prices for {ticker}: {len(block)} records")
+        return block.frame()
+    block = await _download_block(ticker, start_date, end_date, sessions)
+    return block.astype(np.float64).frame() if block is not None else None
+
+async def get_price_block(ticker: str, start_date: date, end_date: date, db: Session,
+                          dtype=None) -> Optional[OHLCVBlock]:
+    """Como get_price_data, como bloco OHLCV no dtype pedido (padrão: PRICE_BLOCK_DTYPE)"""
+    dtype = dtype or config.PRICE_BLOCK_DTYPE
+    block = load_stored_block(ticker, start_date, end_date, db, dtype=dtype)
+    if block is not None:
+        logger.info(f"Using stored prices for {ticker}: {len(block)} records")
+        return block
+    block = await download_and_store_block(ticker, start_date, end_date, db)
+    return block.astype(dtype) if block is not None else None
+
+async def download_and_store_batch(tickers: List[str], start_date: str, end_date: str,
+                                   db: Session) -> Dict[str, int]:
+    """Download de vários tickers numa chamada; retorna linhas novas por ticker"""
+    raw = yf.download(tickers, start=start_date, end=end_date, progress=False, group_by='ticker')
+    
+    counts = {}
+    for ticker in tickers:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if ticker not in raw.columns.get_level_values(0):
+                counts[ticker] = 0
+                continue
+            df = raw[ticker].dropna(how='all')
+        else:
+            df = raw
         
-        for name, series, params_hash in indicators_to_store:
-            for date, value in series.dropna().items():
-                existing = db.query(models.Indicator).filter(
-                    and_(
-                        models.Indicator.symbol_id == symbol_id,
-                        models.Indicator.date == date.date(),
-                        models.Indicator.name == name,
-                        models.Indicator.params_hash == params_hash
-                    )
-                ).first()
-                
-                if not existing:
-                    indicator = models.Indicator(
-                        symbol_id=symbol_id,
-                        date=date.date(),
-                        name=name,
-                        value=float(value),
-                        params_hash=params_hash
-                    )
-                    db.add(indicator)
+        if df.empty:
+            logger.warning(f"No data found for {ticker}")
+            counts[ticker] = 0
+            continue
         
+        counts[ticker] = await store_price_data(ticker, df, db) or 0
+    return counts
+
+# Indicadores materializados a cada ingestão: (nome, params)
+STORED_INDICATORS = [
+    ('SMA', {'period': 20}),
+    ('SMA', {'period': 50}),
+    ('SMA', {'period': 200}),
+    ('ATR', {'period': 14}),
+    ('ROC', {'period': 60}),
+]
+
+def _compute_indicator(df: pd.DataFrame, name: str, params: dict) -> pd.Series:
+    period = params['period']
+    if name == 'SMA':
+        return df['Close'].rolling(window=period).mean()
+    if name == 'ATR':
+        true_range = pd.concat([df['High'] - df['Low'],
+                                (df['High'] - df['Close']).abs(),
+                                (df['Low'] - df['Close']).abs()], axis=1).max(axis=1)
+        return true_range.rolling(window=period).mean()
+    if name == 'ROC':
+        return df['Close'].pct_change(periods=period)
+    raise ValueError(f"Unknown indicator: {name}")
+
+def compute_indicators(data: Union[OHLCVBlock, pd.DataFrame], specs=STORED_INDICATORS) -> AlignedIndicators:
+    """Indicadores alinhados às datas do bloco, sem tocar no bloco nem no DataFrame"""
+    block = data if isinstance(data, OHLCVBlock) else OHLCVBlock.from_frame(data)
+    frame = block.frame()
+    values = [_compute_indicator(frame, name, params).to_numpy(dtype='f8') for name, params in specs]
+    return AlignedIndicators(block.dates, specs, np.array(values).reshape(len(specs), len(block)))
+
+async def calculate_and_store_indicators(symbol_id: int, data: Union[OHLCVBlock, pd.DataFrame], db: Session):
+    """Calcular indicadores técnicos e gravar cada série empacotada numa linha"""
+    try:
+        stored = crud.get_indicator_series_for_symbol(db, symbol_id)
+        indicators = compute_indicators(data)
+
+        for name, params in STORED_INDICATORS:
+            key = indicator_key(name, params)
+            dates, values = indicators.valid(name, params)
+
+            row = stored.get(key)
+            if row is None and len(dates) == 0:
+                continue
+            if row is not None:
+                # Valores já gravados prevalecem (janelas curtas recalculam menos histórico)
+                dates, values = merge_series(*unpack_series(row.dates, row.values), dates, values)
+            else:
+                row = models.IndicatorSeries(symbol_id=symbol_id, indicator_key=key, name=name,
+                                             params_json=canonical_params(params))
+                db.add(row)
+
+            row.dates, row.values = pack_series(dates, values)
+            row.start_date = dates[0].astype(object)
+            row.end_date = dates[-1].astype(object)
+            row.length = len(dates)
+            row.updated_at = datetime.utcnow()
+
         db.commit()
         logger.info(f"Indicators calculated and stored for symbol_id {symbol_id}")
-        
+
     except Exception as e:
+        db.rollback()
         logger.error(f"Error calculating indicators for symbol_id {symbol_id}: {str(e)}")
-        raise e
\ No newline at end of file
+        raise e
+
+def load_indicator(ticker: str, name: str, params, db: Session, start_date: Optional[date] = None,
+                   end_date: Optional[date] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """(datas datetime64[D], valores float64) de um indicador gravado, numa query; None se ausente"""
+    row = crud.get_indicator_series(db, ticker, indicator_key(name, params))
+    if row is None:
+        return None
+    dates, values = unpack_series(row.dates, row.values)
+    return slice_series(dates, values, start_date, end_date)
\ No newline at end of file
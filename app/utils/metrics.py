@@ -1,31 +1,197 @@
+import math
 import numpy as np
 import pandas as pd
-from typing import List
+from typing import Dict, List, Optional
+
+METRIC_NAMES = (
+    'total_return', 'cagr', 'sharpe', 'sortino', 'calmar',
+    'max_drawdown', 'max_drawdown_duration', 'exposure', 'turnover',
+)
+
+
+def _as_2d(values) -> np.ndarray:
+    """Converter lista/Series/array em matriz float64 (runs x barras)"""
+    if isinstance(values, (pd.Series, pd.DataFrame)):
+        values = values.to_numpy()
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.ndim == 1:
+        arr = arr[np.newaxis, :]
+    if arr.ndim != 2:
+        raise ValueError("Expected a 1-D or 2-D array (runs x bars)")
+    return arr
+
+
+def _nan_to_none(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def drawdown_matrix(equity) -> np.ndarray:
+    """Calcular drawdowns de todas as curvas de uma vez (runs x barras)"""
+    equity = _as_2d(equity)
+    if equity.shape[1] == 0:
+        return equity.copy()
+
+    peak = np.maximum.accumulate(equity, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = (equity - peak) / peak
+    drawdown[~np.isfinite(drawdown)] = 0.0
+    return drawdown
+
+
+def returns_stats(returns, risk_free_rate: float = 0.0, periods: int = 252) -> Dict[str, np.ndarray]:
+    """Sharpe e Sortino por linha de uma matriz de retornos (NaN ignorado)"""
+    returns = _as_2d(returns)
+    valid = ~np.isnan(returns)
+    count = valid.sum(axis=1)
+
+    filled = np.where(valid, returns, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = filled.sum(axis=1) / count
+        centered = np.where(valid, returns - mean[:, np.newaxis], 0.0)
+        std = np.sqrt((centered ** 2).sum(axis=1) / (count - 1))
+
+        excess = mean - risk_free_rate / periods
+        downside = np.sqrt((np.minimum(filled, 0.0) ** 2).sum(axis=1) / count)
+
+        sharpe = np.where((count > 1) & (std > 0), excess / std * np.sqrt(periods), np.nan)
+        sortino = np.where((count > 0) & (downside > 0), excess / downside * np.sqrt(periods), np.nan)
+
+    return {'sharpe': sharpe, 'sortino': sortino}
+
+
+def annual_returns(dates, equity, initial_value: float) -> np.ndarray:
+    """
+    Retorno de cada ano civil como o TimeReturn anual do Backtrader: último
+    valor do ano sobre o último do ano anterior (no primeiro, o valor inicial)
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if equity.size == 0:
+        return equity.copy()
+    years = np.asarray(dates).astype('datetime64[Y]')
+    closes = equity[np.append(np.flatnonzero(years[1:] != years[:-1]), len(years) - 1)]
+    starts = np.concatenate(([initial_value], closes[:-1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return closes / starts - 1.0
+
+
+def annual_sharpe(returns, risk_free_rate: float = 0.01) -> Optional[float]:
+    """Sharpe sobre retornos anuais como o analyzer SharpeRatio (desvio populacional, sem anualizar)"""
+    excess = [float(r) - risk_free_rate for r in returns]
+    if not excess:
+        return None
+    mean = math.fsum(excess) / len(excess)
+    std = math.sqrt(math.fsum((r - mean) ** 2 for r in excess) / len(excess))
+    if std == 0 or not np.isfinite(std):
+        return None
+    return mean / std
+
+
+def calculate_metrics_batch(equity, positions=None, cash=None, risk_free_rate: float = 0.0,
+                            periods: int = 252) -> Dict[str, np.ndarray]:
+    """
+    Calcular métricas para N curvas de equity em uma única passada.
+
+    `equity` é uma matriz (runs x barras) com o mesmo número de barras por run.
+    `positions` (quantidade em carteira) habilita exposure e `cash` habilita
+    turnover; sem eles essas métricas saem como NaN. Retorna um dict de
+    arrays 1-D (um valor por run) com as chaves de METRIC_NAMES.
+    """
+    equity = _as_2d(equity)
+    n_runs, n_bars = equity.shape
+    nan = np.full(n_runs, np.nan)
+
+    if n_bars == 0:
+        return {name: nan.copy() for name in METRIC_NAMES}
+
+    first = equity[:, 0]
+    last = equity[:, -1]
+
+    years = (n_bars - 1) / periods
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = equity[:, 1:] / equity[:, :-1] - 1.0
+        returns[~np.isfinite(returns)] = np.nan
+
+        total_return = last / first - 1.0
+        cagr = nan.copy()
+        if years > 0:
+            cagr = np.where((first > 0) & (last > 0), (last / first) ** (1.0 / years) - 1.0, np.nan)
+
+    stats = returns_stats(returns, risk_free_rate, periods)
+
+    drawdown = drawdown_matrix(equity)
+    max_dd = drawdown.min(axis=1)
+
+    # Duração: barras desde o último topo, maior valor por run
+    bar_idx = np.broadcast_to(np.arange(n_bars), equity.shape)
+    last_peak = np.maximum.accumulate(np.where(drawdown >= 0, bar_idx, 0), axis=1)
+    max_dd_duration = (bar_idx - last_peak).max(axis=1).astype(np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        calmar = np.where(max_dd < 0, cagr / np.abs(max_dd), np.nan)
+
+    exposure = nan.copy()
+    if positions is not None:
+        positions = _as_2d(positions)
+        exposure = (positions != 0).mean(axis=1)
+
+    turnover = nan.copy()
+    if cash is not None and n_bars > 1:
+        # Caixa só varia com execuções, então |Δcash| é o notional negociado
+        cash = _as_2d(cash)
+        traded = np.abs(np.diff(cash, axis=1)).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            turnover = traded / equity.mean(axis=1) / years
+
+    return {
+        'total_return': total_return,
+        'cagr': cagr,
+        'sharpe': stats['sharpe'],
+        'sortino': stats['sortino'],
+        'calmar': calmar,
+        'max_drawdown': max_dd,
+        'max_drawdown_duration': max_dd_duration,
+        'exposure': exposure,
+        'turnover': turnover,
+    }
+
+
+def _max_streak(mask: np.ndarray) -> int:
+    """Maior sequência de True consecutivos"""
+    if not mask.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max())
+
+
+def calculate_trade_stats(pnls) -> Dict[str, float]:
+    """Taxa de acerto, retorno médio e sequências a partir de um array de PnL"""
+    pnls = np.asarray(pnls, dtype=np.float64)
+    if pnls.size == 0:
+        return {'win_rate': 0.0, 'avg_trade_return': 0.0, 'max_win_streak': 0, 'max_loss_streak': 0}
+    return {
+        'win_rate': float((pnls > 0).mean()),
+        'avg_trade_return': float(pnls.mean()),
+        'max_win_streak': _max_streak(pnls > 0),
+        'max_loss_streak': _max_streak(pnls < 0),
+    }
+
+
+def _trade_pnls(trades: List[dict]) -> np.ndarray:
+    return np.fromiter((trade.get('pnl', 0) for trade in trades), dtype=np.float64, count=len(trades))
+
 
 def sharpe_ratio(returns, risk_free_rate: float = 0.0, periods: int = 252):
     """Calcular Sharpe Ratio"""
-    if isinstance(returns, list):
-        returns = pd.Series(returns)
-    
     try:
-        returns_clean = returns.dropna()
-        if len(returns_clean) == 0 or returns_clean.std() == 0:
-            return None
-        
-        excess_return = returns_clean.mean() - risk_free_rate / periods
-        return (excess_return / returns_clean.std()) * np.sqrt(periods)
+        return _nan_to_none(returns_stats(returns, risk_free_rate, periods)['sharpe'][0])
     except Exception:
         return None
 
 def max_drawdown(equity_series):
     """Calcular drawdown máximo"""
-    if isinstance(equity_series, list):
-        equity_series = pd.Series(equity_series)
-    
     try:
-        peak = equity_series.expanding().max()
-        drawdown = (equity_series - peak) / peak
-        return drawdown.min()
+        return _nan_to_none(drawdown_matrix(equity_series).min(axis=1)[0])
     except Exception:
         return None
 
@@ -33,25 +199,13 @@ def calculate_drawdown_series(equity_values: List[float]) -> List[float]:
     """Calcular série de drawdowns"""
     if not equity_values:
         return []
-    
-    equity_series = pd.Series(equity_values)
-    peak = equity_series.expanding().max()
-    drawdown_series = (equity_series - peak) / peak
-    
-    return drawdown_series.fillna(0).tolist()
+
+    return drawdown_matrix(equity_values)[0].tolist()
 
 def calculate_win_rate(trades: List[dict]) -> float:
     """Calcular taxa de acerto"""
-    if not trades:
-        return 0.0
-    
-    winning_trades = sum(1 for trade in trades if trade.get('pnl', 0) > 0)
-    return winning_trades / len(trades)
+    return calculate_trade_stats(_trade_pnls(trades))['win_rate']
 
 def calculate_avg_trade_return(trades: List[dict]) -> float:
     """Calcular retorno médio por trade"""
-    if not trades:
-        return 0.0
-    
-    total_pnl = sum(trade.get('pnl', 0) for trade in trades)
-    return total_pnl / len(trades)
+    return calculate_trade_stats(_trade_pnls(trades))['avg_trade_return']
@@ -0,0 +1,47 @@
+"""
+Memory and throughput of each Cerebro engine mode per strategy.
+
+    python -m benchmarks.bench_engine_profile [--bars 5000] [--repeat 3]
+
+Peak memory is measured with tracemalloc around a single run; throughput
+is bars per second over the best of ``--repeat`` runs.
+"""
+import argparse
+import time
+import tracemalloc
+
+from app.core.backtest_engine import STRATEGY_MAP, run_backtest
+from app.core.engine_profile import ENGINE_MODES, synthetic_ohlcv
+
+
+def measure(df, strategy_type, overrides, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_backtest(df, strategy_type, {}, engine_profile=overrides)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    run_backtest(df, strategy_type, {}, engine_profile=overrides)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return len(df) / best, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bars', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_ohlcv(args.bars)
+    print(f"{'strategy':<20}{'mode':<21}{'bars/s':>12}{'peak MiB':>12}")
+    for strategy_type in STRATEGY_MAP:
+        for mode, overrides in ENGINE_MODES.items():
+            throughput, peak = measure(df, strategy_type, overrides, args.repeat)
+            print(f"{strategy_type:<20}{mode:<21}{throughput:>12,.0f}{peak:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
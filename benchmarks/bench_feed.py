@@ -0,0 +1,89 @@
+"""
+Feed setup: PandasData vs ArrayData over frame views, memmaps and shared memory.
+
+    python -m benchmarks.bench_feed [--bars 50000] [--repeat 3]
+
+Times building and preloading each feed over --bars synthetic bars (best
+of --repeat) and, in a separate run, the tracemalloc peak of that setup. The memmap and
+shared-memory sources are written once beforehand, as a data cache or a
+parent process would.
+"""
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+
+import backtrader as bt
+
+from app.core.array_feed import (
+    ArrayData, attach_shared_arrays, frame_arrays, open_arrays, save_arrays, to_shared_memory,
+)
+from app.core.backtest_engine import PandasData
+from app.core.engine_profile import synthetic_ohlcv
+
+
+def preload(build):
+    """Build a feed and preload its lines; returns the number of bars"""
+    feed = build()
+    bt.Cerebro().adddata(feed)
+    feed._start()
+    feed.preload()
+    return feed.buflen()
+
+
+def setup_seconds(build, repeat):
+    """Best wall time of preload over ``repeat`` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        preload(build)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def setup_peak(build):
+    """Peak traced bytes of one preload (timed separately: tracemalloc slows it)"""
+    gc.collect()
+    tracemalloc.start()
+    preload(build)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bars', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_ohlcv(args.bars)
+    arrays = frame_arrays(df)
+    block, layout = to_shared_memory(arrays)
+
+    with tempfile.TemporaryDirectory() as directory:
+        save_arrays(directory, arrays)
+        feeds = (
+            ('PandasData', lambda: PandasData(dataname=df)),
+            ('ArrayData (frame views)', lambda: ArrayData(dataname=frame_arrays(df))),
+            ('ArrayData (memmap)', lambda: ArrayData(dataname=open_arrays(directory))),
+            ('ArrayData (shared memory)', lambda: ArrayData(dataname=attach_shared_arrays(block, layout))),
+        )
+
+        print(f"{'feed':<28}{'setup ms':>10}{'bars/s':>14}{'peak MiB':>10}")
+        for name, build in feeds:
+            assert preload(build) == args.bars
+            seconds = setup_seconds(build, args.repeat)
+            peak = setup_peak(build)
+            print(f"{name:<28}{seconds * 1000:>10.1f}{args.bars / seconds:>14,.0f}{peak / 1024 / 1024:>10.1f}")
+
+    del feeds
+    gc.collect()
+    block.close()
+    block.unlink()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Peak RSS per ticker-year: enlarged-DataFrame ingestion vs OHLCV blocks.
+
+    python -m benchmarks.bench_ingestion_memory [--tickers 20] [--years 20] [--callers 2]
+
+Each contract runs in a fresh process so ``ru_maxrss`` measures it alone.
+A provider-shaped frame (OHLCV + Adj Close, int64 Volume) stands in for
+each download; --callers requests share it, as coalesced downloads do.
+
+before: indicators are added as columns to the provider frame, every
+        coalesced caller gets a copy of it and the engine is fed through
+        PandasData (the contract prior to OHLCVBlock)
+after:  the frame is reduced to an OHLCVBlock (float64, or float32 with
+        --float32) and dropped, indicators go to AlignedIndicators and the
+        engine reads the block through ArrayData
+
+Reports the RSS held by the loaded data and the peak including one
+sma_cross run per ticker, both per ticker-year above the post-import
+baseline.
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import resource
+
+import numpy as np
+import pandas as pd
+
+from app.core import backtest_engine
+from app.core.engine_profile import synthetic_ohlcv
+from app.core.ohlcv import OHLCVBlock
+from app.services.yfinance_client import compute_indicators
+
+BARS_PER_YEAR = 252
+
+
+def current_rss() -> int:
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def peak_rss() -> int:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def provider_frame(bars: int, seed: int) -> pd.DataFrame:
+    df = synthetic_ohlcv(bars, seed=seed)
+    df['Adj Close'] = df['Close']
+    df['Volume'] = df['Volume'].astype('int64')
+    return df
+
+
+def ingest_before(df, callers: int):
+    """Pre-OHLCVBlock ingestion: indicator columns on the caller's frame, copies for shared callers"""
+    df['SMA_20'] = df['Close'].rolling(window=20).mean()
+    df['SMA_50'] = df['Close'].rolling(window=50).mean()
+    df['SMA_200'] = df['Close'].rolling(window=200).mean()
+    df['TR'] = pd.concat([df['High'] - df['Low'], (df['High'] - df['Close']).abs(),
+                          (df['Low'] - df['Close']).abs()], axis=1).max(axis=1)
+    df['ATR_14'] = df['TR'].rolling(window=14).mean()
+    df['ROC_60'] = df['Close'].pct_change(periods=60)
+    return [df] + [df.copy() for _ in range(callers - 1)]
+
+
+def ingest_after(df, callers: int, dtype):
+    block = OHLCVBlock.from_frame(df, dtype=dtype)
+    indicators = compute_indicators(block)
+    del indicators  # packed and stored in indicator_series, not kept
+    return [block] * callers
+
+
+def measure(contract: str, tickers: int, years: int, callers: int, float32: bool, queue):
+    if contract == 'before':
+        backtest_engine._data_feed = lambda df, *args: backtest_engine.PandasData(dataname=df)
+    dtype = np.float32 if float32 else np.float64
+
+    gc.collect()
+    baseline = current_rss()
+    baseline_peak = peak_rss()
+
+    held = []
+    for seed in range(tickers):
+        df = provider_frame(years * BARS_PER_YEAR, seed)
+        held.append(ingest_before(df, callers) if contract == 'before' else ingest_after(df, callers, dtype))
+        del df
+    gc.collect()
+    loaded = current_rss() - baseline
+
+    for data in held:
+        backtest_engine.run_backtest(data[0], 'sma_cross', {})
+    peak = peak_rss() - max(baseline, baseline_peak)
+    queue.put((loaded, max(peak, loaded)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=20)
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--callers', type=int, default=2)
+    parser.add_argument('--float32', action='store_true')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    ticker_years = args.tickers * args.years
+    print(f"{args.tickers} tickers x {args.years} years, {args.callers} callers per download")
+    print(f"{'contract':<10}{'held KiB/ticker-year':>22}{'peak KiB/ticker-year':>22}")
+    for contract in ('before', 'after'):
+        queue = context.Queue()
+        process = context.Process(target=measure, args=(contract, args.tickers, args.years,
+                                                        args.callers, args.float32, queue))
+        process.start()
+        loaded, peak = queue.get()
+        process.join()
+        print(f"{contract:<10}{loaded / 1024 / ticker_years:>22.1f}{peak / 1024 / ticker_years:>22.1f}")
+
+
+if __name__ == '__main__':
+    main()
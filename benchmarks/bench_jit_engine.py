@@ -0,0 +1,46 @@
+"""
+Throughput of the compiled bar-loop engine against Backtrader per strategy.
+
+    python -m benchmarks.bench_jit_engine [--bars 2520] [--repeat 5]
+
+The first JIT call (compilation, or loading the on-disk cache) is excluded.
+"kernel" is the array loop alone; "full" includes building the same
+result records and metrics as run_backtest.
+"""
+import argparse
+import time
+
+from app.core.backtest_engine import run_backtest
+from app.core.engine_profile import synthetic_ohlcv
+from app.core.jit_engine import JIT_STRATEGY_MAP, NUMBA_AVAILABLE, run_backtest_jit, simulate_arrays
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bars', type=int, default=2520)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = synthetic_ohlcv(args.bars)
+    arrays = [df[column].values for column in ('Open', 'High', 'Low', 'Close')]
+    print(f"numba available: {NUMBA_AVAILABLE}")
+    print(f"{'strategy':<20}{'backtrader s':>14}{'full s':>12}{'kernel s':>12}{'speedup':>10}")
+    for strategy_type in JIT_STRATEGY_MAP:
+        run_backtest_jit(df, strategy_type, {})  # warm up / compile
+        reference = best_of(lambda: run_backtest(df, strategy_type, {}), max(1, args.repeat // 2))
+        full = best_of(lambda: run_backtest_jit(df, strategy_type, {}), args.repeat)
+        kernel = best_of(lambda: simulate_arrays(*arrays, strategy_type, {}), args.repeat)
+        print(f"{strategy_type:<20}{reference:>14.4f}{full:>12.4f}{kernel:>12.5f}{reference / full:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Memory of run results per 10k bars: dict rows vs compact records.
+
+    python -m benchmarks.bench_records [--bars 10000]
+
+Measures with tracemalloc the bytes held by --bars daily positions as a
+list of dicts (the old format) vs a PositionBuffer, the same for trades as
+dicts vs slotted TradeRecords (one trade per bar, an upper bound), and the
+peak allocation of a full sma_cross run_backtest over --bars bars.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from app.core.backtest_engine import run_backtest
+from app.core.engine_profile import synthetic_ohlcv
+from app.core.records import PositionBuffer, TradeRecord
+
+
+def held_bytes(build):
+    """Bytes still allocated by the object ``build`` returns"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bars', type=int, default=10000)
+    args = parser.parse_args()
+
+    df = synthetic_ohlcv(args.bars)
+    days = list(df.index.date)
+    rows = [(day, float(i % 7), 1000.0 + i, 2000.0 + i) for i, day in enumerate(days)]
+
+    def position_dicts():
+        return [{'date': day, 'position_size': size, 'cash': cash, 'equity': equity, 'drawdown': 0.0}
+                for day, size, cash, equity in rows]
+
+    def position_buffer():
+        buffer = PositionBuffer()
+        for day, size, cash, equity in rows:
+            buffer.append(day, size, cash, equity)
+        return buffer
+
+    def trade_dicts():
+        return [{'date': day, 'side': 'BUY', 'price': cash, 'size': 0, 'commission': 0.1, 'pnl': equity}
+                for day, _, cash, equity in rows]
+
+    def trade_records():
+        return [TradeRecord(date=day, side='BUY', price=cash, size=0, commission=0.1, pnl=equity)
+                for day, _, cash, equity in rows]
+
+    print(f"{'container':<28}{'KiB':>10}{'bytes/bar':>12}{'build ms':>10}")
+    for name, build in (('positions: list of dicts', position_dicts),
+                        ('positions: PositionBuffer', position_buffer),
+                        ('trades: dicts', trade_dicts),
+                        ('trades: TradeRecord', trade_records)):
+        held, seconds = held_bytes(build)
+        print(f"{name:<28}{held / 1024:>10.1f}{held / args.bars:>12.1f}{seconds * 1000:>10.1f}")
+
+    gc.collect()
+    tracemalloc.start()
+    results = run_backtest(df, 'sma_cross', {})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"run_backtest sma_cross over {args.bars} bars: peak {peak / 1024 / 1024:.1f} MiB, "
+          f"positions {results['daily_positions'].nbytes / 1024:.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
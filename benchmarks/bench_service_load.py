@@ -0,0 +1,197 @@
+"""
+Offline load test of the API: mixed run/results/list/health traffic.
+
+    python -m benchmarks.bench_service_load [--concurrency 16] [--duration 30]
+        [--mix run=1,results=6,list=2,health=1] [--tickers 8] [--seed-runs 8]
+        [--revalidate] [--database-url URL] [--url URL]
+
+By default the app runs in this process behind httpx's ASGI transport on a
+throwaway SQLite file (or --database-url, e.g. PostgreSQL), and
+yf.download is replaced by a deterministic synthetic provider, so nothing
+touches the network. Background runs share the event loop and thread pool
+with the requests, as in one API worker. --url drives a running deployment
+instead, with whatever data provider it is configured with.
+
+--seed-runs backtests are run to completion first so results requests have
+targets. Then --concurrency clients send requests drawn by the --mix
+weights for --duration seconds; with --revalidate each client sends back
+the ETag it last saw for a backtest, as a dashboard reload does. Reports
+requests, errors, throughput and p50/p95/p99 latency per endpoint.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import zlib
+from collections import defaultdict
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from app.core.engine_profile import synthetic_ohlcv
+
+KINDS = ('run', 'results', 'list', 'health')
+TERMINAL = ('completed', 'failed', 'cancelled')
+START, END = '2015-01-01', '2020-01-01'
+
+
+def fake_download(tickers, start=None, end=None, progress=False, **kwargs):
+    """yf.download stand-in: business-day random walk seeded by the ticker"""
+    index = pd.bdate_range(start, end, inclusive='left')
+    df = synthetic_ohlcv(len(index), seed=zlib.crc32(str(tickers).encode()))
+    df.index = index
+    return df
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for item in text.split(','):
+        kind, _, weight = item.partition('=')
+        if kind.strip() not in KINDS:
+            raise argparse.ArgumentTypeError(f"Unknown request kind: {kind}")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def run_payload(rng: random.Random, tickers: int) -> dict:
+    fast = rng.randint(5, 30)
+    return {
+        'ticker': f"LOAD{rng.randrange(tickers)}",
+        'start_date': START,
+        'end_date': END,
+        'strategy_type': 'sma_cross',
+        'strategy_params': {'fast': fast, 'slow': rng.randint(fast + 10, 120)},
+    }
+
+
+async def wait_completed(http: httpx.AsyncClient, backtest_id: int) -> str:
+    while True:
+        status = (await http.get(f'/backtests/{backtest_id}/status')).json()['status']
+        if status in TERMINAL:
+            return status
+        await asyncio.sleep(0.05)
+
+
+async def seed(http: httpx.AsyncClient, rng: random.Random, runs: int, tickers: int) -> list:
+    """Run backtests to completion so results requests have targets"""
+    ids = []
+    for _ in range(runs):
+        response = await http.post('/backtests/run', json=run_payload(rng, tickers))
+        response.raise_for_status()
+        ids.append(response.json()['id'])
+    statuses = await asyncio.gather(*(wait_completed(http, backtest_id) for backtest_id in ids))
+    completed = [backtest_id for backtest_id, status in zip(ids, statuses) if status == 'completed']
+    if not completed:
+        raise RuntimeError(f"No seed run completed: {statuses}")
+    return completed
+
+
+async def client(http, rng, mix, stop_at, completed, tickers, revalidate, samples, errors):
+    kinds, weights = list(mix), list(mix.values())
+    etags = {}
+    while time.perf_counter() < stop_at:
+        kind = rng.choices(kinds, weights)[0]
+        headers = {}
+        if kind == 'run':
+            request = http.post('/backtests/run', json=run_payload(rng, tickers))
+        elif kind == 'results':
+            backtest_id = rng.choice(completed)
+            if revalidate and backtest_id in etags:
+                headers['If-None-Match'] = etags[backtest_id]
+            request = http.get(f'/backtests/{backtest_id}/results', headers=headers)
+        elif kind == 'list':
+            request = http.get('/backtests', params={'page': rng.randint(1, 3), 'page_size': 20})
+        else:
+            request = http.get('/health')
+
+        started = time.perf_counter()
+        try:
+            response = await request
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            response, failed = None, True
+        samples[kind].append(time.perf_counter() - started)
+        if failed:
+            errors[kind] += 1
+        elif kind == 'results' and 'etag' in response.headers:
+            etags[backtest_id] = response.headers['etag']
+
+
+def report(samples: dict, errors: dict, seconds: float):
+    print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    rows = [(kind, samples[kind]) for kind in KINDS if samples[kind]]
+    rows.append(('total', [value for _, values in rows for value in values]))
+    for kind, values in rows:
+        p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+        failed = sum(errors.values()) if kind == 'total' else errors[kind]
+        print(f"{kind:<10}{len(values):>10}{failed:>8}{len(values) / seconds:>9.1f}"
+              f"{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}")
+
+
+async def drive(http, args, background_tasks=None):
+    rng = random.Random(args.seed)
+    completed = await seed(http, rng, args.seed_runs, args.tickers)
+    print(f"{len(completed)} seed backtests completed; "
+          f"{args.concurrency} clients for {args.duration:g}s, mix {args.mix}")
+
+    samples, errors = defaultdict(list), defaultdict(int)
+    started = time.perf_counter()
+    stop_at = started + args.duration
+    await asyncio.gather(*(
+        client(http, random.Random(args.seed + i + 1), args.mix, stop_at, completed,
+               args.tickers, args.revalidate, samples, errors)
+        for i in range(args.concurrency)
+    ))
+    report(samples, errors, time.perf_counter() - started)
+
+    # Runs still in flight are left to finish, outside the measurement
+    if background_tasks:
+        await asyncio.gather(*list(background_tasks), return_exceptions=True)
+
+
+async def run_in_process(args):
+    # The app reads DATABASE_URL at import time, so it is imported here
+    os.environ['DATABASE_URL'] = args.database_url or \
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    from unittest.mock import patch
+
+    from app import main as service
+    from app.api import routes
+
+    service.startup()
+    try:
+        with patch('app.services.yfinance_client.yf.download', fake_download):
+            transport = httpx.ASGITransport(app=service.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=None) as http:
+                await drive(http, args, routes._background_tasks)
+    finally:
+        service.shutdown()
+
+
+async def run_remote(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as http:
+        await drive(http, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--mix', type=parse_mix, default='run=1,results=6,list=2,health=1')
+    parser.add_argument('--tickers', type=int, default=8)
+    parser.add_argument('--seed-runs', type=int, default=8)
+    parser.add_argument('--revalidate', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database-url', default=None)
+    parser.add_argument('--url', default=None)
+    args = parser.parse_args()
+
+    asyncio.run(run_remote(args) if args.url else run_in_process(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Time to persist one backtest result with crud.store_backtest_results.
+
+    python -m benchmarks.bench_store_results [--bars 5000] [--repeat 5] [--url URL]
+
+Runs sma_cross over --bars synthetic bars once, then stores the result
+--repeat times into fresh Backtest rows and reports the best write time.
+Defaults to a throwaway SQLite file; pass --url to measure PostgreSQL
+(the schema is created with create_all if missing).
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.backtest_engine import run_backtest
+from app.core.engine_profile import synthetic_ohlcv
+from app.db import crud
+from app.db.base import Base
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bars', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--url', default=None)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    results = run_backtest(synthetic_ohlcv(args.bars), 'sma_cross', {'fast': 5, 'slow': 20})
+    print(f"{engine.dialect.name}: {len(results['daily_positions'])} positions, "
+          f"{len(results['trades'])} trades")
+
+    best = float('inf')
+    for _ in range(args.repeat):
+        with Session() as db:
+            backtest = crud.create_backtest(db, {'ticker': 'BENCH', 'strategy_type': 'sma_cross',
+                                                 'initial_cash': 100000.0, 'commission': 0.001})
+            start = time.perf_counter()
+            crud.store_backtest_results(db, backtest.id, results)
+            best = min(best, time.perf_counter() - start)
+    print(f"store_backtest_results: {best * 1000:.1f} ms (best of {args.repeat})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# tests/conftest.py
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import models  # noqa: F401  (registra as tabelas no Base.metadata)
+from app.db.base import Base
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """SQLite em arquivo temporário com o schema dos models (usável de várias threads)"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    return sessionmaker(bind=db_engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def db(session_factory):
+    """Sessão sobre o banco de teste"""
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def sessions(session_factory):
+    """Substituto de background_session: cada uso abre e fecha uma sessão"""
+    @contextmanager
+    def background_session():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+    return background_session
@@ -3,16 +3,24 @@
 import pytest
 import pandas as pd
 import numpy as np
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from unittest.mock import Mock, patch
 import os
+import json
 
-from app.core.backtest_engine import run_backtest, PandasData, STRATEGY_MAP
+from app.core.backtest_engine import run_backtest, resume_backtest, PandasData, STRATEGY_MAP
+from app.core.jit_engine import run_backtest_jit
+from app.core.cross_sectional import (
+    atr_panel, percentile_rank, roc_panel, run_cross_sectional_momentum, synthetic_panel
+)
+from app.core.records import POSITION_DTYPE, PositionBuffer, TradeRecord
+from app.core.engine_profile import DEFAULT_ENGINE_PROFILE, resolve_engine_profile, is_profile_supported, synthetic_ohlcv
 from app.core.strategies.base import BaseStrategy
 from app.core.strategies.sma_cross import SMAStrategy
 from app.core.strategies.donchian import DonchianBreakoutStrategy
 from app.core.strategies.momentum import MomentumStrategy
-from app.core import config, logging
+from app.core import config, logging, strategy_registry
+from app.utils import metrics
 
 
 class TestBacktestEngine:
@@ -96,7 +104,79 @@ class TestBacktestEngine:
         assert isinstance(results['final_cash'], (int, float))
         assert isinstance(results['total_return'], (int, float))
         assert isinstance(results['trades'], list)
-        assert isinstance(results['daily_positions'], list)
+        assert isinstance(results['daily_positions'], PositionBuffer)
+        assert results['daily_positions'].array.dtype == POSITION_DTYPE
+    
+    def test_run_backtest_default_has_no_analyzers(self, sample_data):
+        """Testa caminho padrão: métricas derivadas da curva de equity"""
+        results = run_backtest(sample_data, 'sma_cross', {'fast': 5, 'slow': 20}, 10000.0, 0.001)
+        
+        extra = results['extra_metrics']
+        assert 'analyzers' not in extra
+        for key in ('cagr', 'sortino', 'calmar', 'max_win_streak', 'max_loss_streak', 'exposure'):
+            assert key in extra
+        assert results['max_drawdown'] <= 0
+        json.dumps(extra)
+    
+    def test_run_backtest_selected_analyzers(self, sample_data):
+        """Testa analyzers opt-in e persistência da saída"""
+        results = run_backtest(
+            sample_data, 'sma_cross', {'fast': 5, 'slow': 20}, 10000.0, 0.001,
+            analyzers=['drawdown', 'returns']
+        )
+        
+        analysis = results['extra_metrics']['analyzers']
+        assert set(analysis.keys()) == {'drawdown', 'returns'}
+        assert 'rtot' in analysis['returns']
+        assert results['max_drawdown'] == pytest.approx(-analysis['drawdown']['max']['drawdown'] / 100)
+        json.dumps(results['extra_metrics'])
+    
+    @pytest.mark.parametrize("strategy_type,start", [
+        ('sma_cross', '2015-01-02'),
+        ('donchian_breakout', '2015-01-02'),
+        # Aquecimento atravessa a virada do ano
+        ('momentum', '2014-12-01'),
+    ])
+    def test_default_metrics_match_analyzers(self, strategy_type, start):
+        """Testa que o caminho sem analyzers reproduz as definições dos analyzers"""
+        data = synthetic_ohlcv(1500, seed=3)
+        data.index = pd.bdate_range(start, periods=len(data))
+        default = run_backtest(data, strategy_type, {}, 100000.0, 0.001)
+        analyzed = run_backtest(data, strategy_type, {}, 100000.0, 0.001,
+                                analyzers=['sharpe', 'drawdown', 'trades'])
+        
+        for key in ('sharpe', 'max_drawdown', 'win_rate', 'avg_trade_return'):
+            assert default[key] == pytest.approx(analyzed[key], rel=1e-9), key
+    
+    def test_run_backtest_unknown_analyzer(self, sample_data):
+        """Testa erro com analyzer inválido"""
+        with pytest.raises(ValueError, match="Unknown analyzers"):
+            run_backtest(sample_data, 'sma_cross', {}, 10000.0, 0.001, analyzers=['bogus'])
+    
+    def test_engine_profile_modes_match_default(self, sample_data):
+        """Testa que modos de memória/execução não mudam o resultado"""
+        reference = run_backtest(sample_data, 'sma_cross', {'fast': 5, 'slow': 20}, 10000.0, 0.001)
+        
+        for overrides in ({'exactbars': 1}, {'preload': False, 'runonce': False},
+                          {'stdstats': True, 'observers': ['value', 'drawdown']}):
+            results = run_backtest(
+                sample_data, 'sma_cross', {'fast': 5, 'slow': 20}, 10000.0, 0.001,
+                engine_profile=overrides
+            )
+            assert results['final_cash'] == pytest.approx(reference['final_cash'])
+            assert len(results['trades']) == len(reference['trades'])
+    
+    def test_engine_profile_validation(self):
+        """Testa validação do perfil do engine"""
+        assert resolve_engine_profile(None) == DEFAULT_ENGINE_PROFILE
+        assert is_profile_supported('sma_cross', {'stdstats': True})
+        
+        with pytest.raises(ValueError, match="Unknown engine profile options"):
+            resolve_engine_profile({'turbo': True})
+        with pytest.raises(ValueError, match="exactbars"):
+            resolve_engine_profile({'exactbars': 5})
+        with pytest.raises(ValueError, match="Unknown observers"):
+            resolve_engine_profile({'observers': ['bogus']})
     
     def test_pandas_data_feed(self, sample_data):
         """Testa o feed de dados personalizado"""
@@ -164,7 +244,7 @@ class TestBaseStrategy:
         strategy = TestStrategy()
         assert isinstance(strategy.trades_list, list)
         assert len(strategy.trades_list) == 0
-        assert isinstance(strategy.daily_positions, list)
+        assert isinstance(strategy.daily_positions, PositionBuffer)
         assert len(strategy.daily_positions) == 0
 
 
@@ -244,6 +324,119 @@ class TestStrategyLogic:
         assert isinstance(results['win_rate'], (int, float))
 
 
+class TestStrategyRegistry:
+    """Testes do registro de estratégias plugável"""
+
+    @pytest.fixture(autouse=True)
+    def fresh_registry(self):
+        strategy_registry.clear_registry_cache()
+        yield
+        strategy_registry.clear_registry_cache()
+
+    def test_listing_does_not_import_strategies(self):
+        """Testa que listar estratégias não importa os módulos delas"""
+        import subprocess
+        import sys
+
+        code = ("import sys; from app.core import strategy_registry as r; "
+                "names = r.available_strategies(); "
+                "assert 'app.core.strategies.sma_cross' not in sys.modules, 'imported'; "
+                "print(','.join(names))")
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        assert out.returncode == 0, out.stderr
+        assert out.stdout.strip() == 'sma_cross,donchian_breakout,momentum'
+
+    def test_class_and_schema_are_cached(self):
+        """Testa import memoizado e schema de parâmetros"""
+        assert strategy_registry.get_strategy_class('sma_cross') is SMAStrategy
+        assert strategy_registry.get_strategy_class('sma_cross') is strategy_registry.get_strategy_class('sma_cross')
+
+        schema = strategy_registry.get_param_schema('momentum')
+        assert schema['lookback'] == {'default': 60, 'type': 'int'}
+        assert 'resume_from' not in schema
+
+        with pytest.raises(ValueError, match="Unknown strategy type"):
+            strategy_registry.get_strategy_class('bogus')
+
+    def test_validate_strategy_params(self):
+        """Testa validação de parâmetros contra os params declarados"""
+        assert strategy_registry.validate_strategy_params('sma_cross', {'fast': 10.0}) == {'fast': 10}
+
+        with pytest.raises(ValueError, match="Unknown parameters"):
+            strategy_registry.validate_strategy_params('sma_cross', {'fats': 10})
+        with pytest.raises(ValueError, match="must be int"):
+            strategy_registry.validate_strategy_params('sma_cross', {'fast': 'ten'})
+        with pytest.raises(ValueError, match="must be int"):
+            strategy_registry.validate_strategy_params('sma_cross', {'fast': 10.5})
+
+    def test_request_schema_validation(self):
+        """Testa validação do tipo e dos parâmetros no request"""
+        from pydantic import ValidationError
+        from app.api.schemas import BacktestRunRequest
+
+        base = {'ticker': 'TEST', 'start_date': '2020-01-01', 'end_date': '2021-01-01'}
+        request = BacktestRunRequest(**base, strategy_type='sma_cross', strategy_params={'fast': 5})
+        assert request.strategy_params == {'fast': 5}
+
+        with pytest.raises(ValidationError, match="Unknown strategy type"):
+            BacktestRunRequest(**base, strategy_type='bogus')
+        with pytest.raises(ValidationError, match="Unknown parameters"):
+            BacktestRunRequest(**base, strategy_type='momentum', strategy_params={'fast': 5})
+
+    def test_package_scan(self, tmp_path, monkeypatch):
+        """Testa descoberta de estratégias por varredura de pacote"""
+        import sys
+
+        package = tmp_path / 'my_strategies'
+        package.mkdir()
+        (package / '__init__.py').write_text('')
+        (package / 'always_long.py').write_text(
+            "from app.core.strategies.base import BaseStrategy\n"
+            "class AlwaysLong(BaseStrategy):\n"
+            "    strategy_name = 'always_long'\n"
+            "    params = (('size', 10),)\n"
+            "    def strategy_logic(self):\n"
+            "        if not self.position:\n"
+            "            self.buy(size=self.params.size)\n"
+        )
+        monkeypatch.syspath_prepend(str(tmp_path))
+        monkeypatch.setattr(config, 'STRATEGY_PACKAGES', ['my_strategies'])
+
+        assert 'always_long' in strategy_registry.available_strategies()
+        assert strategy_registry.get_param_schema('always_long') == {'size': {'default': 10, 'type': 'int'}}
+
+        results = run_backtest(synthetic_ohlcv(50), 'always_long', {'size': 5}, 10000.0, 0.0)
+        assert results['daily_positions'][-1]['position_size'] == 5
+        sys.modules.pop('my_strategies.always_long', None)
+        sys.modules.pop('my_strategies', None)
+
+    def test_entry_point_plugins(self, monkeypatch):
+        """Testa estratégias expostas por entry points de pacotes instalados"""
+        from importlib.metadata import EntryPoint
+
+        plugin = EntryPoint(name='sma_plugin', value='app.core.strategies.sma_cross:SMAStrategy',
+                            group=config.STRATEGY_ENTRY_POINT_GROUP)
+        monkeypatch.setattr(strategy_registry, 'entry_points', lambda group: [plugin])
+
+        assert strategy_registry.available_strategies()[-1] == 'sma_plugin'
+        assert strategy_registry.STRATEGY_MAP['sma_plugin'] is SMAStrategy
+        assert 'sma_plugin' in strategy_registry.STRATEGY_MAP
+
+    def test_compatibility_probes_late_plugins(self, monkeypatch):
+        """Testa que um plugin registrado depois de uma consulta também é sondado"""
+        from importlib.metadata import EntryPoint
+
+        assert not is_profile_supported('sma_plugin', {'exactbars': 1})
+
+        plugin = EntryPoint(name='sma_plugin', value='app.core.strategies.sma_cross:SMAStrategy',
+                            group=config.STRATEGY_ENTRY_POINT_GROUP)
+        monkeypatch.setattr(strategy_registry, 'entry_points', lambda group: [plugin])
+        strategy_registry.clear_registry_cache()
+
+        assert is_profile_supported('sma_plugin', {'exactbars': 1})
+
+
 class TestConfigModule:
     """Testes para o módulo de configuração"""
     
@@ -298,6 +491,1815 @@ class TestLoggingModule:
         assert logger is not None
 
 
+class TestStartupImports:
+    """Testes de imports preguiçosos no startup da API"""
+
+    def _run(self, code):
+        import subprocess
+        import sys
+
+        env = dict(os.environ, DATABASE_URL='sqlite:///:memory:')
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        assert out.returncode == 0, out.stderr
+        return out.stdout.strip()
+
+    def test_api_import_skips_heavy_modules(self):
+        """Testa que importar a API não carrega engine nem provedor de dados"""
+        loaded = self._run("import app.main; from app.core.import_report import loaded_heavy_modules; "
+                           "print(','.join(loaded_heavy_modules()))")
+        assert loaded == ''
+
+    def test_logging_not_configured_on_import(self):
+        """Testa que importar o módulo de logging não configura o structlog"""
+        assert self._run("import structlog, app.core.logging; print(structlog.is_configured())") == 'False'
+
+    def test_parse_importtime(self):
+        """Testa parsing da saída de -X importtime"""
+        from app.core.import_report import parse_importtime, startup_report
+
+        stderr = ("import time: self [us] | cumulative | imported package\n"
+                  "import time:       120 |        120 |   app.core\n"
+                  "import time:      3000 |       5000 | app.main\n")
+        assert parse_importtime(stderr) == [('app.core', 120, 120, 1), ('app.main', 3000, 5000, 0)]
+
+        report = startup_report(0.1234)
+        assert report['import_seconds'] == 0.123
+        assert report['rss_mb'] > 0
+        assert isinstance(report['heavy_modules'], list)
+
+
+class TestMetricsModule:
+    """Testes para o engine vetorizado de métricas"""
+    
+    @pytest.fixture
+    def equity_matrix(self):
+        """Matriz de curvas de equity (runs x barras)"""
+        np.random.seed(7)
+        returns = np.random.normal(0.0005, 0.01, (5, 300))
+        return 10000.0 * np.cumprod(1 + returns, axis=1)
+    
+    def test_batch_matches_single_run_wrappers(self, equity_matrix):
+        """Testa que o batch bate com as funções por run"""
+        batch = metrics.calculate_metrics_batch(equity_matrix)
+        
+        for i, curve in enumerate(equity_matrix):
+            returns = pd.Series(curve).pct_change()
+            assert batch['sharpe'][i] == pytest.approx(metrics.sharpe_ratio(returns))
+            assert batch['max_drawdown'][i] == pytest.approx(metrics.max_drawdown(list(curve)))
+    
+    def test_wrappers_match_pandas_reference(self, equity_matrix):
+        """Testa paridade com a implementação pandas original"""
+        equity = pd.Series(equity_matrix[0])
+        returns = equity.pct_change().dropna()
+        peak = equity.expanding().max()
+        
+        expected_sharpe = returns.mean() / returns.std() * np.sqrt(252)
+        assert metrics.sharpe_ratio(returns) == pytest.approx(expected_sharpe)
+        assert metrics.max_drawdown(equity) == pytest.approx(((equity - peak) / peak).min())
+    
+    def test_drawdown_duration_and_exposure(self):
+        """Testa duração do drawdown, exposure e turnover"""
+        equity = [100.0, 110.0, 99.0, 105.0, 120.0, 118.0]
+        positions = [0, 10, 10, 0, 0, 5]
+        cash = [100.0, 0.0, 0.0, 105.0, 120.0, 60.0]
+        
+        result = metrics.calculate_metrics_batch(equity, positions=positions, cash=cash)
+        
+        assert result['max_drawdown'][0] == pytest.approx(-0.1)
+        assert result['max_drawdown_duration'][0] == 2
+        assert result['exposure'][0] == pytest.approx(0.5)
+        assert result['turnover'][0] > 0
+        assert result['calmar'][0] == pytest.approx(result['cagr'][0] / 0.1)
+    
+    def test_constant_equity(self):
+        """Testa curva sem variação (Sharpe indefinido)"""
+        result = metrics.calculate_metrics_batch([[100.0] * 10])
+        
+        assert np.isnan(result['sharpe'][0])
+        assert result['max_drawdown'][0] == 0
+        assert metrics.sharpe_ratio([0.0] * 10) is None
+    
+    def test_drawdown_series_and_trade_helpers(self):
+        """Testa série de drawdown e helpers de trades"""
+        assert metrics.calculate_drawdown_series([]) == []
+        assert metrics.calculate_drawdown_series([100, 110, 99, 120]) == pytest.approx([0, 0, -0.1, 0])
+        
+        trades = [{'pnl': 50.0}, {'pnl': -20.0}, {'pnl': 10.0}, {}]
+        assert metrics.calculate_win_rate(trades) == pytest.approx(0.5)
+        assert metrics.calculate_avg_trade_return(trades) == pytest.approx(10.0)
+        assert metrics.calculate_win_rate([]) == 0.0
+
+
+class TestBacktestResume:
+    """Testes de snapshot/resume incremental"""
+    
+    @pytest.fixture
+    def long_data(self):
+        return synthetic_ohlcv(900, seed=3)
+    
+    @pytest.mark.parametrize("strategy_type,params", [
+        ('sma_cross', {'fast': 10, 'slow': 30}),
+        ('donchian_breakout', {}),
+        ('momentum', {}),
+    ])
+    def test_resume_matches_full_run(self, long_data, strategy_type, params):
+        """Testa que run parcial + resume reproduz o run completo"""
+        full = run_backtest(long_data, strategy_type, params, 100000.0, 0.001)
+        
+        for cut in (500, 650, 800):
+            partial = run_backtest(long_data.iloc[:cut], strategy_type, params, 100000.0, 0.001)
+            resumed = resume_backtest(long_data, strategy_type, params, partial['snapshot'], 0.001)
+            
+            assert len(resumed['daily_positions']) == len(long_data) - cut
+            assert resumed['final_cash'] == pytest.approx(full['final_cash'])
+            trades = partial['trades'] + resumed['trades']
+            assert [t['date'] for t in trades] == [t['date'] for t in full['trades']]
+            assert [t['pnl'] for t in trades] == pytest.approx([t['pnl'] for t in full['trades']])
+    
+    def test_snapshot_contents(self, long_data):
+        """Testa estado salvo no snapshot"""
+        results = run_backtest(long_data, 'momentum', {}, 100000.0, 0.001)
+        snapshot = results['snapshot']
+        
+        assert snapshot['date'] == long_data.index[-1].date().isoformat()
+        assert len(snapshot['state']['returns_history']) <= 252
+        assert 'stop_price' in snapshot['state']
+        json.dumps(snapshot)
+    
+    def test_resume_rejects_changed_history(self, long_data):
+        """Testa que dados revisados antes do checkpoint exigem re-run"""
+        partial = run_backtest(long_data.iloc[:600], 'sma_cross', {}, 100000.0, 0.001)
+        revised = long_data.copy()
+        revised.iloc[599, revised.columns.get_loc('Close')] *= 1.05
+        
+        with pytest.raises(ValueError, match="full re-run required"):
+            resume_backtest(revised, 'sma_cross', {}, partial['snapshot'], 0.001)
+
+
+class TestPrecomputedSignals:
+    """Testes do modo híbrido: sinais vetorizados como linhas extras do feed"""
+
+    SIGNALS = {'precompute_signals': True}
+
+    @pytest.mark.parametrize("strategy_type,params", [
+        ('sma_cross', {}),
+        ('sma_cross', {'fast': 10, 'slow': 30, 'atr_period': 40}),
+        ('donchian_breakout', {}),
+        ('donchian_breakout', {'entry_period': 55, 'exit_period': 20}),
+    ])
+    def test_matches_indicator_run(self, strategy_type, params):
+        """Testa paridade com os indicadores do Backtrader (trades e curva de equity)"""
+        df = synthetic_ohlcv(1500, seed=13)
+        reference = run_backtest(df, strategy_type, params, 100000.0, 0.001)
+        hybrid = run_backtest(df, strategy_type, params, 100000.0, 0.001, engine_profile=self.SIGNALS)
+
+        assert len(hybrid['trades']) == len(reference['trades']) > 0
+        assert [t['date'] for t in hybrid['trades']] == [t['date'] for t in reference['trades']]
+        assert hybrid['final_cash'] == pytest.approx(reference['final_cash'])
+        assert hybrid['daily_positions'].dates() == reference['daily_positions'].dates()
+        np.testing.assert_allclose(hybrid['daily_positions'].array['equity'],
+                                   reference['daily_positions'].array['equity'])
+
+    def test_resume_with_signals(self):
+        """Testa resume no modo híbrido"""
+        df = synthetic_ohlcv(900, seed=3)
+        full = run_backtest(df, 'donchian_breakout', {}, 100000.0, 0.001, engine_profile=self.SIGNALS)
+        partial = run_backtest(df.iloc[:600], 'donchian_breakout', {}, 100000.0, 0.001, engine_profile=self.SIGNALS)
+        resumed = resume_backtest(df, 'donchian_breakout', {}, partial['snapshot'], 0.001,
+                                  engine_profile=self.SIGNALS)
+
+        assert resumed['final_cash'] == pytest.approx(full['final_cash'])
+        assert len(partial['trades']) + len(resumed['trades']) == len(full['trades'])
+
+    def test_unsupported_strategy_uses_indicators(self):
+        """Testa que estratégias sem signal_frame rodam normalmente"""
+        df = synthetic_ohlcv(400, seed=2)
+        reference = run_backtest(df, 'momentum', {})
+        hybrid = run_backtest(df, 'momentum', {}, engine_profile=self.SIGNALS)
+        assert hybrid['final_cash'] == pytest.approx(reference['final_cash'])
+
+    def test_wilder_atr_matches_backtrader(self):
+        """Testa ATR vetorizado contra bt.indicators.ATR"""
+        import backtrader as bt
+        from app.core.signals import wilder_atr
+
+        df = synthetic_ohlcv(200, seed=4)
+        captured = {}
+
+        class Capture(bt.Strategy):
+            def __init__(self):
+                self.atr = bt.indicators.ATR(self.data, period=14)
+
+            def stop(self):
+                captured['atr'] = np.array(self.atr.array)
+
+        cerebro = bt.Cerebro(stdstats=False)
+        cerebro.adddata(PandasData(dataname=df))
+        cerebro.addstrategy(Capture)
+        cerebro.run()
+
+        expected = captured['atr'][:len(df)]
+        np.testing.assert_allclose(wilder_atr(df['High'], df['Low'], df['Close'], 14).to_numpy(), expected,
+                                   equal_nan=True)
+
+
+class TestArrayFeed:
+    """Testes do feed sobre arrays (views do DataFrame, memmap e memória compartilhada)"""
+
+    @staticmethod
+    def _lines(feed, **cerebro_kwargs):
+        """Roda o feed com uma estratégia vazia e devolve (datetimes, closes) vistos em next"""
+        import backtrader as bt
+        seen = []
+
+        class Capture(bt.Strategy):
+            def next(self):
+                seen.append((self.data.datetime[0], self.data.close[0]))
+
+        cerebro = bt.Cerebro(stdstats=False, **cerebro_kwargs)
+        cerebro.adddata(feed)
+        cerebro.addstrategy(Capture)
+        cerebro.run()
+        return seen
+
+    @pytest.mark.parametrize("engine_profile", [
+        None,
+        {'runonce': False},
+        {'preload': False, 'runonce': False},
+        {'exactbars': 1},
+    ])
+    def test_matches_pandas_feed(self, engine_profile):
+        """Testa paridade de trades e equity com o PandasData"""
+        df = synthetic_ohlcv(800, seed=21)
+        with patch('app.core.backtest_engine._data_feed', lambda df, *args: PandasData(dataname=df)):
+            reference = run_backtest(df, 'sma_cross', {'fast': 10, 'slow': 30}, engine_profile=engine_profile)
+        result = run_backtest(df, 'sma_cross', {'fast': 10, 'slow': 30}, engine_profile=engine_profile)
+
+        assert [t['date'] for t in result['trades']] == [t['date'] for t in reference['trades']]
+        assert result['final_cash'] == reference['final_cash']
+        assert result['daily_positions'].dates() == reference['daily_positions'].dates()
+
+    def test_datetime_to_num_matches_date2num(self):
+        """Testa a conversão vetorizada de datas, inclusive com horário"""
+        import backtrader as bt
+        from app.core.array_feed import datetime_to_num
+
+        index = pd.DatetimeIndex(['1999-12-31', '2024-02-29 09:30', '2024-03-01 15:59:59.5'])
+        expected = [bt.date2num(ts.to_pydatetime()) for ts in index]
+        np.testing.assert_allclose(datetime_to_num(index.asi8), expected, rtol=0, atol=1e-9)
+        np.testing.assert_allclose(datetime_to_num(index.values), expected, rtol=0, atol=1e-9)
+
+    def test_memmap_and_shared_memory_sources(self, tmp_path):
+        """Testa que memmap e memória compartilhada entregam as mesmas barras"""
+        from multiprocessing import shared_memory
+        from app.core.array_feed import (
+            ArrayData, attach_shared_arrays, frame_arrays, open_arrays, save_arrays, to_shared_memory,
+        )
+
+        df = synthetic_ohlcv(120, seed=5)
+        arrays = frame_arrays(df)
+        assert np.shares_memory(arrays['close'], df['Close'].to_numpy())
+        expected = self._lines(PandasData(dataname=df))
+
+        save_arrays(tmp_path, arrays)
+        mapped = open_arrays(tmp_path)
+        assert isinstance(mapped['close'], np.memmap)
+        assert self._lines(ArrayData(dataname=mapped)) == expected
+
+        block, layout = to_shared_memory(arrays)
+        attached = shared_memory.SharedMemory(name=block.name)
+        try:
+            views = attach_shared_arrays(attached, layout)
+            assert self._lines(ArrayData(dataname=views)) == expected
+            del views
+        finally:
+            attached.close()
+            block.close()
+            block.unlink()
+
+    def test_date_bounds_and_validation(self):
+        """Testa fromdate/todate no preload em bloco e arrays de tamanhos diferentes"""
+        from app.core.array_feed import ArrayData, frame_arrays
+
+        df = synthetic_ohlcv(60, seed=8)
+        bounds = {'fromdate': df.index[10].to_pydatetime(), 'todate': df.index[29].to_pydatetime()}
+        expected = self._lines(PandasData(dataname=df, **bounds))
+        assert len(expected) == 20
+        assert self._lines(ArrayData(dataname=frame_arrays(df), **bounds)) == expected
+
+        arrays = frame_arrays(df)
+        arrays['volume'] = arrays['volume'][:-1]
+        with pytest.raises(ValueError, match="volume"):
+            self._lines(ArrayData(dataname=arrays))
+
+class TestJitEngine:
+    """Testes de paridade do motor compilado com o Backtrader"""
+
+    @pytest.fixture
+    def ohlc_data(self):
+        df = synthetic_ohlcv(1200, seed=11)
+        rng = np.random.default_rng(11)
+        df['Open'] = df['Close'].shift(1).fillna(df['Close']) * (1 + rng.normal(0, 0.005, len(df)))
+        df['High'] = np.maximum(df['Open'], df['Close']) * (1 + np.abs(rng.normal(0, 0.01, len(df))))
+        df['Low'] = np.minimum(df['Open'], df['Close']) * (1 - np.abs(rng.normal(0, 0.01, len(df))))
+        return df
+
+    @pytest.mark.parametrize("strategy_type,params", [
+        ('sma_cross', {}),
+        ('sma_cross', {'fast': 5, 'slow': 15}),
+        ('donchian_breakout', {}),
+        ('donchian_breakout', {'entry_period': 10, 'atr_period': 30}),
+        ('momentum', {}),
+        ('momentum', {'lookback': 20, 'percentile_threshold': 50}),
+    ])
+    def test_matches_backtrader(self, ohlc_data, strategy_type, params):
+        """Testa que trades, posições e equity batem com o Backtrader"""
+        reference = run_backtest(ohlc_data, strategy_type, params, 100000.0, 0.001)
+        result = run_backtest_jit(ohlc_data, strategy_type, params, 100000.0, 0.001)
+
+        assert result['final_cash'] == pytest.approx(reference['final_cash'], rel=1e-12)
+        assert [p['date'] for p in result['daily_positions']] == [p['date'] for p in reference['daily_positions']]
+        assert [p['position_size'] for p in result['daily_positions']] == \
+            [p['position_size'] for p in reference['daily_positions']]
+        assert [p['equity'] for p in result['daily_positions']] == \
+            pytest.approx([p['equity'] for p in reference['daily_positions']], rel=1e-12)
+
+        assert len(result['trades']) == len(reference['trades']) > 0
+        for ours, theirs in zip(result['trades'], reference['trades']):
+            assert ours['date'] == theirs['date']
+            assert ours['pnl'] == pytest.approx(theirs['pnl'])
+            assert ours['price'] == pytest.approx(theirs['price'])
+            assert ours['commission'] == pytest.approx(theirs['commission'])
+        assert result['sharpe'] == pytest.approx(reference['sharpe'])
+
+    def test_margin_rejection_matches(self, ohlc_data):
+        """Testa ordens rejeitadas por caixa insuficiente (gap de abertura)"""
+        gapped = ohlc_data.copy()
+        gapped['Open'] = gapped['Close'].shift(1).fillna(gapped['Close']) * 1.03
+        reference = run_backtest(gapped, 'donchian_breakout', {}, 5000.0, 0.01)
+        result = run_backtest_jit(gapped, 'donchian_breakout', {}, 5000.0, 0.01)
+
+        assert result['final_cash'] == pytest.approx(reference['final_cash'], rel=1e-12)
+        assert len(result['trades']) == len(reference['trades'])
+
+    def test_short_data_has_no_bars(self, ohlc_data):
+        """Testa dados menores que o período mínimo"""
+        result = run_backtest_jit(ohlc_data.head(10), 'sma_cross', {}, 100000.0, 0.001)
+
+        assert result['final_cash'] == 100000.0
+        assert len(result['daily_positions']) == 0
+        assert result['trades'] == []
+
+    def test_invalid_inputs(self, ohlc_data):
+        """Testa estratégia e parâmetros inválidos"""
+        with pytest.raises(ValueError, match="Unknown strategy type"):
+            run_backtest_jit(ohlc_data, 'invalid', {})
+        with pytest.raises(ValueError, match="Unknown parameters"):
+            run_backtest_jit(ohlc_data, 'sma_cross', {'bogus': 1})
+        with pytest.raises(ValueError, match="percentile_threshold"):
+            run_backtest_jit(ohlc_data, 'momentum', {'percentile_threshold': 100})
+
+
+class TestResultRecords:
+    """Testes dos containers compactos de trades e posições"""
+
+    def test_position_buffer_grows(self):
+        """Testa append além da capacidade inicial e leitura por coluna"""
+        buffer = PositionBuffer(capacity=2)
+        days = pd.date_range('2021-01-01', periods=5).date
+        for i, day in enumerate(days):
+            buffer.append(day, i, 1000.0 - i, 1000.0 + i)
+
+        assert len(buffer) == 5
+        assert buffer.array.dtype == POSITION_DTYPE
+        assert buffer.array['equity'].tolist() == [1000.0, 1001.0, 1002.0, 1003.0, 1004.0]
+        assert buffer.dates() == list(days)
+        assert buffer[-1] == {'date': days[-1], 'position_size': 4.0, 'cash': 996.0,
+                              'equity': 1004.0, 'drawdown': 0.0}
+        assert [row['date'] for row in buffer] == list(days)
+        assert len(buffer[1:3]) == 2
+
+    def test_from_rows_and_concat(self):
+        """Testa conversão de dicts/linhas do banco e concatenação"""
+        rows = [{'date': date(2021, 1, d), 'position_size': 0, 'cash': 10.0, 'equity': 10.0 + d}
+                for d in (4, 5)]
+        stored = PositionBuffer.from_rows(rows)
+        more = PositionBuffer.from_rows([Mock(date=date(2021, 1, 6), position_size=1,
+                                              cash=0.0, equity=20.0)])
+        merged = PositionBuffer.concat([stored, more])
+
+        assert merged.dates() == [date(2021, 1, 4), date(2021, 1, 5), date(2021, 1, 6)]
+        assert merged.array['equity'].tolist() == [14.0, 15.0, 20.0]
+        assert len(PositionBuffer.from_rows([])) == 0
+
+    def test_trade_record_is_slotted(self):
+        """Testa que TradeRecord não tem __dict__ e aceita acesso por chave"""
+        trade = TradeRecord(date=date(2021, 1, 4), side='BUY', price=10.0, size=0,
+                            commission=0.1, pnl=5.0)
+
+        assert not hasattr(trade, '__dict__')
+        assert trade['pnl'] == 5.0
+        assert trade.as_dict()['side'] == 'BUY'
+        with pytest.raises(KeyError):
+            trade['missing']
+
+    def test_engine_returns_records(self):
+        """Testa que o engine devolve TradeRecord e PositionBuffer"""
+        results = run_backtest(synthetic_ohlcv(400, seed=5), 'sma_cross', {'fast': 5, 'slow': 20},
+                               100000.0, 0.001)
+
+        assert results['trades'] and all(isinstance(t, TradeRecord) for t in results['trades'])
+        assert isinstance(results['daily_positions'], PositionBuffer)
+        assert results['daily_positions'][-1]['equity'] == pytest.approx(results['final_cash'])
+
+
+class TestCrossSectionalMomentum:
+    """Testes do ranking de momentum entre tickers"""
+
+    @pytest.fixture
+    def panel(self):
+        return synthetic_panel(tickers=40, bars=600, seed=2)
+
+    def test_percentile_rank(self):
+        """Testa ranking percentual por linha ignorando NaN"""
+        ranks = percentile_rank(np.array([[0.3, np.nan, -0.1, 0.2], [1.0, 2.0, np.nan, np.nan]]))
+
+        assert ranks[0, [2, 3, 0]] == pytest.approx([0.0, 0.5, 1.0])
+        assert np.isnan(ranks[0, 1]) and np.isnan(ranks[1, 2:]).all()
+        assert ranks[1, :2] == pytest.approx([0.0, 1.0])
+
+    def test_panel_indicators_match_single_ticker(self, panel):
+        """Testa que ROC/ATR 2-D batem com o cálculo por ticker"""
+        from app.core.jit_engine import _atr
+
+        close = panel['Close'].to_numpy()
+        roc = roc_panel(close, 20)
+        atr = atr_panel(panel['High'].to_numpy(), panel['Low'].to_numpy(), close, 14)
+
+        for col in (0, 1, 5):
+            series = panel['Close'].iloc[:, col]
+            assert roc[:, col] == pytest.approx(series.pct_change(20).to_numpy(), nan_ok=True)
+            expected = _atr(panel['High'].iloc[:, col].to_numpy(), panel['Low'].iloc[:, col].to_numpy(),
+                            series.to_numpy(), 14)
+            assert atr[:, col] == pytest.approx(expected, nan_ok=True)
+
+    def test_selects_strongest_ticker(self):
+        """Testa que top-1 compra o ticker com maior ROC na próxima abertura"""
+        index = pd.date_range('2021-01-01', periods=90, freq='B')
+        close = pd.DataFrame({
+            'UP': np.linspace(100, 200, 90),
+            'FLAT': np.full(90, 100.0),
+            'DOWN': np.linspace(100, 50, 90),
+        }, index=index)
+        panel = {'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close}
+
+        result = run_cross_sectional_momentum(panel, lookback=20, top_k=1, percentile_threshold=50,
+                                              initial_cash=10000.0, commission=0.0)
+
+        assert result['rebalances']
+        assert all(r['tickers'] == ['UP'] for r in result['rebalances'])
+        first = result['rebalances'][0]
+        fill = index.get_loc(pd.Timestamp(first['date']))
+        shares = np.floor(10000.0 / close['UP'].iloc[fill])
+        assert result['final_cash'] == pytest.approx(10000.0 - shares * close['UP'].iloc[fill]
+                                                     + shares * close['UP'].iloc[-1])
+
+    @pytest.mark.parametrize("weighting", ['equal', 'inverse_atr'])
+    def test_portfolio_constraints(self, panel, weighting):
+        """Testa limite de K posições, pesos e equity consistente"""
+        result = run_cross_sectional_momentum(panel, lookback=40, top_k=5, rebalance='weekly',
+                                              weighting=weighting)
+
+        assert result['rebalances']
+        for rebalance in result['rebalances']:
+            assert len(rebalance['tickers']) <= 5
+            assert sum(rebalance['weights'].values()) <= 1.0 + 1e-9
+        equity = [p['equity'] for p in result['equity_curve']]
+        assert len(equity) == 600
+        assert equity[0] == 100000.0
+        assert result['final_cash'] == pytest.approx(equity[-1])
+        assert result['extra_metrics']['commission_paid'] > 0
+        json.dumps(result['extra_metrics'])
+
+    def test_invalid_options(self, panel):
+        """Testa opções inválidas"""
+        with pytest.raises(ValueError, match="Unknown weighting"):
+            run_cross_sectional_momentum(panel, weighting='bogus')
+        with pytest.raises(ValueError, match="Unknown rebalance frequency"):
+            run_cross_sectional_momentum(panel, rebalance='hourly')
+
+    def test_load_universe_panel(self, db):
+        """Testa montagem do painel datas × tickers a partir do banco"""
+        from app.db import models
+        from app.services.yfinance_client import load_universe_panel
+
+        for symbol_id, ticker in ((1, 'AAA'), (2, 'BBB')):
+            db.add(models.Symbol(id=symbol_id, ticker=ticker))
+        for day in range(3):
+            db.add(models.Price(symbol_id=1, date=date(2024, 1, 2 + day), open=1.0 + day,
+                                high=2.0, low=0.5, close=1.5 + day, volume=10))
+        db.add(models.Price(symbol_id=2, date=date(2024, 1, 3), open=9.0, high=9.5,
+                            low=8.5, close=9.2, volume=10))
+        db.commit()
+
+        panel = load_universe_panel(['AAA', 'BBB', 'CCC'], date(2024, 1, 1), date(2024, 1, 4), db)
+
+        assert list(panel['Close'].columns) == ['AAA', 'BBB', 'CCC']
+        assert list(panel['Close'].index) == list(pd.to_datetime(['2024-01-02', '2024-01-03']))
+        assert panel['Close']['AAA'].tolist() == [1.5, 2.5]
+        assert np.isnan(panel['Close'].loc['2024-01-02', 'BBB'])
+        assert panel['Open'].loc['2024-01-03', 'BBB'] == 9.0
+        assert panel['Close']['CCC'].isna().all()
+        db.close()
+
+
+class TestBacktestRefreshJob:
+    """Testes do job de refresh por ticker (SQLite em memória)"""
+    
+    def test_refresh_resumes_and_matches_full_run(self, db):
+        """Testa que o refresh estende o backtest salvo em O(N) barras novas"""
+        import asyncio
+        from app.db import crud, models
+        from app.services.backtest_refresh import refresh_backtests_for_ticker
+        
+        data = synthetic_ohlcv(800, seed=5)
+        
+        def fake_download(ticker, start, end, progress=False):
+            return data.loc[(data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))].copy()
+        
+        backtest = crud.create_backtest(db, {
+            "ticker": "TEST", "start_date": data.index[0].date(), "end_date": data.index[599].date(),
+            "strategy_type": "sma_cross", "strategy_params_json": {"fast": 10, "slow": 30},
+            "initial_cash": 100000.0, "commission": 0.001, "status": "completed"
+        })
+        partial = run_backtest(data.iloc[:600], 'sma_cross', {"fast": 10, "slow": 30}, 100000.0, 0.001)
+        crud.store_backtest_results(db, backtest.id, partial)
+        
+        with patch('app.services.yfinance_client.yf.download', side_effect=fake_download):
+            counts = asyncio.run(refresh_backtests_for_ticker("TEST", db, end_date=data.index[-1].date()))
+        
+        assert counts['resumed'] == 1
+        full = run_backtest(data, 'sma_cross', {"fast": 10, "slow": 30}, 100000.0, 0.001)
+        db.expire_all()
+        stored = crud.get_backtest_with_results(db, backtest.id)
+        assert stored.end_date == data.index[-1].date()
+        assert len(stored.daily_positions) == len(full['daily_positions'])
+        assert stored.metrics.total_return == pytest.approx(full['total_return'])
+        assert stored.metrics.sharpe == pytest.approx(full['sharpe'])
+        assert db.query(models.JobRun).one().status == "completed"
+
+    def test_rerun_keeps_run_options_and_is_atomic(self, db):
+        """Testa re-run com analyzers/perfil originais e troca de resultados numa transação"""
+        import asyncio
+        from app.db import crud
+        from app.services import backtest_refresh
+        
+        data = synthetic_ohlcv(500, seed=8)
+        
+        def fake_download(ticker, start, end, progress=False):
+            return data.loc[(data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))].copy()
+        
+        backtest = crud.create_backtest(db, {
+            "ticker": "TEST", "start_date": data.index[0].date(), "end_date": data.index[299].date(),
+            "strategy_type": "sma_cross", "strategy_params_json": {}, "initial_cash": 100000.0,
+            "commission": 0.001, "analyzers": ["drawdown"], "engine_profile": {"exactbars": 1},
+            "status": "completed"
+        })
+        partial = run_backtest(data.iloc[:300], 'sma_cross', {}, 100000.0, 0.001)
+        crud.store_backtest_results(db, backtest.id, dict(partial, snapshot=None))
+        
+        # Escrita falha no meio: os resultados anteriores continuam
+        with patch('app.services.yfinance_client.yf.download', side_effect=fake_download), \
+                patch.object(crud, '_insert_results', side_effect=RuntimeError('disk full')):
+            counts = asyncio.run(backtest_refresh.refresh_backtests_for_ticker("TEST", db, end_date=data.index[-1].date()))
+        assert counts['failed'] == 1
+        db.expire_all()
+        stored = crud.get_backtest_with_results(db, backtest.id)
+        assert len(stored.daily_positions) == len(partial['daily_positions'])
+        assert stored.end_date == data.index[299].date()
+        
+        with patch('app.services.yfinance_client.yf.download', side_effect=fake_download), \
+                patch.object(backtest_refresh, 'run_backtest', wraps=run_backtest) as rerun:
+            counts = asyncio.run(backtest_refresh.refresh_backtests_for_ticker("TEST", db, end_date=data.index[-1].date()))
+        assert counts['rerun'] == 1
+        assert rerun.call_args.kwargs['analyzers'] == ['drawdown']
+        assert rerun.call_args.kwargs['engine_profile'] == {'exactbars': 1}
+        db.expire_all()
+        stored = crud.get_backtest_with_results(db, backtest.id)
+        assert len(stored.daily_positions) == len(run_backtest(data, 'sma_cross', {}, 100000.0, 0.001)['daily_positions'])
+        assert stored.end_date == data.index[-1].date()
+
+    def test_backtest_with_analyzers_is_rerun(self, db):
+        """Testa que backtests com analyzers não são retomados (saída dos analyzers é mantida)"""
+        import asyncio
+        import json
+        from app.db import crud
+        from app.services import backtest_refresh
+        
+        data = synthetic_ohlcv(500, seed=9)
+        
+        def fake_download(ticker, start, end, progress=False):
+            return data.loc[(data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))].copy()
+        
+        backtest = crud.create_backtest(db, {
+            "ticker": "TEST", "start_date": data.index[0].date(), "end_date": data.index[299].date(),
+            "strategy_type": "sma_cross", "strategy_params_json": {}, "initial_cash": 100000.0,
+            "commission": 0.001, "analyzers": ["sharpe", "trades"], "status": "completed"
+        })
+        partial = run_backtest(data.iloc[:300], 'sma_cross', {}, 100000.0, 0.001, analyzers=['sharpe', 'trades'])
+        crud.store_backtest_results(db, backtest.id, partial)
+        
+        with patch('app.services.yfinance_client.yf.download', side_effect=fake_download), \
+                patch.object(backtest_refresh, 'resume_backtest') as resume:
+            counts = asyncio.run(backtest_refresh.refresh_backtests_for_ticker("TEST", db, end_date=data.index[-1].date()))
+        
+        assert counts['rerun'] == 1
+        resume.assert_not_called()
+        full = run_backtest(data, 'sma_cross', {}, 100000.0, 0.001, analyzers=['sharpe', 'trades'])
+        db.expire_all()
+        stored = crud.get_backtest_with_results(db, backtest.id)
+        assert stored.metrics.sharpe == pytest.approx(full['sharpe'])
+        assert stored.metrics.win_rate == pytest.approx(full['win_rate'])
+        assert set(json.loads(stored.metrics.extra_json)['analyzers']) == {'sharpe', 'trades'}
+
+    def test_unreached_checkpoint_falls_back_to_rerun(self, db):
+        """Testa que um checkpoint não alcançado no warmup vira re-run"""
+        import asyncio
+        from app.db import crud
+        from app.services import backtest_refresh
+        
+        data = synthetic_ohlcv(500, seed=9)
+        
+        def fake_download(ticker, start, end, progress=False):
+            return data.loc[(data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))].copy()
+        
+        backtest = crud.create_backtest(db, {
+            "ticker": "TEST", "start_date": data.index[0].date(), "end_date": data.index[299].date(),
+            "strategy_type": "sma_cross", "strategy_params_json": {}, "initial_cash": 100000.0,
+            "commission": 0.001, "status": "completed"
+        })
+        crud.store_backtest_results(db, backtest.id, run_backtest(data.iloc[:300], 'sma_cross', {}, 100000.0, 0.001))
+        
+        def checkpoint_missed(*args, **kwargs):
+            raise ValueError("Resume checkpoint was not reached during warmup")
+        
+        with patch('app.services.yfinance_client.yf.download', side_effect=fake_download), \
+                patch.object(backtest_refresh, 'resume_backtest', side_effect=checkpoint_missed):
+            counts = asyncio.run(backtest_refresh.refresh_backtests_for_ticker("TEST", db, end_date=data.index[-1].date()))
+        
+        assert counts == {'resumed': 0, 'rerun': 1, 'unchanged': 0, 'failed': 0}
+
+    def test_store_results_bulk_insert(self, db):
+        """Testa escrita em lotes via Core sem objetos no identity map"""
+        from app.db import crud, models
+
+        results = run_backtest(synthetic_ohlcv(300, seed=5), 'sma_cross', {"fast": 5, "slow": 20},
+                               100000.0, 0.001)
+        backtest = crud.create_backtest(db, {"ticker": "TEST", "strategy_type": "sma_cross",
+                                             "initial_cash": 100000.0, "commission": 0.001})
+        with patch.object(config, 'RESULTS_INSERT_BATCH_SIZE', 7):
+            crud.store_backtest_results(db, backtest.id, results)
+
+        assert not any(isinstance(obj, (models.Trade, models.DailyPosition)) for obj in db.identity_map.values())
+        stored = crud.get_backtest_with_results(db, backtest.id)
+        positions = sorted(stored.daily_positions, key=lambda p: p.date)
+        assert [p.date for p in positions] == results['daily_positions'].dates()
+        assert [p.equity for p in positions] == results['daily_positions'].array['equity'].tolist()
+        assert [t.pnl for t in stored.trades] == [t.pnl for t in results['trades']]
+        assert stored.metrics.total_return == pytest.approx(results['total_return'])
+        assert json.loads(stored.snapshot_json)['date'] == results['snapshot']['date']
+
+
+class TestIngestionJob:
+    """Testes do job agendado de ingestão"""
+    
+    @pytest.fixture
+    def session_factory(self, session_factory, db_engine):
+        with patch('app.services.scheduler.BackgroundSessionLocal', session_factory), \
+                patch('app.services.scheduler.background_engine', db_engine):
+            yield session_factory
+    
+    @staticmethod
+    def fake_batch_download(tickers, start, end, progress=False, group_by='ticker'):
+        frames = {
+            ticker: synthetic_ohlcv(300, seed=i).loc[
+                lambda df: (df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))
+            ]
+            for i, ticker in enumerate(tickers)
+        }
+        return pd.concat(frames, axis=1)
+    
+    def test_ingestion_records_job_run(self, session_factory):
+        """Testa ingestão em lote com timings e contagem de linhas"""
+        from app.db import models
+        from app.services import scheduler
+        from app.services.yfinance_client import load_stored_prices
+        
+        end = synthetic_ohlcv(300).index[-1].date()
+        with patch('app.services.yfinance_client.yf.download', side_effect=self.fake_batch_download), \
+                patch.object(scheduler.config, 'INGESTION_BATCH_SIZE', 2):
+            result = scheduler.run_ingestion_job(['AAA', 'BBB', 'CCC'], end_date=end)
+        
+        assert result['status'] == 'completed'
+        db = session_factory()
+        job_run = db.query(models.JobRun).filter(models.JobRun.job_name == scheduler.INGESTION_JOB_NAME).one()
+        assert job_run.status == 'completed'
+        assert job_run.rows_processed == db.query(models.Price).count() > 0
+        assert job_run.duration_seconds >= 0
+        
+        # Dados aquecidos: a leitura não precisa de download
+        start = end - timedelta(days=scheduler.config.INGESTION_LOOKBACK_DAYS)
+        warm = load_stored_prices('BBB', start, end + timedelta(days=1), db)
+        assert warm is not None and warm.index[-1].date() == end
+        assert load_stored_prices('BBB', start - timedelta(days=60), end, db) is None
+    
+    def test_interior_gap_is_not_coverage(self, session_factory):
+        """Testa que um buraco no meio dos preços guardados força o download"""
+        import asyncio
+        from app.services import yfinance_client
+        
+        data = synthetic_ohlcv(900, seed=4)
+        start, end = data.index[0].date(), data.index[-1].date() + timedelta(days=1)
+        db = session_factory()
+        hole = (data.index >= data.index[300]) & (data.index < data.index[300] + pd.Timedelta(days=370))
+        asyncio.run(yfinance_client.store_price_data('GAP', data.loc[~hole], db))
+        
+        assert yfinance_client.load_stored_block('GAP', start, end, db) is None
+        assert yfinance_client.load_stored_block('GAP', start, data.index[299].date(), db) is not None
+        
+        def fake_download(ticker, start, end, progress=False):
+            return data.loc[(data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))].copy()
+        
+        with patch('app.services.yfinance_client.yf.download', side_effect=fake_download) as download:
+            block = asyncio.run(yfinance_client.get_price_block('GAP', start, end, db))
+        assert download.called and len(block) == len(data)
+        assert len(yfinance_client.load_stored_block('GAP', start, end, db)) == len(data)
+        db.close()
+    
+    def test_prices_outside_retention_are_not_stored(self, session_factory):
+        """Testa que preços antes da janela de retenção não são gravados nem lidos do banco"""
+        import asyncio
+        from app.db import models
+        from app.services import yfinance_client
+        
+        data = synthetic_ohlcv(600, seed=6)
+        data.index = pd.bdate_range(end=date.today() - timedelta(days=1), periods=len(data))
+        cutoff = date(date.today().year, 1, 1)
+        start, end = data.index[0].date(), date.today()
+        db = session_factory()
+        
+        with patch.object(config, 'PRICES_RETENTION_YEARS', 1):
+            asyncio.run(yfinance_client.store_price_data('OLD', data, db))
+            assert db.query(models.Price).count() == int((data.index >= pd.Timestamp(cutoff)).sum())
+            assert db.query(models.Price).filter(models.Price.date < cutoff).count() == 0
+            assert yfinance_client.load_stored_block('OLD', start, end, db) is None
+        db.close()
+    
+    def test_ingestion_runs_off_the_event_loop(self, session_factory):
+        """Testa que o job é uma função comum, rodada pelo executor do scheduler"""
+        import asyncio
+        import inspect
+        from app.services import scheduler
+        
+        assert not inspect.iscoroutinefunction(scheduler.run_ingestion_job)
+        
+        async def api_loop():
+            # O executor roda o job numa thread enquanto o loop da API segue livre
+            ticks = 0
+            job = asyncio.ensure_future(asyncio.to_thread(scheduler.run_ingestion_job, ['AAA', 'BBB']))
+            while not job.done():
+                ticks += 1
+                await asyncio.sleep(0.001)
+            return await job, ticks
+        
+        with patch('app.services.yfinance_client.yf.download', side_effect=self.fake_batch_download):
+            result, ticks = asyncio.run(api_loop())
+        assert result['status'] == 'completed'
+        assert ticks > 1
+    
+    def test_ingestion_skips_when_already_running(self, session_factory):
+        """Testa que execuções sobrepostas são ignoradas"""
+        from app.db import crud
+        from app.services import scheduler
+        
+        crud.create_job_run(session_factory(), scheduler.INGESTION_JOB_NAME)
+        with patch('app.services.yfinance_client.yf.download') as download:
+            result = scheduler.run_ingestion_job(['AAA'])
+        
+        assert result['status'] == 'skipped'
+        download.assert_not_called()
+
+    def test_retention_removes_expired_backtests(self, session_factory):
+        """Testa retenção de backtests failed/cancelled antigos e seus resultados"""
+        from app.db import crud, models
+        from app.services import scheduler
+
+        now = datetime(2026, 10, 19)
+        db = session_factory()
+        ids = {}
+        for name, status, age in [('old_failed', 'failed', 30), ('old_cancelled', 'cancelled', 8),
+                                  ('new_failed', 'failed', 1), ('old_completed', 'completed', 400),
+                                  ('running', 'running', 30)]:
+            backtest = crud.create_backtest(db, {'ticker': 'AAA', 'strategy_type': 'sma_cross', 'status': status})
+            backtest.created_at = now - timedelta(days=age)
+            db.add(models.Trade(backtest_id=backtest.id, date=date(2024, 1, 2), side='BUY', price=1.0))
+            db.add(models.DailyPosition(backtest_id=backtest.id, date=date(2024, 1, 2), equity=1.0))
+            db.add(models.Metrics(backtest_id=backtest.id, total_return=0.0))
+            db.commit()
+            ids[name] = backtest.id
+
+        with patch.object(scheduler.config, 'FAILED_RESULTS_RETENTION_DAYS', 7), \
+                patch.object(scheduler.config, 'RESULTS_RETENTION_DAYS', 0):
+            result = scheduler.run_retention_job(now=now)
+
+        assert result['status'] == 'completed'
+        assert result['deleted_backtests'] == 2
+        assert result['price_partitions'] == {'created': [], 'dropped': []}  # SQLite não particiona
+        db = session_factory()
+        remaining = {row.id for row in db.query(models.Backtest.id)}
+        assert remaining == {ids['new_failed'], ids['old_completed'], ids['running']}
+        for model in (models.Trade, models.DailyPosition, models.Metrics):
+            assert {row.backtest_id for row in db.query(model.backtest_id)} == remaining
+        job_run = db.query(models.JobRun).filter(models.JobRun.job_name == scheduler.RETENTION_JOB_NAME).one()
+        assert job_run.status == 'completed' and job_run.rows_processed == 2
+
+        with patch.object(scheduler.config, 'RESULTS_RETENTION_DAYS', 365):
+            assert scheduler.run_retention_job(now=now)['deleted_backtests'] == 1
+        assert ids['old_completed'] not in {row.id for row in session_factory().query(models.Backtest.id)}
+
+
+class TestDatabasePools:
+    """Testes de isolamento de sessões e instrumentação do pool"""
+    
+    def test_instrumented_pool_counts_overflow_and_timeouts(self, tmp_path):
+        """Testa métricas de checkout, overflow e timeout"""
+        from sqlalchemy import create_engine, exc
+        from app.db.pool_metrics import InstrumentedQueuePool, POOL_STATS, pool_status
+        
+        POOL_STATS.pop('test_pool', None)
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+            pool_size=1, max_overflow=1, pool_timeout=0.1, pool_logging_name='test_pool'
+        )
+        first = engine.connect()
+        second = engine.connect()  # overflow
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        
+        status = pool_status(engine)
+        assert status['in_use'] == 2
+        assert status['checkouts'] == 2
+        assert status['overflow_events'] == 1
+        assert status['timeouts'] == 1
+        assert status['peak_in_use'] == 2
+        
+        first.close()
+        second.close()
+        assert pool_status(engine)['in_use'] == 0
+    
+    def test_execute_backtest_uses_own_sessions(self, tmp_path):
+        """Testa que o run em background não depende da sessão da request"""
+        import asyncio
+        import threading
+        from contextlib import contextmanager
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.api import routes, schemas
+        from app.db.base import Base
+        from app.db import crud
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'bg.db'}")
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine, expire_on_commit=False)
+        opened = []
+        
+        threads = []
+        
+        @contextmanager
+        def fake_background_session():
+            db = factory()
+            opened.append(db)
+            threads.append(threading.get_ident())
+            try:
+                yield db
+            finally:
+                db.close()
+        
+        request = schemas.BacktestRunRequest(
+            ticker="TEST", start_date=date(2020, 1, 1), end_date=date(2021, 1, 1),
+            strategy_type="sma_cross", strategy_params={"fast": 5, "slow": 20}
+        )
+        with fake_background_session() as db:
+            backtest = crud.create_backtest(db, {"ticker": "TEST", "status": "running",
+                                                 "strategy_params_json": {}})
+        
+        async def fake_fetch_price_data(ticker, start, end, sessions):
+            return synthetic_ohlcv(200)
+        
+        with patch.object(routes, 'background_session', fake_background_session), \
+                patch('app.services.yfinance_client.fetch_price_data', fake_fetch_price_data):
+            asyncio.run(routes.execute_backtest(backtest.id, request))
+        
+        with fake_background_session() as db:
+            stored = crud.get_backtest_with_results(db, backtest.id)
+            assert stored.status == "completed"
+            assert len(stored.daily_positions) > 0
+        assert len(opened) >= 3
+        # Resultados gravados numa worker thread, fora do event loop
+        assert threads[-2] != threading.get_ident()
+    
+    def test_fetch_price_data_holds_no_session_during_download(self, session_factory):
+        """Testa que nenhuma sessão fica aberta enquanto o yf.download roda"""
+        import asyncio
+        from contextlib import contextmanager
+        from app.services import yfinance_client
+        
+        data = synthetic_ohlcv(300, seed=2)
+        open_sessions = []
+        
+        @contextmanager
+        def counted_session():
+            db = session_factory()
+            open_sessions.append(db)
+            try:
+                yield db
+            finally:
+                open_sessions.remove(db)
+                db.close()
+        
+        def fake_download(ticker, start, end, progress=False):
+            assert open_sessions == []
+            return data.copy()
+        
+        start, end = data.index[0].date(), data.index[-1].date() + timedelta(days=1)
+        with patch('app.services.yfinance_client.yf.download', side_effect=fake_download) as download:
+            df = asyncio.run(yfinance_client.fetch_price_data('HELD', start, end, counted_session))
+            # Segunda leitura vem do banco
+            again = asyncio.run(yfinance_client.fetch_price_data('HELD', start, end, counted_session))
+        
+        assert download.call_count == 1
+        assert len(df) == len(again) == len(data)
+        assert open_sessions == []
+
+
+class TestRequestCoalescing:
+    """Testes de single-flight para runs e downloads idênticos"""
+
+    def test_single_flight_shares_result_and_errors(self):
+        """Testa que chamadas concorrentes compartilham resultado e exceção"""
+        import asyncio
+        from app.services.single_flight import SingleFlight
+
+        flight = SingleFlight()
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            if value == 'boom':
+                raise RuntimeError('boom')
+            return value
+
+        async def scenario():
+            shared = await asyncio.gather(*(flight.run('k', lambda: work('ok')) for _ in range(3)))
+            failed = await asyncio.gather(*(flight.run('e', lambda: work('boom')) for _ in range(2)),
+                                          return_exceptions=True)
+            return shared, failed
+
+        shared, failed = asyncio.run(scenario())
+        assert calls == ['ok', 'boom']
+        assert shared == [('ok', False), ('ok', True), ('ok', True)]
+        assert all(isinstance(e, RuntimeError) for e in failed)
+        assert not flight.in_flight('k') and not flight.in_flight('e')
+
+    def test_single_flight_across_event_loops(self):
+        """Testa a mesma chave em threads com loops próprios (workers de sweep)"""
+        import asyncio
+        import threading
+        from app.services.single_flight import SingleFlight
+
+        flight = SingleFlight()
+        started = threading.Barrier(2)
+        outcomes, errors = [], []
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return threading.get_ident()
+
+        def worker():
+            try:
+                started.wait()
+                outcomes.append(asyncio.run(flight.run('k', work)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        # Cada loop executa a sua; nenhuma aguarda um future de outro loop
+        assert sorted(shared for _, shared in outcomes) == [False, False]
+        assert not flight.in_flight('k')
+
+    def test_concurrent_downloads_coalesce(self, db):
+        """Testa que downloads simultâneos do mesmo ticker/período fazem uma requisição"""
+        import asyncio
+        import time
+        from app.services.yfinance_client import download_and_store_data
+
+        data = synthetic_ohlcv(60)
+        calls = []
+
+        def slow_download(ticker, start, end, progress=False):
+            calls.append(ticker)
+            time.sleep(0.05)
+            return data.copy()
+
+        async def scenario():
+            return await asyncio.gather(*(download_and_store_data('AAA', '2000-01-01', '2000-04-01', db)
+                                          for _ in range(3)))
+
+        with patch('app.services.yfinance_client.yf.download', side_effect=slow_download):
+            frames = asyncio.run(scenario())
+
+        assert calls == ['AAA']
+        assert all(len(df) == 60 for df in frames)
+        assert frames[1] is not frames[0]
+
+    def test_identical_run_requests_attach_to_inflight_job(self, db):
+        """Testa que requisições idênticas recebem o id do run em andamento"""
+        import asyncio
+        from app.api import routes, schemas
+        from app.db import models
+
+        def request(**params):
+            return schemas.BacktestRunRequest(
+                ticker="TEST", start_date=date(2020, 1, 1), end_date=date(2021, 1, 1),
+                strategy_type="sma_cross", strategy_params=params
+            )
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def fake_execute(backtest_id, req, control=None):
+                await release.wait()
+
+            with patch.object(routes, 'execute_backtest', fake_execute):
+                first = await routes.run_backtest_endpoint(request(), db)
+                # Defaults explícitos têm a mesma chave canônica
+                same = await routes.run_backtest_endpoint(request(fast=20, slow=50), db)
+                other = await routes.run_backtest_endpoint(request(fast=5), db)
+                release.set()
+                await asyncio.gather(*routes._background_tasks)
+                after = await routes.run_backtest_endpoint(request(), db)
+                await asyncio.gather(*routes._background_tasks)
+            return first, same, other, after
+
+        first, same, other, after = asyncio.run(scenario())
+        assert not first.coalesced
+        assert same.coalesced and same.id == first.id
+        assert not other.coalesced and other.id != first.id
+        assert not after.coalesced and after.id not in (first.id, other.id)
+        assert db.query(models.Backtest).count() == 3
+        assert routes._inflight_runs == {}
+
+    def test_ticker_is_normalised(self):
+        """Testa que o ticker é normalizado no próprio campo, não só na chave"""
+        from app.api import schemas
+
+        base = dict(start_date=date(2020, 1, 1), end_date=date(2021, 1, 1), strategy_type="sma_cross")
+        request = schemas.BacktestRunRequest(ticker=" petr4.sa ", **base)
+        assert request.ticker == "PETR4.SA"
+        assert request.canonical_key() == schemas.BacktestRunRequest(ticker="PETR4.SA", **base).canonical_key()
+        assert schemas.BacktestCompareRequest(
+            ticker="petr4.sa", start_date=date(2020, 1, 1), end_date=date(2021, 1, 1),
+            strategies=[{"strategy_type": "sma_cross"}]
+        ).ticker == "PETR4.SA"
+        assert schemas.BacktestRefreshRequest(ticker="petr4.sa").ticker == "PETR4.SA"
+        assert schemas.IndicatorUpdateRequest(ticker=" petr4.sa").ticker == "PETR4.SA"
+
+
+class TestBacktestEvents:
+    """Testes do pub/sub de status (SSE e long-poll)"""
+
+    def test_bus_delivers_across_threads(self):
+        """Testa entrega de eventos publicados por outra thread e o último estado"""
+        import asyncio
+        import threading
+        from app.services.events import EventBus
+
+        bus = EventBus()
+
+        async def scenario():
+            queue = bus.subscribe(1)
+            thread = threading.Thread(target=lambda: bus.dispatch(1, {'backtest_id': 1, 'status': 'running',
+                                                                      'stage': 'running'}))
+            thread.start()
+            running = await asyncio.wait_for(queue.get(), 1)
+            latest = bus.latest(1)
+            bus.dispatch(1, {'backtest_id': 1, 'status': 'completed'})
+            completed = await asyncio.wait_for(queue.get(), 1)
+            bus.unsubscribe(1, queue)
+            return running, latest, completed
+
+        running, latest, completed = asyncio.run(scenario())
+        assert running['stage'] == 'running' and latest == running
+        assert completed['status'] == 'completed'
+        assert bus.latest(1) is None and bus.subscriber_count(1) == 0
+
+    def test_sse_streams_until_terminal_status(self, db):
+        """Testa que o stream SSE envia o estado atual e termina no status final"""
+        import asyncio
+        from app.api import routes
+        from app.db import crud
+        from app.services import events
+
+        backtest = crud.create_backtest(db, {"ticker": "TEST", "status": "running", "strategy_params_json": {}})
+
+        async def scenario():
+            response = await routes.stream_backtest_events(backtest.id, db)
+            chunks = [await response.body_iterator.__anext__()]
+            events.publish(backtest.id, "running", "running", bars_processed=10, bars_total=100)
+            events.publish(backtest.id, "completed", "completed")
+            chunks += [chunk async for chunk in response.body_iterator]
+            return chunks
+
+        chunks = asyncio.run(scenario())
+        payloads = [json.loads(chunk.split('data: ')[1]) for chunk in chunks]
+        assert [p['status'] for p in payloads] == ['running', 'running', 'completed']
+        assert payloads[1]['bars_processed'] == 10
+        assert events.bus.subscriber_count(backtest.id) == 0
+
+    def test_long_poll_returns_next_event_or_current(self, db):
+        """Testa long-poll: resposta no próximo evento, ou imediata para status final"""
+        import asyncio
+        from fastapi import HTTPException
+        from app.api import routes
+        from app.db import crud
+        from app.services import events
+
+        running = crud.create_backtest(db, {"ticker": "TEST", "status": "running", "strategy_params_json": {}})
+        done = crud.create_backtest(db, {"ticker": "TEST", "status": "completed", "strategy_params_json": {}})
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, events.publish, running.id, "running", "storing")
+            next_event = await routes.get_backtest_status(running.id, wait=5, db=db)
+            finished = await routes.get_backtest_status(done.id, wait=5, db=db)
+            with pytest.raises(HTTPException):
+                await routes.get_backtest_status(9999, wait=0, db=db)
+            return next_event, finished
+
+        next_event, finished = asyncio.run(scenario())
+        assert next_event.stage == 'storing'
+        assert finished.status == 'completed' and finished.stage is None
+        events.publish(running.id, "completed")
+
+
+class TestRunCancellation:
+    """Testes de progresso, cancelamento cooperativo e mensagens de falha"""
+
+    @pytest.fixture
+    def request_model(self):
+        from app.api import schemas
+        return schemas.BacktestRunRequest(
+            ticker="TEST", start_date=date(2020, 1, 1), end_date=date(2021, 1, 1),
+            strategy_type="sma_cross", strategy_params={"fast": 5, "slow": 20}
+        )
+
+    def test_run_control_throttles_progress(self):
+        """Testa throttling do progresso e flag de cancelamento"""
+        from app.core.run_control import RunControl
+
+        reports = []
+        control = RunControl(on_progress=reports.append, bars_total=10, interval=3600)
+        assert not any(control.tick(i) for i in range(1, 6))
+        assert len(reports) == 1 and reports[0]['bars_processed'] == 1
+        control.cancel()
+        assert control.tick(6) and control.progress()['bars_processed'] == 6
+
+    def test_run_backtest_reports_progress_and_cancels(self):
+        """Testa progresso por barra e parada limpa via runstop"""
+        from app.core.run_control import RunCancelled, RunControl
+
+        data = synthetic_ohlcv(400)
+        reports = []
+        control = RunControl(on_progress=reports.append, bars_total=len(data), interval=0)
+        run_backtest(data, 'sma_cross', {'fast': 5, 'slow': 20}, run_control=control)
+        assert reports[-1]['bars_processed'] == len(data)
+
+        def cancel_at_100(progress):
+            if progress['bars_processed'] >= 100:
+                stopping.cancel()
+
+        stopping = RunControl(on_progress=cancel_at_100, bars_total=len(data), interval=0)
+        with pytest.raises(RunCancelled, match="after 100 of 400 bars"):
+            run_backtest(data, 'sma_cross', {'fast': 5, 'slow': 20}, run_control=stopping)
+
+    def test_execute_backtest_persists_cancel_and_failure(self, sessions, request_model):
+        """Testa status e mensagem salvos para run cancelado e para falha"""
+        import asyncio
+        from app.api import routes
+        from app.core.run_control import RunControl
+        from app.db import crud
+
+        with sessions() as db:
+            cancelled = crud.create_backtest(db, {"ticker": "TEST", "status": "running", "strategy_params_json": {}})
+            failed = crud.create_backtest(db, {"ticker": "TEST", "status": "running", "strategy_params_json": {}})
+
+        async def fake_fetch_price_data(ticker, start, end, sessions):
+            return synthetic_ohlcv(200)
+
+        async def no_data(ticker, start, end, sessions):
+            return None
+
+        control = RunControl()
+        control.cancel()
+        with patch.object(routes, 'background_session', sessions):
+            with patch('app.services.yfinance_client.fetch_price_data', fake_fetch_price_data):
+                asyncio.run(routes.execute_backtest(cancelled.id, request_model, control))
+            with patch('app.services.yfinance_client.fetch_price_data', no_data):
+                asyncio.run(routes.execute_backtest(failed.id, request_model))
+
+        with sessions() as db:
+            assert tuple(crud.get_backtest_status(db, cancelled.id)) == ("cancelled", "Run cancelled before it started")
+            assert tuple(crud.get_backtest_status(db, failed.id)) == ("failed", "No data found")
+        assert routes._run_controls == {}
+
+    def test_profiled_run_stores_stats(self, sessions, request_model, tmp_path):
+        """Testa profile=true: stats gravados, resumo das funções e download do pstats"""
+        import asyncio
+        import pstats
+        from app.api import routes
+        from app.db import crud
+
+        async def fake_fetch_price_data(ticker, start, end, sessions):
+            return synthetic_ohlcv(300)
+
+        profiled_request = request_model.model_copy(update={'profile': True})
+        assert profiled_request.canonical_key() != request_model.canonical_key()
+        with sessions() as db:
+            profiled = crud.create_backtest(db, {"ticker": "TEST", "status": "running", "strategy_params_json": {}})
+            plain = crud.create_backtest(db, {"ticker": "TEST", "status": "running", "strategy_params_json": {}})
+
+        with patch.object(routes, 'background_session', sessions), \
+             patch('app.services.yfinance_client.fetch_price_data', fake_fetch_price_data):
+            asyncio.run(routes.execute_backtest(profiled.id, profiled_request))
+            asyncio.run(routes.execute_backtest(plain.id, request_model))
+
+        with sessions() as db:
+            assert crud.get_backtest_status(db, profiled.id).status == "completed"
+            assert crud.get_backtest_profile(db, plain.id) is None
+            with pytest.raises(routes.HTTPException):
+                routes.get_backtest_profile(plain.id, 25, 'cumulative', db)
+
+            summary = routes.get_backtest_profile(profiled.id, 5, 'cumulative', db)
+            assert len(summary.functions) == 5 and summary.total_calls > 0
+            assert 'run_backtest' in summary.functions[0].function
+            cumulative = [f.cumtime for f in summary.functions]
+            assert cumulative == sorted(cumulative, reverse=True)
+            by_self = routes.get_backtest_profile(profiled.id, 5, 'tottime', db).functions
+            assert [f.tottime for f in by_self] == sorted((f.tottime for f in by_self), reverse=True)
+
+            download = routes.download_backtest_profile(profiled.id, db)
+
+        path = tmp_path / 'run.prof'
+        path.write_bytes(download.body)
+        assert pstats.Stats(str(path)).total_calls == summary.total_calls
+
+    def test_cancel_endpoint(self, sessions):
+        """Testa cancelamento de run ativo, órfão e já finalizado"""
+        from fastapi import HTTPException
+        from app.api import routes
+        from app.core.run_control import RunControl
+        from app.db import crud
+
+        with sessions() as db:
+            live = crud.create_backtest(db, {"ticker": "TEST", "status": "running", "strategy_params_json": {}})
+            orphan = crud.create_backtest(db, {"ticker": "TEST", "status": "running", "strategy_params_json": {}})
+            done = crud.create_backtest(db, {"ticker": "TEST", "status": "completed", "strategy_params_json": {}})
+
+            control = RunControl()
+            routes._run_controls[live.id] = control
+            try:
+                assert routes.cancel_backtest(live.id, db).stage == "cancelling"
+            finally:
+                routes._run_controls.pop(live.id, None)
+            assert control.cancelled
+
+            assert routes.cancel_backtest(orphan.id, db).status == "cancelled"
+            assert crud.get_backtest_status(db, orphan.id).status == "cancelled"
+            with pytest.raises(HTTPException) as exc:
+                routes.cancel_backtest(done.id, db)
+            assert exc.value.status_code == 409
+
+
+class TestIndicatorStorage:
+    """Testes das séries de indicadores empacotadas (uma linha por símbolo/indicador)"""
+
+    def test_indicator_key_is_canonical(self):
+        """Testa que a chave independe da ordem/formatação dos params"""
+        from app.core.indicator_arrays import canonical_params, indicator_key
+
+        assert canonical_params('{"period": 20}') == canonical_params({'period': 20}) == '{"period":20}'
+        assert indicator_key('sma', {'b': 1, 'a': 2}) == indicator_key('SMA', '{"a": 2, "b": 1}')
+        assert indicator_key('SMA', {'period': 20}) != indicator_key('SMA', {'period': 50})
+        assert len(indicator_key('ATR', {'period': 14})) == 64
+
+    def test_store_and_load_series(self, db):
+        """Testa gravação por série, merge incremental e leitura como array NumPy"""
+        import asyncio
+        from app.db import models
+        from app.services.yfinance_client import STORED_INDICATORS, calculate_and_store_indicators, load_indicator
+
+        data = synthetic_ohlcv(400, seed=11)
+        db.add(models.Symbol(id=1, ticker='AAA'))
+        db.commit()
+
+        asyncio.run(calculate_and_store_indicators(1, data.iloc[:300].copy(), db))
+        assert db.query(models.IndicatorSeries).count() == len(STORED_INDICATORS)
+        # Janela nova sobreposta: só as datas novas são anexadas
+        asyncio.run(calculate_and_store_indicators(1, data.iloc[250:].copy(), db))
+        assert db.query(models.IndicatorSeries).count() == len(STORED_INDICATORS)
+
+        dates, values = load_indicator('AAA', 'SMA', {'period': 20}, db)
+        expected = data['Close'].rolling(20).mean().dropna()
+        assert values.dtype == np.float64
+        assert len(values) == len(expected)
+        assert (dates == expected.index.values.astype('datetime64[D]')).all()
+        np.testing.assert_allclose(values, expected.to_numpy())
+
+        start, end = data.index[100].date(), data.index[149].date()
+        dates, values = load_indicator('AAA', 'SMA', '{"period": 20}', db, start, end)
+        assert len(values) == 50 and dates[0] == np.datetime64(start) and dates[-1] == np.datetime64(end)
+        assert load_indicator('AAA', 'SMA', {'period': 21}, db) is None
+        assert load_indicator('BBB', 'SMA', {'period': 20}, db) is None
+
+    def test_indicators_are_aligned_and_leave_input_untouched(self, db):
+        """Testa indicadores alinhados às datas do bloco sem alterar o DataFrame de entrada"""
+        import asyncio
+        from app.db import models
+        from app.services.yfinance_client import STORED_INDICATORS, compute_indicators, store_price_data
+
+        df = synthetic_ohlcv(260, seed=4)
+        columns = list(df.columns)
+        indicators = compute_indicators(df)
+        assert indicators.values.shape == (len(STORED_INDICATORS), len(df))
+        np.testing.assert_allclose(indicators.get('SMA', {'period': 20}), df['Close'].rolling(20).mean(),
+                                   equal_nan=True)
+        dates, values = indicators.valid('SMA', {'period': 200})
+        assert len(values) == 61 and dates[0] == np.datetime64(df.index[199].date())
+        with pytest.raises(KeyError):
+            indicators.get('SMA', {'period': 7})
+
+        assert asyncio.run(store_price_data('AAA', df, db)) == len(df)
+        assert list(df.columns) == columns
+        assert db.query(models.IndicatorSeries).count() == len(STORED_INDICATORS)
+
+class TestOHLCVBlock:
+    """Testes do contrato ingestão → engine: bloco OHLCV imutável e indicadores alinhados"""
+
+    def test_block_is_immutable_and_frames_are_views(self):
+        """Testa bloco somente leitura, frames sem cópia e independentes entre si"""
+        from app.core.ohlcv import OHLCV_COLUMNS, OHLCVBlock
+
+        provider = synthetic_ohlcv(50).assign(**{'Adj Close': 1.0})
+        block = OHLCVBlock.from_frame(provider)
+        assert block.values.shape == (5, 50) and block.values.flags['C_CONTIGUOUS']
+        with pytest.raises(ValueError):
+            block.values[0, 0] = 1.0
+        with pytest.raises(AttributeError):
+            block.values = None
+
+        first, second = block.frame(), block.frame()
+        assert list(first.columns) == list(OHLCV_COLUMNS) and first.index.name == 'Date'
+        assert np.shares_memory(first['Close'].to_numpy(), block.values)
+        first['SMA_20'] = first['Close'].rolling(20).mean()
+        assert 'SMA_20' not in second.columns
+        with pytest.raises(ValueError):
+            second.iloc[0, 0] = 1.0
+
+        with pytest.raises(ValueError, match="Missing required columns: Volume"):
+            OHLCVBlock.from_frame(provider.drop(columns='Volume'))
+
+    def test_float32_storage(self):
+        """Testa bloco float32: metade dos bytes e frame float64 para a engine"""
+        from app.core.ohlcv import OHLCVBlock
+
+        block = OHLCVBlock.from_frame(synthetic_ohlcv(300, seed=3))
+        narrow = block.astype('float32')
+        assert narrow.values.nbytes == block.values.nbytes // 2
+        assert block.astype(np.float64) is block
+        assert (narrow.frame().dtypes == np.float64).all()
+        np.testing.assert_allclose(narrow.frame().to_numpy(), block.frame().to_numpy(), rtol=1e-6)
+        assert run_backtest(narrow, 'sma_cross', {})['daily_positions'].dates() == \
+            run_backtest(block, 'sma_cross', {})['daily_positions'].dates()
+        with pytest.raises(ValueError, match="Unsupported"):
+            block.astype('int64')
+
+    def test_engine_accepts_block(self):
+        """Testa que run_backtest com bloco equivale ao DataFrame, inclusive com sinais"""
+        from app.core.ohlcv import OHLCVBlock
+
+        df = synthetic_ohlcv(700, seed=9)
+        block = OHLCVBlock.from_frame(df)
+        for profile in (None, {'precompute_signals': True}):
+            reference = run_backtest(df, 'donchian_breakout', {}, engine_profile=profile)
+            result = run_backtest(block, 'donchian_breakout', {}, engine_profile=profile)
+            assert result['final_cash'] == reference['final_cash']
+            assert [t['date'] for t in result['trades']] == [t['date'] for t in reference['trades']]
+
+class TestBacktestCompare:
+    """Testes de POST /backtests/compare: uma carga de dados, N estratégias, tabela alinhada"""
+
+    def test_configs_run_in_worker_processes(self):
+        """Testa execução no pool de processos com resultado igual ao direto e falha isolada"""
+        from app.core.ohlcv import OHLCVBlock
+        from app.services.compare import run_configs, shutdown_pool
+
+        block = OHLCVBlock.from_frame(synthetic_ohlcv(400, seed=4))
+        configs = [
+            {'strategy_type': 'sma_cross', 'strategy_params': {}},
+            {'strategy_type': 'donchian_breakout', 'strategy_params': {}},
+            {'strategy_type': 'sma_cross', 'strategy_params': {'fast': 'x'}},
+        ]
+        try:
+            outcomes = run_configs(block, configs, 100000, 0.001, max_workers=2)
+        finally:
+            shutdown_pool()
+
+        assert outcomes[0]['final_cash'] == run_backtest(block, 'sma_cross', {})['final_cash']
+        assert outcomes[1]['final_cash'] == run_backtest(block, 'donchian_breakout', {})['final_cash']
+        assert isinstance(outcomes[2], ValueError)
+
+    def test_comparison_table_aligns_curves(self):
+        """Testa alinhamento das curvas às datas do bloco e métricas por estratégia"""
+        from app.core.ohlcv import OHLCVBlock
+        from app.services.compare import comparison_table
+        from app.utils.metrics import max_drawdown
+
+        block = OHLCVBlock.from_frame(synthetic_ohlcv(500, seed=6))
+        results = [run_backtest(block, name, {}) for name in ('sma_cross', 'donchian_breakout')]
+        equity, table = comparison_table(block.dates, results, 100000)
+
+        assert equity.shape == (2, 500)
+        for row, result in enumerate(results):
+            positions = result['daily_positions'].array
+            start = int(np.searchsorted(block.dates.astype('datetime64[D]'), positions['date'][0]))
+            # Antes da primeira barra da estratégia vale o capital inicial
+            assert (equity[row, :start] == 100000).all()
+            np.testing.assert_array_equal(equity[row, start:], positions['equity'])
+            assert table[row]['total_trades'] == len(result['trades'])
+        assert table[0]['max_drawdown'] == pytest.approx(max_drawdown(equity[0]))
+
+    def test_compare_endpoint_links_backtests(self, sessions):
+        """Testa que o endpoint carrega os dados uma vez e agrupa os backtests"""
+        import asyncio
+        from app.api import routes, schemas
+        from app.core.ohlcv import OHLCVBlock
+        from app.db import models
+
+        block = OHLCVBlock.from_frame(synthetic_ohlcv(300, seed=2))
+        loads = []
+
+        async def fake_block(ticker, start, end, db, dtype=None):
+            loads.append(ticker)
+            return block
+
+        request = schemas.BacktestCompareRequest(
+            ticker="TEST", start_date=date(2020, 1, 1), end_date=date(2021, 3, 1),
+            strategies=[
+                {'strategy_type': 'sma_cross'},
+                {'strategy_type': 'sma_cross', 'strategy_params': {'fast': 10, 'slow': 30}},
+                {'strategy_type': 'momentum', 'label': 'mom'},
+            ]
+        )
+        with patch('app.services.yfinance_client.get_price_block', fake_block), \
+             patch.object(routes.config, 'COMPARE_MAX_WORKERS', 0), \
+             patch.object(routes, 'background_session', sessions), \
+             sessions() as db:
+            response = asyncio.run(routes.compare_backtests(request, db))
+
+        assert loads == ["TEST"]
+        assert [row.label for row in response.rows] == ['sma_cross', 'sma_cross#2', 'mom']
+        assert all(row.status == 'completed' for row in response.rows)
+        assert len(response.dates) == 300
+        assert all(len(curve) == 300 for curve in response.equity_curves.values())
+        with sessions() as db:
+            stored = db.query(models.Backtest).filter_by(group_id=response.group_id).all()
+            assert sorted(b.id for b in stored) == sorted(row.backtest_id for row in response.rows)
+            assert all(b.status == 'completed' for b in stored)
+            assert db.get(models.BacktestGroup, response.group_id).kind == 'compare'
+
+    def test_member_cancel_and_store_failure(self, sessions):
+        """Testa cancelamento de um membro e falha ao gravar outro sem afetar o resto"""
+        import asyncio
+        from app.api import routes, schemas
+        from app.core.ohlcv import OHLCVBlock
+        from app.db import crud, models
+        from app.services import compare
+
+        block = OHLCVBlock.from_frame(synthetic_ohlcv(300, seed=3))
+        run_configs = compare.run_configs
+
+        async def fake_block(ticker, start, end, db, dtype=None):
+            return block
+
+        def cancel_second(block, configs, initial_cash, commission, controls=None):
+            ids = list(routes._run_controls)
+            assert len(ids) == 3
+            with sessions() as db:
+                assert routes.cancel_backtest(ids[1], db).stage == 'cancelling'
+            return run_configs(block, configs, initial_cash, commission, controls=controls)
+
+        store = crud.store_backtest_results
+
+        def failing_store(db, backtest_id, results):
+            if backtest_id == max(routes._run_controls):
+                raise RuntimeError('disk full')
+            return store(db, backtest_id, results)
+
+        request = schemas.BacktestCompareRequest(
+            ticker="TEST", start_date=date(2020, 1, 1), end_date=date(2021, 3, 1),
+            strategies=[{'strategy_type': 'sma_cross'}] * 3
+        )
+        with patch('app.services.yfinance_client.get_price_block', fake_block), \
+             patch.object(compare, 'run_configs', cancel_second), \
+             patch.object(routes.config, 'COMPARE_MAX_WORKERS', 0), \
+             patch.object(routes.crud, 'store_backtest_results', failing_store), \
+             patch.object(routes, 'background_session', sessions), \
+             sessions() as db:
+            response = asyncio.run(routes.compare_backtests(request, db))
+
+        assert [row.status for row in response.rows] == ['completed', 'cancelled', 'failed']
+        assert response.rows[2].message == 'disk full'
+        assert list(response.equity_curves) == ['sma_cross']
+        assert routes._run_controls == {}
+        with sessions() as db:
+            stored = {b.id: b.status for b in db.query(models.Backtest).filter_by(group_id=response.group_id)}
+        assert [stored[row.backtest_id] for row in response.rows] == ['completed', 'cancelled', 'failed']
+
+    def test_group_members_and_configs_share_single_run_rules(self, db):
+        """Testa que membros e configurações seguem o mapeamento e a validação de um run avulso"""
+        from pydantic import ValidationError
+        from app.api import schemas
+        from app.db import crud
+
+        item = {
+            "ticker": "TEST", "start_date": date(2020, 1, 1), "end_date": date(2021, 1, 1),
+            "strategy_type": "sma_cross", "strategy_params_json": {"fast": 5}, "initial_cash": 1000.0,
+            "commission": 0.002, "analyzers": ["sharpe"], "engine_profile": {"exactbars": 1}
+        }
+        group, (member,) = crud.create_backtest_group(db, {"ticker": "TEST"}, [item])
+        single = crud.create_backtest(db, item)
+        columns = ('ticker', 'start_date', 'end_date', 'strategy_type', 'strategy_params_json',
+                   'initial_cash', 'commission', 'status', 'analyzers_json', 'engine_profile_json')
+        assert [getattr(member, c) for c in columns] == [getattr(single, c) for c in columns]
+        assert member.group_id == group.id and single.group_id is None
+
+        with pytest.raises(ValidationError, match="Unknown strategy type"):
+            schemas.StrategyConfig(strategy_type='bogus')
+        with pytest.raises(ValidationError, match="fast"):
+            schemas.StrategyConfig(strategy_type='sma_cross', strategy_params={'fast': 'x'})
+
+class TestResultCache:
+    """Testes do cache de resultados: payload gzip, ETag/304 e LRU"""
+
+    @pytest.fixture
+    def backtest_id(self, db):
+        from app.db import crud
+        from app.services import result_cache
+
+        result_cache.lru.clear()
+        backtest = crud.create_backtest(db, {
+            "ticker": "TEST", "start_date": date(2020, 1, 1), "end_date": date(2021, 1, 1),
+            "strategy_type": "sma_cross", "strategy_params_json": {},
+            "initial_cash": 100000, "commission": 0.001, "status": "completed"
+        })
+        crud.store_backtest_results(db, backtest.id, run_backtest(synthetic_ohlcv(300), 'sma_cross', {}))
+        return backtest.id
+
+    def test_results_served_from_payload_with_etag(self, db, backtest_id):
+        """Testa gzip negociado, ETag forte por representação e 304"""
+        import gzip
+        import json
+        from app.api import routes
+        from app.db import crud
+        from app.services import result_cache
+
+        assert result_cache.cache_results(db, backtest_id) is not None
+        expected = result_cache.build_response(crud.get_backtest_with_results(db, backtest_id))
+
+        encoded = routes.get_backtest_results(backtest_id, db, None, "gzip, deflate")
+        assert encoded.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(encoded.body)) == json.loads(expected.model_dump_json())
+
+        plain = routes.get_backtest_results(backtest_id, db, None, None)
+        assert "content-encoding" not in plain.headers
+        assert json.loads(plain.body) == json.loads(expected.model_dump_json())
+        assert plain.headers["etag"] != encoded.headers["etag"]
+
+        for tag in (encoded.headers["etag"], plain.headers["etag"], f'W/{plain.headers["etag"]}', '*'):
+            assert routes.get_backtest_results(backtest_id, db, tag, "gzip").status_code == 304
+        assert routes.get_backtest_results(backtest_id, db, '"other"', "gzip").status_code == 200
+        assert routes.get_backtest_results(backtest_id, db, None, "gzip;q=0").headers.get("content-encoding") is None
+
+    def test_rewritten_results_invalidate_payload(self, db, backtest_id):
+        """Testa que re-run apaga o payload e o GET volta a serializar"""
+        from app.api import routes
+        from app.db import crud
+        from app.services import result_cache
+
+        first = routes.get_backtest_results(backtest_id, db, None, "gzip").headers["etag"]
+        assert crud.get_result_payload_etag(db, backtest_id) is not None
+
+        crud.clear_backtest_results(db, backtest_id)
+        assert result_cache.get_payload(db, backtest_id) is None
+        crud.store_backtest_results(db, backtest_id,
+                                    run_backtest(synthetic_ohlcv(300, seed=8), 'sma_cross', {}))
+        assert routes.get_backtest_results(backtest_id, db, None, "gzip").headers["etag"] != first
+
+        crud.delete_backtests(db, [backtest_id])
+        with pytest.raises(routes.HTTPException):
+            routes.get_backtest_results(backtest_id, db, None, "gzip")
+
+    def test_lru_is_bounded_and_checks_etag(self):
+        """Testa despejo do menos usado pelo tamanho e entrada velha ignorada"""
+        from app.services.result_cache import CachedPayload, PayloadLRU
+
+        lru = PayloadLRU(max_bytes=10)
+        lru.put(1, CachedPayload('a', 'gzip', b'x' * 4, 40))
+        lru.put(2, CachedPayload('b', 'gzip', b'x' * 4, 40))
+        assert lru.get(1, 'a') is not None
+        lru.put(3, CachedPayload('c', 'gzip', b'x' * 4, 40))
+        assert lru.get(2, 'b') is None and lru.get(1, 'a') is not None
+        assert lru.nbytes == 8
+        assert lru.get(1, 'stale') is None
+        lru.put(4, CachedPayload('d', 'gzip', b'x' * 11, 40))
+        assert lru.get(4, 'd') is None
+
+class TestSweepExecution:
+    """Testes do coordenador/workers de sweep (fila no banco e transporte local)"""
+
+    @staticmethod
+    def price_loader(ticker, start_date, end_date, db):
+        return synthetic_ohlcv(400, seed=sum(map(ord, ticker)))
+
+    def submit(self, transport, session_factory, tickers, grid):
+        from app.services import sweep
+        return sweep.submit_sweep(transport, tickers, 'sma_cross', grid, date(2020, 1, 1), date(2021, 6, 30),
+                                  session_factory=session_factory)
+
+    def test_expand_param_grid(self):
+        """Testa produto cartesiano do grid e lista explícita"""
+        from app.services.sweep import expand_param_grid
+
+        assert expand_param_grid({'slow': [30, 50], 'fast': [5]}) == [{'fast': 5, 'slow': 30}, {'fast': 5, 'slow': 50}]
+        assert expand_param_grid([{'fast': 5}]) == [{'fast': 5}]
+
+    def test_local_sweep_records_results_and_workers(self, session_factory):
+        """Testa sweep com workers em threads: resultados gravados e job_runs do sweep/workers"""
+        from app.db import models
+        from app.services import sweep
+
+        transport = sweep.LocalTransport()
+        sweep_id = self.submit(transport, session_factory, ['AAA', 'BBB'], {'fast': [5, 10], 'slow': [30]})
+        summary = sweep.run_local_sweep(transport, sweep_id, workers=2, session_factory=session_factory,
+                                        price_loader=self.price_loader, batch_size=1)
+
+        assert summary['status'] == 'completed'
+        assert summary['completed'] == 4 and summary['failed'] == 0
+        db = session_factory()
+        backtests = db.query(models.Backtest).all()
+        assert sorted(b.ticker for b in backtests) == ['AAA', 'AAA', 'BBB', 'BBB']
+        assert db.query(models.Metrics).count() == 4
+        assert db.query(models.DailyPosition).count() == 0  # store_positions desligado
+
+        run = db.get(models.JobRun, sweep_id)
+        assert run.job_name == sweep.SWEEP_JOB_NAME and run.status == 'completed' and run.rows_processed == 4
+        assert json.loads(run.message)['tasks'] == 4
+        workers = db.query(models.JobRun).filter(models.JobRun.parent_id == sweep_id).all()
+        assert len(workers) == 2
+        assert all(w.job_name.startswith('sweep_worker:') and w.status == 'completed' for w in workers)
+        assert sum(w.rows_processed for w in workers) == 4
+
+    def test_database_queue_retries_failed_tasks(self, session_factory):
+        """Testa re-tentativa de tarefas com falha e falha definitiva após max_attempts"""
+        from app.db import models
+        from app.services import sweep
+
+        calls = {}
+
+        def flaky_loader(ticker, start_date, end_date, db):
+            calls[ticker] = calls.get(ticker, 0) + 1
+            if ticker == 'BAD' or calls[ticker] == 1:
+                raise ConnectionError(f"provider timeout for {ticker}")
+            return self.price_loader(ticker, start_date, end_date, db)
+
+        transport = sweep.DatabaseTransport(session_factory)
+        sweep_id = self.submit(transport, session_factory, ['AAA', 'BAD'], {'fast': [5], 'slow': [30]})
+        result = sweep.SweepWorker(transport, sweep_id, worker_id='w1', max_attempts=3,
+                                   session_factory=session_factory, price_loader=flaky_loader).run()
+
+        assert result == {'worker_id': 'w1', 'completed': 1, 'retried': 3, 'failed': 1, 'cancelled': 0}
+        summary = sweep.monitor_sweep(transport, sweep_id, session_factory=session_factory, max_attempts=3)
+        assert summary['status'] == 'partial'
+        assert (summary['completed'], summary['failed'], summary['retries']) == (1, 1, 3)
+
+        db = session_factory()
+        bad = db.query(models.SweepTask).filter(models.SweepTask.ticker == 'BAD').one()
+        assert bad.status == 'failed' and bad.attempts == 3 and 'provider timeout' in bad.last_error
+        good = db.query(models.SweepTask).filter(models.SweepTask.ticker == 'AAA').one()
+        assert good.status == 'completed' and good.backtest_id is not None
+
+    def test_cancel_sweep_stops_claims_and_runs(self, session_factory):
+        """Testa cancelamento: tarefas e job_run marcados, claims vazios e workers param"""
+        import time
+        from app.db import models
+        from app.services import sweep
+
+        transport = sweep.DatabaseTransport(session_factory)
+        sweep_id = self.submit(transport, session_factory, ['AAA', 'BBB'], {'fast': [5, 10], 'slow': [30]})
+
+        def cancelling_loader(ticker, start_date, end_date, db):
+            sweep.cancel_sweep(transport, sweep_id, session_factory=session_factory)
+            time.sleep(0.3)  # o heartbeat percebe o cancelamento
+            return self.price_loader(ticker, start_date, end_date, db)
+
+        result = sweep.SweepWorker(transport, sweep_id, worker_id='w1', batch_size=2, heartbeat_seconds=0.05,
+                                   session_factory=session_factory, price_loader=cancelling_loader).run()
+
+        assert result['completed'] == 0 and result['cancelled'] == 2
+        assert transport.claim('w2', 10) == []
+        counts = transport.counts(sweep_id)
+        assert counts['cancelled'] == 4 and counts['pending'] == counts['running'] == 0
+        db = session_factory()
+        assert db.query(models.Backtest).count() == 0
+        assert db.get(models.JobRun, sweep_id).status == 'cancelled'
+        assert sweep.monitor_sweep(transport, sweep_id, session_factory=session_factory)['status'] == 'cancelled'
+        with pytest.raises(ValueError, match="already cancelled"):
+            sweep.cancel_sweep(transport, sweep_id, session_factory=session_factory)
+
+    def test_local_transport_cancel(self, session_factory):
+        """Testa o cancelamento no transporte em memória"""
+        from app.services import sweep
+
+        transport = sweep.LocalTransport()
+        sweep_id = self.submit(transport, session_factory, ['AAA'], {'fast': [5, 10], 'slow': [30]})
+        claimed = transport.claim('w1', 1)
+        assert sweep.cancel_sweep(transport, sweep_id, session_factory=session_factory)['cancelled'] == 2
+        assert transport.is_cancelled(sweep_id) and transport.claim('w1', 10) == []
+        transport.complete(claimed[0]['id'], 1)
+        assert not transport.fail(claimed[0]['id'], 'late', 3)
+        assert transport.counts(sweep_id)['cancelled'] == 2
+
+    def test_failed_store_leaves_no_backtest(self, session_factory):
+        """Testa que backtest e resultados de uma tarefa são gravados juntos ou nada"""
+        from app.db import crud, models
+        from app.services import sweep
+
+        transport = sweep.DatabaseTransport(session_factory)
+        sweep_id = self.submit(transport, session_factory, ['AAA'], {'fast': [5], 'slow': [30]})
+        with patch.object(crud, '_insert_results', side_effect=RuntimeError('disk full')):
+            result = sweep.SweepWorker(transport, sweep_id, worker_id='w1', max_attempts=1,
+                                       session_factory=session_factory, price_loader=self.price_loader).run()
+
+        assert result['failed'] == 1
+        db = session_factory()
+        assert db.query(models.Backtest).count() == 0
+        assert 'disk full' in db.query(models.SweepTask).one().last_error
+
+    def test_transport_is_abstract(self):
+        """Testa que um transporte incompleto não pode ser instanciado"""
+        from app.services import sweep
+
+        class Partial(sweep.SweepTransport):
+            def submit(self, sweep_id, tasks):
+                return 0
+
+        with pytest.raises(TypeError):
+            Partial()
+
+    def test_stale_tasks_are_requeued(self, session_factory):
+        """Testa que tarefas de um worker sem heartbeat voltam para a fila"""
+        from app.services import sweep
+
+        transport = sweep.DatabaseTransport(session_factory)
+        sweep_id = self.submit(transport, session_factory, ['AAA', 'BBB'], {'fast': [5], 'slow': [30]})
+        claimed = transport.claim('dead-worker', 10)
+        assert len(claimed) == 2 and transport.claim('other', 10) == []
+
+        transport.heartbeat('dead-worker', [claimed[0]['id']])
+        assert transport.requeue_stale(sweep_id, datetime.utcnow() - timedelta(minutes=5), 3) == 0
+        assert transport.requeue_stale(sweep_id, datetime.utcnow() + timedelta(seconds=1), 3) == 2
+        assert transport.counts(sweep_id)['pending'] == 2
+        assert [task['attempts'] for task in transport.claim('w2', 10)] == [2, 2]
+
+
 class TestEdgeCases:
     """Testes de casos extremos e edge cases"""
     